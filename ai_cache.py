@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+
+from flask import current_app
+
+import view_cache
+
+# ==========================================
+# 1. KEYS
+# ==========================================
+
+
+def money(value):
+    return round(float(value), 2)
+
+
+def allocation_key(
+    salary, frequency, fixed_expenses, zero_items, remaining, plan=None
+):
+    """Hashes the inputs of one AI allocation in a canonical form: amounts
+    rounded to centavos, names trimmed, and the fixed expenses and empty
+    categories sorted, since their order doesn't change the plan. Passing
+    the `plan` to be explained keys a reasoning-only answer instead."""
+    canonical = {
+        "salary": money(salary),
+        "frequency": (frequency or "").strip().lower(),
+        "fixed": sorted(
+            (name.strip(), money(amount)) for name, amount in fixed_expenses.items()
+        ),
+        "zero": sorted(name.strip() for name in zero_items),
+        "remaining": money(remaining),
+    }
+    if plan is not None:
+        canonical["plan"] = sorted(
+            (name.strip(), money(amount)) for name, amount in plan.items()
+        )
+    blob = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return "ai:" + hashlib.sha256(blob.encode()).hexdigest()
+
+
+# ==========================================
+# 2. STORE
+# ==========================================
+
+_backend = None
+_backend_lock = threading.Lock()
+stats = {"hits": 0, "misses": 0, "saved_seconds": 0.0}
+
+
+def get_backend():
+    """Builds the backend named by AI_CACHE_BACKEND on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = current_app.config
+                _backend = view_cache.build_backend(
+                    config.get("AI_CACHE_BACKEND", "sqlite"),
+                    config.get("AI_CACHE_PATH")
+                    or os.path.join(current_app.instance_path, "ai_cache.db"),
+                    config.get("AI_CACHE_MAX_ENTRIES", 500),
+                    config.get("AI_CACHE_TTL", 86400),
+                )
+    return _backend
+
+
+def get(key):
+    """Returns (response, seconds the original call took) or None."""
+    backend = get_backend()
+    raw = backend.get(key) if backend else None
+    if raw is None:
+        stats["misses"] += 1
+        return None
+    response, seconds = pickle.loads(raw)
+    stats["hits"] += 1
+    stats["saved_seconds"] += seconds
+    return response, seconds
+
+
+def put(key, response, seconds):
+    backend = get_backend()
+    if backend:
+        backend.set(key, pickle.dumps((response, seconds), pickle.HIGHEST_PROTOCOL))
+
+
+def get_stats():
+    lookups = stats["hits"] + stats["misses"]
+    return {
+        "hits": stats["hits"],
+        "misses": stats["misses"],
+        "hit_rate": stats["hits"] / lookups if lookups else 0,
+        "saved_seconds": stats["saved_seconds"],
+    }
@@ -0,0 +1,367 @@
+import difflib
+import re
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Share of a typical budget each kind of item gets when the user has no
+# history for it. Matched against the words of the item name.
+CATEGORY_WEIGHTS = (
+    (("rent", "housing", "mortgage", "condo", "apartment"), 0.30),
+    (("food", "grocery", "groceries", "meal", "meals", "dining"), 0.25),
+    (("save", "savings", "emergency", "fund", "invest", "investment"), 0.20),
+    (("loan", "debt", "credit", "card", "amortization"), 0.12),
+    (("bill", "bills", "utilities", "electric", "electricity", "water"), 0.10),
+    (("internet", "wifi", "phone", "load", "mobile"), 0.04),
+    (("transport", "transportation", "fare", "gas", "fuel", "commute"), 0.10),
+    (("health", "medical", "medicine", "insurance", "hmo"), 0.06),
+    (("school", "education", "tuition", "books"), 0.08),
+    (("family", "allowance", "parents", "kids"), 0.08),
+    (("fun", "leisure", "entertainment", "hobby", "travel", "shopping"), 0.05),
+)
+DEFAULT_WEIGHT = 0.05
+
+# How far the user's own history pulls an item away from the heuristic
+HISTORY_WEIGHT = 0.6
+HISTORY_DAYS = 180
+
+
+NON_WORD = re.compile(r"[^\w\s]")
+
+# Minimum scores for the token (Dice over words) and fuzzy (difflib) tiers
+TOKEN_MATCH_MIN = 0.5
+FUZZY_MATCH_MIN = 0.8
+
+
+def simplify(name):
+    return NON_WORD.sub("", name).strip().lower()
+
+
+class PlanIndex:
+    """Normalized lookup over the keys of one AI plan, built once per
+    response, that assigns each requested item at most one key (and each key
+    at most one item) in three tiers:
+
+    1. exact: same simplified name ("Rent 🏠" == "rent")
+    2. token: best word overlap ("Food" ~ "Food & Drinks")
+    3. fuzzy: close spelling ("Groceris" ~ "Groceries")
+
+    Within a tier the strongest pairs are assigned first, so two similar
+    items can't both take the same key.
+    """
+
+    def __init__(self, plan):
+        self.keys = list(plan)
+        self.values = [plan[k] for k in self.keys]
+        self.simple = [simplify(k) for k in self.keys]
+        self.words = [frozenset(s.split()) for s in self.simple]
+        self.exact = {}
+        self.by_word = {}
+        for i, s in enumerate(self.simple):
+            self.exact.setdefault(s, []).append(i)
+            for word in self.words[i]:
+                self.by_word.setdefault(word, []).append(i)
+
+    def assign(self, names):
+        """Returns the matched plan value for each name (None if unmatched)."""
+        result = [None] * len(names)
+        used = set()
+        simple = [simplify(n) for n in names]
+
+        for n, s in enumerate(simple):
+            for i in self.exact.get(s, ()):
+                if i not in used:
+                    result[n] = self.values[i]
+                    used.add(i)
+                    break
+
+        pairs = []
+        for n, s in enumerate(simple):
+            if result[n] is not None:
+                continue
+            words = frozenset(s.split())
+            candidates = {i for w in words for i in self.by_word.get(w, ())}
+            for i in candidates - used:
+                shared = len(words & self.words[i])
+                score = 2 * shared / (len(words) + len(self.words[i]))
+                if score >= TOKEN_MATCH_MIN:
+                    pairs.append((score, n, i))
+        self.take(pairs, result, used)
+
+        pairs = []
+        matcher = difflib.SequenceMatcher(autojunk=False)
+        free = [i for i in range(len(self.keys)) if i not in used]
+        for n, s in enumerate(simple):
+            if result[n] is not None:
+                continue
+            matcher.set_seq2(s)
+            for i in free:
+                matcher.set_seq1(self.simple[i])
+                if (
+                    matcher.real_quick_ratio() >= FUZZY_MATCH_MIN
+                    and matcher.quick_ratio() >= FUZZY_MATCH_MIN
+                ):
+                    score = matcher.ratio()
+                    if score >= FUZZY_MATCH_MIN:
+                        pairs.append((score, n, i))
+        self.take(pairs, result, used)
+        return result
+
+    def take(self, pairs, result, used):
+        for _, n, i in sorted(pairs, key=lambda p: -p[0]):
+            if result[n] is None and i not in used:
+                result[n] = self.values[i]
+                used.add(i)
+
+
+def coerce_plan(plan):
+    """The LLM's {item: amount} plan with every amount as a float. Takes
+    numbers and strings like "₱1,200"; null and "" count as 0. Raises
+    ValueError for anything else ("n/a", negatives, a plan that isn't an
+    object)."""
+    if not isinstance(plan, dict):
+        raise ValueError(f"AI plan is not an object: {plan!r}")
+    coerced = {}
+    for name, value in plan.items():
+        if isinstance(value, str):
+            value = value.replace(",", "").replace("₱", "").strip()
+        if value is None or value == "":
+            value = 0
+        try:
+            amount = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"AI plan amount for {name!r} is not a number: {value!r}")
+        if not 0 <= amount < float("inf"):
+            raise ValueError(f"AI plan amount for {name!r} is out of range: {value!r}")
+        coerced[str(name)] = amount
+    return coerced
+
+
+def heuristic_weight(name):
+    words = set(simplify(name).split())
+    for keywords, weight in CATEGORY_WEIGHTS:
+        if words.intersection(keywords):
+            return weight
+    return DEFAULT_WEIGHT
+
+
+def load_history(user_id):
+    """Returns {simplified name: typical share} from the user's saved smart
+    budgets and their budget tracker spending."""
+    import models
+
+    since = datetime.utcnow() - timedelta(days=HISTORY_DAYS)
+    shares = {}
+    for name, share in models.get_allocation_history(user_id, since):
+        shares.setdefault(simplify(name), []).append(share)
+    return {name: sum(s) / len(s) for name, s in shares.items()}
+
+
+def allocate(names, remaining, history=None):
+    """Splits `remaining` across `names`, returning one amount per name that
+    together sum to exactly `remaining` (to the centavo).
+
+    Each item starts from its heuristic weight. Items the user has history
+    for keep the same combined weight, but it is re-split among them in
+    proportion to what the user actually gave them before."""
+    if not names:
+        return []
+    history = history or {}
+    weights = np.fromiter((heuristic_weight(n) for n in names), float, len(names))
+    past = np.fromiter(
+        (history.get(simplify(n), 0.0) for n in names), float, len(names)
+    )
+    weights /= weights.sum()
+
+    known = past > 0
+    if known.any():
+        mass = weights[known].sum()
+        weights[known] = (1 - HISTORY_WEIGHT) * weights[known] + (
+            HISTORY_WEIGHT * mass * past[known] / past[known].sum()
+        )
+
+    return split_total(weights, remaining)
+
+
+def split_total(weights, total):
+    """Splits `total` in proportion to `weights`, in whole centavos. The
+    leftover centavos go to the largest remainders, so the parts always add
+    up to exactly `total`."""
+    shares = weights / weights.sum() * round(total * 100)
+    amounts = np.floor(shares)
+    leftover = int(round(shares.sum() - amounts.sum()))
+    if leftover:
+        amounts[np.argsort(amounts - shares)[:leftover]] += 1
+    return [float(a) / 100 for a in amounts]
+
+
+def describe(plan, remaining, history=None):
+    """Plain-language reasoning for a plan when no LLM text is wanted."""
+    top = sorted(plan.items(), key=lambda kv: kv[1], reverse=True)[:2]
+    lead = " and ".join(f"{name} (₱{amount:,.2f})" for name, amount in top)
+    learned = [n for n in plan if (history or {}).get(simplify(n))]
+    text = f"I split the remaining ₱{remaining:,.2f} by typical category needs"
+    if learned:
+        text += f", adjusted to your past budgets for {', '.join(learned)}"
+    return f"{text}. The biggest shares go to {lead}."
+
+
+# ==========================================
+# REBALANCING (chat commands)
+# ==========================================
+
+# Bills the chat keeps as they are unless the user names them
+FIXED_KEYWORDS = {
+    "rent", "housing", "mortgage", "internet", "wifi", "utilities", "bill",
+    "bills", "electric", "electricity", "water", "loan", "debt", "insurance",
+    "tuition", "amortization",
+}
+
+# A "p"/"php" prefix must start a word, so "ketchup 500" keeps its "p"
+AMOUNT = r"(?:₱|\b(?:php|p))?\s*(\d[\d,]*(?:\.\d+)?)\s*(k)?"
+COMMAND_PATTERNS = (
+    # "increase food by 1000", "add 1000 to food"
+    (re.compile(rf"^(?:increase|raise|bump|up)\s+(.+?)\s+by\s+{AMOUNT}$"), "add"),
+    (re.compile(rf"^add\s+{AMOUNT}\s+(?:to|for)\s+(.+?)$"), "add_to"),
+    # "reduce food by 500", "take 500 from food"
+    (
+        re.compile(rf"^(?:decrease|reduce|lower|cut|lessen)\s+(.+?)\s+by\s+{AMOUNT}$"),
+        "sub",
+    ),
+    (
+        re.compile(rf"^(?:take|remove|subtract)\s+{AMOUNT}\s+(?:from|off)\s+(.+?)$"),
+        "sub_from",
+    ),
+    # "set food to 6000", "change food to 6k", "make food 6000", "food = 6000".
+    # Verbs and "to"/"at" are whole words, so "potato 500" isn't "pota" + "to"
+    (
+        re.compile(
+            rf"^(?:(?:set|change|make|put|update)\s+)?(.+?)"
+            rf"(?:\s+(?:to|at)|\s*[=:])?\s*{AMOUNT}$"
+        ),
+        "set",
+    ),
+)
+QUESTION_WORDS = re.compile(r"\?|^(why|how|what|should|can|could|is|are|do)\b")
+PLAIN_WORDS = re.compile(r"\b(please|pls|the|my|budget|category)\b")
+
+stats = {"local": 0, "llm": 0}
+
+
+def parse_amount(digits, thousands):
+    value = float(digits.replace(",", ""))
+    return value * 1000 if thousands else value
+
+
+def match_name(phrase, names):
+    """The plan item a phrase refers to: an exact simplified match, then the
+    shortest name containing it (or contained in it). None when unclear."""
+    phrase = simplify(phrase)
+    if not phrase:
+        return None
+    simple = {name: simplify(name) for name in names}
+    for name, s in simple.items():
+        if s == phrase:
+            return name
+    candidates = [n for n, s in simple.items() if s and (phrase in s or s in phrase)]
+    if len(candidates) == 1:
+        return candidates[0]
+    return None
+
+
+def parse_command(message, plan):
+    """Turns "Set Food to 6000 and cut Fun by 500" into {name: new amount}.
+    Returns None for anything that isn't a plain constraint edit, so the
+    caller can hand it to the LLM instead."""
+    text = message.strip().lower().rstrip(".!")
+    if not text or QUESTION_WORDS.search(text):
+        return None
+
+    targets = {}
+    for clause in re.split(r"\s*(?:,(?!\d)|;|\band\b|\bthen\b)\s*", text):
+        clause = PLAIN_WORDS.sub(" ", clause)
+        clause = re.sub(r"\s+", " ", clause).strip()
+        if not clause:
+            continue
+        for pattern, action in COMMAND_PATTERNS:
+            m = pattern.match(clause)
+            if m:
+                break
+        else:
+            return None
+
+        if action in ("add_to", "sub_from"):
+            digits, thousands, phrase = m.groups()
+        else:
+            phrase, digits, thousands = m.groups()
+        name = match_name(phrase, plan)
+        if name is None:
+            return None
+        amount = parse_amount(digits, thousands)
+        current = targets.get(name, plan[name])
+        if action.startswith("add"):
+            amount = current + amount
+        elif action.startswith("sub"):
+            amount = max(current - amount, 0)
+        targets[name] = amount
+    return targets or None
+
+
+def is_fixed(name):
+    return bool(set(simplify(name).split()) & FIXED_KEYWORDS)
+
+
+def rebalance(plan, total, targets):
+    """Applies `targets`, keeps fixed bills, and scales the other flexible
+    items proportionally so the plan adds up to `total` again. Returns the
+    new plan, or None when nothing is left to absorb the change."""
+    names = list(plan)
+    flexible = [n for n in names if n not in targets and not is_fixed(n)]
+    locked = sum(targets.values()) + sum(
+        plan[n] for n in names if n not in targets and is_fixed(n)
+    )
+    left = max(total - locked, 0)
+
+    new_plan = {n: (targets[n] if n in targets else plan[n]) for n in names}
+    if not flexible:
+        return new_plan if abs(left) < 0.01 else None
+
+    current = np.fromiter((plan[n] for n in flexible), float, len(flexible))
+    weights = current if current.sum() > 0 else np.ones(len(flexible))
+    new_plan.update(zip(flexible, split_total(weights, left)))
+    return new_plan
+
+
+def money(amount):
+    return f"₱{amount:,.0f}" if amount == int(amount) else f"₱{amount:,.2f}"
+
+
+def solve_command(message, plan, salary):
+    """Answers a constraint edit locally in the chat's {"new_plan", "reply"}
+    shape, or returns None so the caller falls back to the LLM."""
+    # Without a known income, keep the plan's current total instead
+    total = salary or sum(plan.values())
+    targets = parse_command(message, plan) if plan else None
+    new_plan = rebalance(plan, total, targets) if targets else None
+    if new_plan is None:
+        stats["llm"] += 1
+        return None
+    stats["local"] += 1
+
+    changed = ", ".join(f"{n} to {money(a)}" for n, a in targets.items())
+    adjusted = [
+        f"{n} to {money(new_plan[n])}"
+        for n in new_plan
+        if n not in targets and abs(new_plan[n] - plan[n]) >= 0.01
+    ]
+    reply = f"I've set {changed}."
+    if adjusted:
+        reply += f" To stay within {money(total)}, I adjusted {', '.join(adjusted)}."
+    if sum(new_plan.values()) > total + 0.01:
+        reply += " Heads up: this plan now exceeds your income."
+    return {"new_plan": new_plan, "reply": reply}
+
+
+def get_stats():
+    total = stats["local"] + stats["llm"]
+    return {**stats, "local_rate": stats["local"] / total if total else 0}
@@ -25,6 +25,72 @@ else:
 
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+# --- VIEW CACHE CONFIGURATION ---
+# "sqlite" (shared by all workers on the box), "memory" or "none". "memory" is
+# per process: with more than one gunicorn worker, a write invalidates only the
+# worker that handled it and the others keep serving stale pages until the TTL,
+# so only pick it for single-worker setups like `flask run`
+app.config["VIEW_CACHE_BACKEND"] = os.environ.get("VIEW_CACHE_BACKEND", "sqlite")
+app.config["VIEW_CACHE_PATH"] = os.environ.get("VIEW_CACHE_PATH")
+app.config["VIEW_CACHE_TTL"] = int(os.environ.get("VIEW_CACHE_TTL", 300))
+app.config["VIEW_CACHE_MAX_ENTRIES"] = int(
+    os.environ.get("VIEW_CACHE_MAX_ENTRIES", 1000)
+)
+
+# --- AI ALLOCATION CACHE ---
+# Same backends as the view cache; answers depend only on the form inputs
+app.config["AI_CACHE_BACKEND"] = os.environ.get(
+    "AI_CACHE_BACKEND", app.config["VIEW_CACHE_BACKEND"]
+)
+app.config["AI_CACHE_PATH"] = os.environ.get("AI_CACHE_PATH")
+app.config["AI_CACHE_TTL"] = int(os.environ.get("AI_CACHE_TTL", 86400))
+app.config["AI_CACHE_MAX_ENTRIES"] = int(os.environ.get("AI_CACHE_MAX_ENTRIES", 500))
+
+# --- SMART BUDGET CHAT SESSIONS ---
+# Plan + compacted history per (browser session, blueprint); "sqlite" shares
+# them between workers
+app.config["CHAT_SESSION_BACKEND"] = os.environ.get(
+    "CHAT_SESSION_BACKEND", app.config["VIEW_CACHE_BACKEND"]
+)
+app.config["CHAT_SESSION_PATH"] = os.environ.get("CHAT_SESSION_PATH")
+app.config["CHAT_SESSION_TTL"] = int(os.environ.get("CHAT_SESSION_TTL", 3600))
+app.config["CHAT_SESSION_MAX_ENTRIES"] = int(
+    os.environ.get("CHAT_SESSION_MAX_ENTRIES", 1000)
+)
+
+# --- SMART BUDGET ENGINE ---
+# "llm": the LLM allocates (local engine as offline fallback)
+# "local": the local engine allocates; the LLM only writes the reasoning,
+#          and not even that when SMART_BUDGET_AI_REASONING is off
+app.config["SMART_BUDGET_MODE"] = os.environ.get("SMART_BUDGET_MODE", "llm")
+app.config["SMART_BUDGET_AI_REASONING"] = (
+    os.environ.get("SMART_BUDGET_AI_REASONING", "true").lower() == "true"
+)
+
+# --- METRICS ---
+# /metrics serves Prometheus text to scrapers sending METRICS_TOKEN as a bearer
+# token. Without a token it 404s unless METRICS_PUBLIC is on (private networks)
+app.config["METRICS_TOKEN"] = os.environ.get("METRICS_TOKEN")
+app.config["METRICS_PUBLIC"] = (
+    os.environ.get("METRICS_PUBLIC", "false").lower() == "true"
+)
+# Requests at least this slow are logged as one JSON line each
+app.config["SLOW_REQUEST_MS"] = int(os.environ.get("SLOW_REQUEST_MS", 1000))
+
+# --- N+1 QUERY WATCH (development) ---
+# Logs statement shapes repeated QUERY_WATCH_THRESHOLD+ times in one request
+app.config["QUERY_WATCH"] = os.environ.get("QUERY_WATCH", "false").lower() == "true"
+app.config["QUERY_WATCH_THRESHOLD"] = int(os.environ.get("QUERY_WATCH_THRESHOLD", 3))
+
+# --- ADMIN & PROFILING ---
+# Usernames allowed to profile requests (X-Profile: 1 or ?_profile=1)
+app.config["ADMIN_USERNAMES"] = {
+    name.strip()
+    for name in os.environ.get("ADMIN_USERNAMES", "").split(",")
+    if name.strip()
+}
+app.config["PROFILE_DIR"] = os.environ.get("PROFILE_DIR")
+
 # Initialize the Database
 db = SQLAlchemy(app)
 
@@ -39,14 +105,34 @@ else:
 # Import routes and models after db initialization to avoid circular imports
 import models
 import routes
+import migrations
+import importer
+import jobs
+import metrics
+import query_watch
+import profiler
 
-# Create tables automatically (This replaces models.init_db)
+# Schema changes live in migrations.py and are applied with `flask db upgrade`.
+# Local SQLite databases are upgraded automatically for convenience; production
+# runs the upgrade from build.sh so big backfills never block worker startup.
 with app.app_context():
-    db.create_all()
-    print("✅ Database tables created/verified")
+    if database_url:
+        pending = migrations.pending_revisions()
+        if pending:
+            print(f"⚠️ {len(pending)} schema revision(s) pending - run `flask db upgrade`")
+    else:
+        migrations.upgrade()
 
-# Initialize routes
+# Initialize routes and CLI commands
 routes.init_routes(app)
+migrations.init_cli(app)
+importer.init_cli(app)
+jobs.init_cli(app)
+metrics.init_metrics(app)
+query_watch.init_query_watch(app)
+query_watch.init_cli(app)
+profiler.init_profiler(app)
+profiler.init_cli(app)
 
 if __name__ == "__main__":
     app.run(debug=True, port=5001)
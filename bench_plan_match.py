@@ -0,0 +1,108 @@
+"""Micro-benchmark for reconciling AI plan keys with budget item names.
+
+Compares the old per-item scan (re.sub on every key for every item, first
+substring hit wins) with allocator.PlanIndex on synthetic category lists:
+
+    python bench_plan_match.py --sizes 10 100 1000 --repeat 5
+"""
+
+import argparse
+import random
+import re
+import time
+
+from allocator import PlanIndex
+
+WORDS = (
+    "food groceries rent housing internet water electric savings fund fun "
+    "travel school books family kids health medicine transport fare gas "
+    "phone load insurance loan card shopping clothes pets gifts charity"
+).split()
+EMOJI = ("", " 🏠", " 🍔", " 💰", " 🌐", " 🚌")
+
+
+def make_names(n, seed=7):
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < n:
+        words = rng.sample(WORDS, rng.randint(1, 3))
+        names.add(" ".join(w.title() for w in words) + f" {len(names)}")
+    return [name + rng.choice(EMOJI) for name in names]
+
+
+def make_plan(names, seed=7):
+    """What an LLM tends to send back: emoji dropped, some keys lowercased
+    or misspelled, and the order shuffled. Returns (plan, expected amount
+    per name)."""
+    rng = random.Random(seed)
+    plan = {}
+    expected = {}
+    for name in names:
+        key = re.sub(r"[^\w\s]", "", name).strip()
+        roll = rng.random()
+        if roll < 0.2:
+            key = key.lower()
+        elif roll < 0.3 and len(key) > 6:
+            i = rng.randrange(1, len(key) - 1)
+            key = key[:i] + key[i + 1 :]
+        plan[key] = expected[name] = round(rng.uniform(100, 5000), 2)
+    keys = list(plan)
+    rng.shuffle(keys)
+    return {k: plan[k] for k in keys}, expected
+
+
+def legacy_match(names, plan):
+    amounts = []
+    for original_name in names:
+        allocated = 0
+        if original_name in plan:
+            allocated = plan[original_name]
+        else:
+            simple_name = re.sub(r"[^\w\s]", "", original_name).strip().lower()
+            for key, val in plan.items():
+                simple_key = re.sub(r"[^\w\s]", "", key).strip().lower()
+                if simple_name == simple_key or simple_name in simple_key:
+                    allocated = val
+                    break
+        amounts.append(allocated)
+    return amounts
+
+
+def index_match(names, plan):
+    return PlanIndex(plan).assign(names)
+
+
+def best_time(fn, repeat, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main(sizes, repeat):
+    print(
+        f"{'items':>6} {'legacy ms':>10} {'index ms':>10} {'speedup':>8} "
+        f"{'legacy ok':>10} {'index ok':>10}"
+    )
+    for n in sizes:
+        names = make_names(n)
+        plan, expected = make_plan(names)
+        legacy_s, legacy = best_time(legacy_match, repeat, names, plan)
+        index_s, indexed = best_time(index_match, repeat, names, plan)
+        legacy_hits = sum(a == expected[nm] for nm, a in zip(names, legacy))
+        index_hits = sum(a == expected[nm] for nm, a in zip(names, indexed))
+        print(
+            f"{n:>6} {legacy_s * 1000:>10.2f} {index_s * 1000:>10.2f} "
+            f"{legacy_s / index_s:>7.1f}x {legacy_hits / n:>10.0%} "
+            f"{index_hits / n:>10.0%}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.sizes, args.repeat)
@@ -1,3 +1,3 @@
 #!/bin/bash
 pip install -r requirements.txt
-python -c "import models; models.init_db()"
\ No newline at end of file
+flask --app app db upgrade
\ No newline at end of file
@@ -0,0 +1,157 @@
+import os
+import pickle
+import re
+import threading
+
+from flask import current_app
+
+import view_cache
+
+# Prompt budget per chat turn; older turns are folded into the summary and
+# then dropped until the prompt fits
+CHAT_MAX_PROMPT_TOKENS = int(os.environ.get("CHAT_MAX_PROMPT_TOKENS", 1500))
+# Most recent messages (user + assistant) kept verbatim
+CHAT_KEEP_MESSAGES = 6
+CHAT_SUMMARY_CHARS = 600
+
+CONTEXT_SALARY = re.compile(r"Salary:\s*([\d.,]+)")
+CONTEXT_ITEM = re.compile(r"^\s*-\s*(.+?):\s*([\d.,]*)\s*$", re.MULTILINE)
+
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token for English/JSON)."""
+    return (len(text) + 3) // 4
+
+
+# ==========================================
+# 1. STORE
+# ==========================================
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Builds the backend named by CHAT_SESSION_BACKEND on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = current_app.config
+                _backend = view_cache.build_backend(
+                    config.get("CHAT_SESSION_BACKEND", "sqlite"),
+                    config.get("CHAT_SESSION_PATH")
+                    or os.path.join(current_app.instance_path, "chat_sessions.db"),
+                    config.get("CHAT_SESSION_MAX_ENTRIES", 1000),
+                    config.get("CHAT_SESSION_TTL", 3600),
+                )
+    return _backend
+
+
+def session_key(sid, plan_id):
+    return f"chat:{sid}:{plan_id}"
+
+
+def load(sid, plan_id):
+    backend = get_backend()
+    raw = backend.get(session_key(sid, plan_id)) if backend else None
+    return pickle.loads(raw) if raw is not None else None
+
+
+def save(sid, plan_id, state):
+    backend = get_backend()
+    if backend:
+        backend.set(session_key(sid, plan_id), pickle.dumps(state))
+
+
+def start(sid, plan_id, salary, frequency, plan):
+    """Begins (or restarts) the conversation about one rendered blueprint."""
+    state = {
+        "salary": salary,
+        "frequency": frequency,
+        "plan": dict(plan),
+        "summary": "",
+        "messages": [],
+    }
+    save(sid, plan_id, state)
+    return state
+
+
+def from_context(context):
+    """Rebuilds a state from the blueprint text the browser used to send,
+    for conversations whose server copy expired."""
+    salary = CONTEXT_SALARY.search(context or "")
+    plan = {}
+    for name, amount in CONTEXT_ITEM.findall(context or ""):
+        try:
+            plan[name.strip()] = float(amount.replace(",", "") or 0)
+        except ValueError:
+            continue
+    return {
+        "salary": float(salary.group(1).replace(",", "")) if salary else 0,
+        "frequency": "",
+        "plan": plan,
+        "summary": "",
+        "messages": [],
+    }
+
+
+# ==========================================
+# 2. PROMPT
+# ==========================================
+
+
+def blueprint_text(state):
+    lines = [f"Salary: {state['salary']:g} {state['frequency']}".rstrip()]
+    lines += [f"- {name}: {amount:g}" for name, amount in state["plan"].items()]
+    return "\n".join(lines)
+
+
+def build_messages(state, system_instruction, command):
+    """System prompt, the compacted history, then the new command with the
+    current plan. Drops the oldest kept turns until it fits the budget."""
+    prompt = f"""
+        CURRENT BLUEPRINT:
+        {blueprint_text(state)}
+
+        USER COMMAND:
+        "{command}"
+        """
+    if state["summary"]:
+        prompt = f"EARLIER IN THIS CHAT: {state['summary']}\n" + prompt
+
+    history = list(state["messages"])
+    while True:
+        messages = (
+            [{"role": "system", "content": system_instruction}]
+            + history
+            + [{"role": "user", "content": prompt}]
+        )
+        tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        if tokens <= CHAT_MAX_PROMPT_TOKENS or not history:
+            return messages, tokens
+        history = history[2:]
+
+
+def record_turn(state, command, answer, raw_reply):
+    """Stores one exchange. The model's new_plan becomes the current plan,
+    and only the reply text is kept in history since the plan itself is
+    resent every turn. Turns beyond CHAT_KEEP_MESSAGES move to the summary."""
+    if answer:
+        state["plan"] = dict(answer["new_plan"])
+        reply = answer["reply"] or "Updated the plan."
+    else:
+        reply = raw_reply.strip()
+    state["messages"] += [
+        {"role": "user", "content": command},
+        {"role": "assistant", "content": reply},
+    ]
+
+    while len(state["messages"]) > CHAT_KEEP_MESSAGES:
+        asked, answered = state["messages"][:2]
+        state["messages"] = state["messages"][2:]
+        state["summary"] = (
+            f"{state['summary']} User: {asked['content']} -> {answered['content']}"
+        ).strip()[-CHAT_SUMMARY_CHARS:]
+    return reply
+
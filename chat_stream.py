@@ -0,0 +1,146 @@
+import json
+import re
+
+import llm_client
+
+# A finished "name": amount pair inside new_plan (the trailing , or } proves
+# the number is complete)
+PLAN_ITEM = re.compile(r'"((?:[^"\\]|\\.)*)"\s*:\s*(-?\d+(?:\.\d+)?)\s*[,}]')
+PLAN_START = re.compile(r'"new_plan"\s*:\s*\{')
+REPLY_START = re.compile(r'"reply"\s*:\s*"')
+PARTIAL_ESCAPE = re.compile(r"\\u[0-9a-fA-F]{0,3}$")
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class ChatPlanParser:
+    """Parses the chat's {"new_plan": {...}, "reply": "..."} answer while it
+    is still arriving, so plan rows and reply text can be shown early."""
+
+    def __init__(self):
+        self.text = ""
+        self.items_sent = 0
+        self.reply_sent = 0
+
+    def feed(self, chunk):
+        """Adds a chunk and returns the (event, data) pairs it completed."""
+        self.text += chunk
+        events = []
+
+        items = self.plan_items()
+        for name, amount in items[self.items_sent :]:
+            events.append(("item", {"name": name, "amount": amount}))
+        self.items_sent = len(items)
+
+        reply = self.partial_reply()
+        if len(reply) > self.reply_sent:
+            events.append(("reply", reply[self.reply_sent :]))
+            self.reply_sent = len(reply)
+        return events
+
+    def plan_items(self):
+        start = PLAN_START.search(self.text)
+        if not start:
+            return []
+        body = self.text[start.end() - 1 :]
+        end = body.find("}")
+        body = body if end == -1 else body[: end + 1]
+        return [
+            (json.loads(f'"{name}"'), float(amount))
+            for name, amount in PLAN_ITEM.findall(body)
+        ]
+
+    def partial_reply(self):
+        start = REPLY_START.search(self.text)
+        if not start:
+            return ""
+        raw = []
+        escaped = False
+        for ch in self.text[start.end() :]:
+            if ch == '"' and not escaped:
+                break
+            raw.append(ch)
+            escaped = ch == "\\" and not escaped
+        raw = "".join(raw)
+        # Hold back an escape sequence that is still arriving
+        if escaped:
+            raw = raw[:-1]
+        raw = PARTIAL_ESCAPE.sub("", raw)
+        try:
+            return json.loads(f'"{raw}"')
+        except ValueError:
+            return ""
+
+    def finish(self):
+        return parse_plan(self.text)
+
+
+def parse_plan(text):
+    """Validates a complete answer. Returns {"new_plan", "reply"} with
+    numeric amounts, or None when the model answered in plain text."""
+    text = text.replace("```json", "").replace("```", "")
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end == -1:
+        return None
+    try:
+        answer = json.loads(text[start : end + 1])
+    except ValueError:
+        return None
+    plan = answer.get("new_plan") if isinstance(answer, dict) else None
+    if not isinstance(plan, dict):
+        return None
+
+    clean = {}
+    for name, amount in plan.items():
+        try:
+            clean[str(name)] = round(float(amount), 2)
+        except (TypeError, ValueError):
+            continue
+    reply = answer.get("reply")
+    return {"new_plan": clean, "reply": reply if isinstance(reply, str) else ""}
+
+
+def stream_plan(messages, temperature=0.1, on_finish=None):
+    """Yields SSE frames for one chat answer:
+
+    token  raw text as the model writes it
+    item   one finished {"name", "amount"} row of new_plan
+    reply  the next piece of the reply text
+    plan   the validated {"new_plan", "reply"} once the answer is complete
+    done   {"reply": text} instead of plan when no JSON plan came back
+    error  {"reply": message} when the LLM is unavailable or fails
+
+    on_finish(answer, text) runs once a full answer has arrived; answer is
+    the validated plan or None.
+    """
+    # Sent before the upstream call so the browser sees headers at once
+    yield ": connected\n\n"
+    parser = ChatPlanParser()
+    try:
+        for chunk in llm_client.stream_chat_completion(messages, temperature):
+            yield sse("token", chunk)
+            for event, data in parser.feed(chunk):
+                yield sse(event, data)
+    except llm_client.LLMUnavailable:
+        yield sse("error", {"reply": "I'm having trouble thinking right now."})
+        return
+    except llm_client.LLMError as e:
+        print(e)
+        yield sse("error", {"reply": "Connection error."})
+        return
+
+    answer = parser.finish()
+    if on_finish:
+        on_finish(answer, parser.text)
+    if answer:
+        yield sse("plan", answer)
+    else:
+        yield sse("done", {"reply": parser.text})
+
+
+def stream_answer(answer):
+    """SSE frames for an answer that is already complete (solved locally)."""
+    yield sse("reply", answer["reply"])
+    yield sse("plan", answer)
@@ -0,0 +1,220 @@
+import csv
+import io
+import json
+import zipfile
+from datetime import date, datetime
+
+from app import db  # Importing db from your app.py
+import models
+
+# ORM rows buffered per fetch; memory stays flat whatever the history size
+EXPORT_YIELD_PER = 1000
+
+# Rows written between flushes of the CSV/NDJSON text buffer
+EXPORT_FLUSH_EVERY = 500
+
+
+# ==========================================
+# 1. DATASETS
+# ==========================================
+
+
+def dataset_queries(user_id):
+    """Maps each export dataset name to a flat-column SELECT for one user."""
+    m = models
+    return {
+        "transactions": db.select(
+            m.Transaction.id,
+            m.Transaction.created_at,
+            m.Transaction.description,
+            m.Transaction.type,
+            m.Transaction.amount,
+        )
+        .where(m.Transaction.user_id == user_id)
+        .order_by(m.Transaction.id),
+        "loans": db.select(
+            m.Loan.id,
+            m.Loan.loan_name,
+            m.Loan.amount,
+            m.Loan.start_date,
+            m.Loan.end_date,
+            m.Loan.monthly_payment,
+            m.Loan.status,
+            m.Loan.notes,
+            m.Loan.created_at,
+        )
+        .where(m.Loan.user_id == user_id)
+        .order_by(m.Loan.id),
+        "loan_payments": db.select(
+            m.LoanPayment.id,
+            m.LoanPayment.loan_id,
+            m.Loan.loan_name,
+            m.LoanPayment.amount,
+            m.LoanPayment.pay_date,
+            m.LoanPayment.created_at,
+        )
+        .join(m.Loan, m.LoanPayment.loan_id == m.Loan.id)
+        .where(m.Loan.user_id == user_id)
+        .order_by(m.LoanPayment.loan_id, m.LoanPayment.id),
+        "savings": db.select(
+            m.Savings.id,
+            m.Savings.savings_name,
+            m.Savings.target_amount,
+            m.Savings.current_balance,
+            m.Savings.created_at,
+        )
+        .where(m.Savings.user_id == user_id)
+        .order_by(m.Savings.id),
+        "savings_transactions": db.select(
+            m.SavingsTransaction.id,
+            m.SavingsTransaction.savings_id,
+            m.Savings.savings_name,
+            m.SavingsTransaction.type,
+            m.SavingsTransaction.amount,
+            m.SavingsTransaction.note,
+            m.SavingsTransaction.timestamp,
+        )
+        .join(m.Savings, m.SavingsTransaction.savings_id == m.Savings.id)
+        .where(m.Savings.user_id == user_id)
+        .order_by(m.SavingsTransaction.savings_id, m.SavingsTransaction.id),
+        "budget_categories": db.select(
+            m.BudgetCategory.id,
+            m.BudgetCategory.name,
+            m.BudgetCategory.planned_budget,
+            m.BudgetCategory.created_at,
+        )
+        .where(m.BudgetCategory.user_id == user_id)
+        .order_by(m.BudgetCategory.id),
+        "budget_transactions": db.select(
+            m.BudgetTransaction.id,
+            m.BudgetTransaction.created_at,
+            m.BudgetCategory.name.label("category_name"),
+            m.BudgetTransaction.description,
+            m.BudgetTransaction.amount,
+            m.BudgetTransaction.expense_type,
+            m.BudgetTransaction.savings_id,
+        )
+        .join(
+            m.BudgetCategory, m.BudgetTransaction.category_id == m.BudgetCategory.id
+        )
+        .where(m.BudgetTransaction.user_id == user_id)
+        .order_by(m.BudgetTransaction.id),
+        "smart_budgets": db.select(
+            m.SalaryBudget.id,
+            m.SalaryBudget.created_at,
+            m.SalaryBudget.salary_amount,
+            m.SalaryBudget.frequency,
+            m.SalaryBudget.ai_reasoning,
+        )
+        .where(m.SalaryBudget.user_id == user_id)
+        .order_by(m.SalaryBudget.id),
+        "smart_budget_items": db.select(
+            m.SalaryBudgetItem.id,
+            m.SalaryBudgetItem.budget_id,
+            m.SalaryBudgetItem.item_name,
+            m.SalaryBudgetItem.user_amount,
+            m.SalaryBudgetItem.ai_amount,
+            m.SalaryBudgetItem.is_auto_filled,
+        )
+        .join(m.SalaryBudget, m.SalaryBudgetItem.budget_id == m.SalaryBudget.id)
+        .where(m.SalaryBudget.user_id == user_id)
+        .order_by(m.SalaryBudgetItem.budget_id, m.SalaryBudgetItem.id),
+    }
+
+
+DATASETS = tuple(dataset_queries(0))
+
+
+def iter_dataset(user_id, dataset):
+    """Yields (column names) once, then one tuple per row, fetching
+    EXPORT_YIELD_PER rows at a time through a server-side cursor."""
+    query = dataset_queries(user_id)[dataset]
+    result = db.session.execute(
+        query.execution_options(stream_results=True, yield_per=EXPORT_YIELD_PER)
+    )
+    yield list(result.keys())
+    for row in result:
+        yield tuple(row)
+
+
+def plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+# ==========================================
+# 2. ENCODERS (generators of text chunks)
+# ==========================================
+
+
+def drain(buffer):
+    chunk = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return chunk
+
+
+def iter_csv(user_id, dataset):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    rows = iter_dataset(user_id, dataset)
+    writer.writerow(next(rows))
+    for i, row in enumerate(rows, start=1):
+        writer.writerow(["" if v is None else plain(v) for v in row])
+        if i % EXPORT_FLUSH_EVERY == 0:
+            yield drain(buffer)
+    yield drain(buffer)
+
+
+def iter_ndjson(user_id, datasets):
+    """One JSON object per line; each carries its dataset name so several
+    datasets can share one stream."""
+    buffer = io.StringIO()
+    for dataset in datasets:
+        rows = iter_dataset(user_id, dataset)
+        columns = next(rows)
+        for i, row in enumerate(rows, start=1):
+            record = {"dataset": dataset}
+            record.update((c, plain(v)) for c, v in zip(columns, row))
+            buffer.write(json.dumps(record) + "\n")
+            if i % EXPORT_FLUSH_EVERY == 0:
+                yield drain(buffer)
+        yield drain(buffer)
+
+
+class ChunkSink(io.RawIOBase):
+    """Write-only stream that hands whatever ZipFile wrote since the last
+    drain back to the caller, so the archive never sits in memory whole."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_zip_bundle(user_id):
+    """Streams a ZIP with one CSV per dataset."""
+    sink = ChunkSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zf:
+        for dataset in DATASETS:
+            with zf.open(f"{dataset}.csv", "w", force_zip64=True) as entry:
+                for chunk in iter_csv(user_id, dataset):
+                    entry.write(chunk.encode("utf-8"))
+                    yield sink.drain()
+    yield sink.drain()
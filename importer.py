@@ -0,0 +1,315 @@
+import csv
+import io
+import re
+import time
+from collections import Counter
+from datetime import datetime
+
+import click
+from app import db  # Importing db from your app.py
+import models
+import view_cache
+
+# Rows sent to the database per executemany call
+IMPORT_BATCH_SIZE = 5000
+
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%Y/%m/%d", "%d-%b-%Y", "%Y%m%d")
+
+# Header aliases seen in common bank CSV exports (compared lowercased)
+CSV_COLUMNS = {
+    "date": ("date", "posted", "posting date", "transaction date", "value date"),
+    "description": ("description", "memo", "payee", "details", "narrative", "name"),
+    "amount": ("amount", "value"),
+    "debit": ("debit", "withdrawal", "money out"),
+    "credit": ("credit", "deposit", "money in"),
+    "category": ("category",),
+}
+
+OFX_FIELD = re.compile(r"<(DTPOSTED|TRNAMT|NAME|MEMO)>([^<\r\n]*)", re.IGNORECASE)
+
+
+class StatementError(ValueError):
+    """A statement file or row that cannot be mapped."""
+
+
+# ==========================================
+# 1. PARSERS (generators of normalized rows)
+# ==========================================
+
+
+def parse_date(value):
+    # Drop any time part ("2025-01-05 10:00", "2025-01-05T10:00")
+    value = (value or "").strip().split(" ")[0].split("T")[0]
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    # OFX dates are YYYYMMDD[HHMMSS[.XXX]][TZ]
+    if len(value) >= 8 and value[:8].isdigit():
+        return datetime.strptime(value[:8], "%Y%m%d")
+    raise StatementError(f"Unrecognised date '{value}'")
+
+
+def parse_amount(value):
+    value = (value or "").strip().replace(",", "").replace("₱", "")
+    if value.startswith("(") and value.endswith(")"):
+        value = "-" + value[1:-1]
+    return float(value) if value else 0.0
+
+
+def iter_csv_rows(stream):
+    """Yields {"date", "description", "amount", "category"} dicts from a
+    bank CSV export, reading one line at a time."""
+    reader = csv.reader(stream)
+    header = [h.strip().lower() for h in next(reader, [])]
+    cols = {}
+    for field, aliases in CSV_COLUMNS.items():
+        for i, name in enumerate(header):
+            if name in aliases:
+                cols[field] = i
+                break
+    if "date" not in cols or not ({"amount", "debit", "credit"} & set(cols)):
+        raise StatementError(
+            "CSV needs a date column and an amount, debit or credit column"
+        )
+
+    def cell(row, field):
+        i = cols.get(field)
+        return row[i] if i is not None and i < len(row) else ""
+
+    for line_no, row in enumerate(reader, start=2):
+        if not any(row):
+            continue
+        try:
+            if "amount" in cols:
+                amount = parse_amount(cell(row, "amount"))
+            else:
+                amount = parse_amount(cell(row, "credit")) - abs(
+                    parse_amount(cell(row, "debit"))
+                )
+            yield {
+                "date": parse_date(cell(row, "date")),
+                "description": cell(row, "description").strip()[:200],
+                "amount": amount,
+                "category": cell(row, "category").strip(),
+            }
+        except ValueError as e:
+            raise StatementError(f"Line {line_no}: {e}")
+
+
+def iter_ofx_rows(stream):
+    """Yields normalized rows from the <STMTTRN> blocks of an OFX/QFX file
+    (SGML or XML flavour), reading one line at a time."""
+    current = None
+    for line in stream:
+        upper = line.upper()
+        if "<STMTTRN>" in upper:
+            current = {}
+        if current is not None:
+            for tag, value in OFX_FIELD.findall(line):
+                current[tag.upper()] = value.strip()
+        if "</STMTTRN>" in upper and current is not None:
+            description = current.get("NAME") or current.get("MEMO", "")
+            try:
+                yield {
+                    "date": parse_date(current.get("DTPOSTED")),
+                    "description": description[:200],
+                    "amount": parse_amount(current.get("TRNAMT")),
+                    "category": "",
+                }
+            except ValueError as e:
+                raise StatementError(f"Transaction {current}: {e}")
+            current = None
+
+
+def iter_rows(stream, fmt):
+    if fmt == "ofx":
+        return iter_ofx_rows(stream)
+    if fmt == "csv":
+        return iter_csv_rows(stream)
+    raise StatementError(f"Unsupported statement format '{fmt}'")
+
+
+def detect_format(filename):
+    return "ofx" if filename.lower().endswith((".ofx", ".qfx")) else "csv"
+
+
+# ==========================================
+# 2. BATCH WRITERS
+# ==========================================
+
+
+def batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def drop_existing(model, user_id, records, max_id):
+    """Removes records the user already had before this import (rows with
+    id <= max_id), matching on (date, amount, description). Uses multiset
+    counts so two identical purchases on one day are only skipped if both
+    are already stored."""
+    start = min(r["created_at"] for r in records)
+    end = max(r["created_at"] for r in records)
+    rows = db.session.query(
+        model.created_at, model.amount, model.description
+    ).filter(
+        model.user_id == user_id,
+        model.id <= max_id,
+        model.created_at.between(start, end),
+    )
+    existing = Counter(tuple(row) for row in rows)
+
+    fresh = []
+    for r in records:
+        k = (r["created_at"], r["amount"], r["description"])
+        if existing[k] > 0:
+            existing[k] -= 1
+        else:
+            fresh.append(r)
+    return fresh
+
+
+def import_statement(user_id, stream, fmt="csv", target="transactions"):
+    """Streams a CSV/OFX statement into Transaction (target="transactions")
+    or BudgetTransaction (target="budget") rows.
+
+    All batches go in a single database transaction, so a bad row rolls the
+    whole file back. Returns counts and throughput."""
+    if target not in ("transactions", "budget"):
+        raise StatementError(f"Unknown import target '{target}'")
+
+    started = time.perf_counter()
+    read = inserted = skipped = 0
+    cash_delta = spent_delta = 0
+    # (category_id, month) -> [total, count] for the budget rollups
+    rollups = {}
+
+    if target == "budget":
+        models.seed_default_categories(user_id)
+        categories = {
+            c["name"].lower(): c["id"] for c in models.get_categories(user_id)
+        }
+        fallback_id = categories.get("miscellaneous") or min(categories.values())
+
+    model = models.Transaction if target == "transactions" else models.BudgetTransaction
+    # Rows this import adds must not count as duplicates of each other
+    max_id = (
+        db.session.query(db.func.max(model.id))
+        .filter(model.user_id == user_id)
+        .scalar()
+        or 0
+    )
+
+    try:
+        for batch in batched(iter_rows(stream, fmt), IMPORT_BATCH_SIZE):
+            read += len(batch)
+            if target == "transactions":
+                records = [
+                    {
+                        "user_id": user_id,
+                        "description": r["description"],
+                        "amount": abs(r["amount"]),
+                        "type": "income" if r["amount"] > 0 else "daily",
+                        "created_at": r["date"],
+                    }
+                    for r in batch
+                    if r["amount"]
+                ]
+            else:
+                # Budgets track spending only, so credits are skipped
+                records = [
+                    {
+                        "user_id": user_id,
+                        "category_id": categories.get(
+                            r["category"].lower(), fallback_id
+                        ),
+                        "description": r["description"],
+                        "amount": abs(r["amount"]),
+                        "expense_type": "daily",
+                        "created_at": r["date"],
+                    }
+                    for r in batch
+                    if r["amount"] < 0
+                ]
+
+            if records:
+                records = drop_existing(model, user_id, records, max_id)
+            skipped += len(batch) - len(records)
+            if not records:
+                continue
+
+            db.session.execute(db.insert(model), records)
+            inserted += len(records)
+            if target == "transactions":
+                cash_delta += sum(
+                    r["amount"] if r["type"] == "income" else -r["amount"]
+                    for r in records
+                )
+            else:
+                spent_delta += sum(r["amount"] for r in records)
+                for r in records:
+                    bucket = rollups.setdefault(
+                        (r["category_id"], models.month_start(r["created_at"])), [0, 0]
+                    )
+                    bucket[0] += r["amount"]
+                    bucket[1] += 1
+
+        if inserted:
+            # One ledger entry for the whole file instead of one per row
+            models.record_ledger_entry(
+                user_id, cash_balance=cash_delta, budget_spent=spent_delta
+            )
+        for (category_id, month), (total, count) in rollups.items():
+            models.record_rollup(user_id, category_id, "daily", month, total, count)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if target == "transactions":
+        view_cache.invalidate(user_id, *models.TRANSACTION_VIEWS)
+    else:
+        view_cache.invalidate(user_id, *models.BUDGET_VIEWS)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "read": read,
+        "inserted": inserted,
+        "skipped": skipped,
+        "seconds": elapsed,
+        "rows_per_second": read / elapsed if elapsed else 0,
+    }
+
+
+def open_text(binary_stream):
+    """Wraps an uploaded file's byte stream for line-by-line text reading."""
+    return io.TextIOWrapper(binary_stream, encoding="utf-8-sig", errors="replace")
+
+
+def init_cli(app):
+    @app.cli.command("import-statement")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--user-id", type=int, required=True)
+    @click.option("--format", "fmt", type=click.Choice(["csv", "ofx"]), default=None)
+    @click.option(
+        "--target",
+        type=click.Choice(["transactions", "budget"]),
+        default="transactions",
+    )
+    def import_statement_command(path, user_id, fmt, target):
+        """Bulk-import a CSV or OFX bank statement for one user."""
+        with open(path, encoding="utf-8-sig", errors="replace", newline="") as f:
+            result = import_statement(user_id, f, fmt or detect_format(path), target)
+        click.echo(
+            f"✅ {result['inserted']} inserted, {result['skipped']} skipped "
+            f"of {result['read']} rows in {result['seconds']:.2f}s "
+            f"({result['rows_per_second']:,.0f} rows/s)"
+        )
@@ -0,0 +1,315 @@
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+
+from app import db  # Importing db from your app.py
+import models
+
+# Threads per gunicorn worker running AI jobs
+JOB_WORKERS = int(os.environ.get("AI_JOB_WORKERS", 4))
+
+# A running job not finished after this long is assumed lost with its worker
+# (well past llm_client's read timeout times its retries)
+JOB_STALE_SECONDS = int(os.environ.get("AI_JOB_STALE_SECONDS", 120))
+JOB_MAX_ATTEMPTS = 3
+
+PENDING = ("queued", "running")
+FINISHED = ("done", "failed")
+
+HANDLERS = {}
+
+# Per-process latency counters; `flask jobs status` reads the shared table
+stats = {
+    "completed": 0,
+    "failed": 0,
+    "wait_seconds": 0.0,
+    "run_seconds": 0.0,
+    "max_wait_seconds": 0.0,
+    "max_run_seconds": 0.0,
+    "in_flight": 0,
+}
+_stats_lock = threading.Lock()
+
+
+def handler(kind):
+    """Registers `fn(payload) -> JSON-serializable result` for a job kind."""
+
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+
+    return register
+
+
+# ==========================================
+# 1. EXECUTOR
+# ==========================================
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """One pool per process. Built lazily (and rebuilt after a fork), and the
+    first build sweeps up jobs a previous worker left unfinished."""
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(
+                    max_workers=JOB_WORKERS, thread_name_prefix="ai-job"
+                )
+                _executor_pid = os.getpid()
+                app = current_app._get_current_object()
+                _executor.submit(requeue_stale, app)
+    return _executor
+
+
+def enqueue(job_id):
+    app = current_app._get_current_object()
+    executor = get_executor()
+    with _stats_lock:
+        stats["in_flight"] += 1
+    executor.submit(run, app, job_id)
+
+
+def submit(user_id, kind, payload):
+    """Stores a queued job and hands it to the pool. Returns the AIJob."""
+    job = models.AIJob(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        kind=kind,
+        payload=json.dumps(payload),
+    )
+    db.session.add(job)
+    db.session.commit()
+    enqueue(job.id)
+    return job
+
+
+def claim(job_id):
+    """Flips queued -> running atomically, so a job requeued by two workers
+    still runs once."""
+    claimed = db.session.execute(
+        db.update(models.AIJob)
+        .where(models.AIJob.id == job_id, models.AIJob.status == "queued")
+        .values(
+            status="running",
+            started_at=datetime.utcnow(),
+            attempts=models.AIJob.attempts + 1,
+        )
+    ).rowcount
+    db.session.commit()
+    return claimed == 1
+
+
+def run(app, job_id):
+    with app.app_context():
+        try:
+            if not claim(job_id):
+                return
+            job = db.session.get(models.AIJob, job_id)
+            try:
+                result = HANDLERS[job.kind](json.loads(job.payload))
+                job.result = json.dumps(result)
+                job.status = "done"
+            except Exception as e:
+                job.error = str(e)
+                job.status = "failed"
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            record_latency(job)
+            print(
+                f"🧾 Job {job.id} {job.status} in {run_seconds(job):.2f}s "
+                f"(waited {wait_seconds(job):.2f}s)"
+            )
+        finally:
+            with _stats_lock:
+                stats["in_flight"] -= 1
+            db.session.remove()
+
+
+# ==========================================
+# 2. RECOVERY
+# ==========================================
+
+
+def stale_since(status):
+    """The column that has to be older than the cutoff for a job in
+    `status` to count as abandoned."""
+    if status == "running":
+        return models.AIJob.started_at
+    return models.AIJob.created_at
+
+
+def is_stale(job):
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+    if job.status == "running":
+        return job.started_at < cutoff
+    return job.status == "queued" and job.created_at < cutoff
+
+
+def recover(job):
+    """Re-runs one job if it looks abandoned: still queued or running long
+    after it should have finished. Gives up after JOB_MAX_ATTEMPTS.
+
+    Like claim(), the change is a conditional UPDATE on the status this
+    caller saw, so a job a worker finishes (or claims) in the meantime is
+    left alone instead of being run a second time."""
+    if job.status not in PENDING or not is_stale(job):
+        return
+    if job.attempts >= JOB_MAX_ATTEMPTS:
+        values = {
+            "status": "failed",
+            "error": "Gave up after repeated worker loss",
+            "finished_at": datetime.utcnow(),
+        }
+    else:
+        values = {"status": "queued"}
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+    changed = db.session.execute(
+        db.update(models.AIJob)
+        .where(
+            models.AIJob.id == job.id,
+            models.AIJob.status == job.status,
+            stale_since(job.status) < cutoff,
+        )
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    if changed == 1 and values["status"] == "queued":
+        enqueue(job.id)
+
+
+def requeue_stale(app):
+    with app.app_context():
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+            stale = models.AIJob.query.filter(
+                models.AIJob.status.in_(PENDING),
+                models.AIJob.created_at < cutoff,
+            ).all()
+            for job in stale:
+                recover(job)
+        finally:
+            db.session.remove()
+
+
+# ==========================================
+# 3. STATUS & STATS
+# ==========================================
+
+
+def get_job(job_id, user_id):
+    job = db.session.get(models.AIJob, job_id)
+    if job is None or job.user_id != user_id:
+        return None
+    return job
+
+
+def wait_seconds(job):
+    end = job.started_at or datetime.utcnow()
+    return (end - job.created_at).total_seconds()
+
+
+def run_seconds(job):
+    if job.started_at is None:
+        return 0.0
+    end = job.finished_at or datetime.utcnow()
+    return (end - job.started_at).total_seconds()
+
+
+def record_latency(job):
+    with _stats_lock:
+        stats["completed" if job.status == "done" else "failed"] += 1
+        stats["wait_seconds"] += wait_seconds(job)
+        stats["run_seconds"] += run_seconds(job)
+        stats["max_wait_seconds"] = max(stats["max_wait_seconds"], wait_seconds(job))
+        stats["max_run_seconds"] = max(stats["max_run_seconds"], run_seconds(job))
+
+
+def queue_depth():
+    """Jobs queued or running across every worker."""
+    rows = db.session.execute(
+        db.select(models.AIJob.status, db.func.count())
+        .where(models.AIJob.status.in_(PENDING))
+        .group_by(models.AIJob.status)
+    ).all()
+    return dict(rows)
+
+
+def job_status(job):
+    depth = queue_depth()
+    return {
+        "id": job.id,
+        "status": job.status,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "wait_seconds": round(wait_seconds(job), 3),
+        "run_seconds": round(run_seconds(job), 3),
+        "queue_depth": depth.get("queued", 0) + depth.get("running", 0),
+    }
+
+
+def get_stats():
+    finished = stats["completed"] + stats["failed"]
+    return {
+        **stats,
+        "avg_wait_seconds": stats["wait_seconds"] / finished if finished else 0,
+        "avg_run_seconds": stats["run_seconds"] / finished if finished else 0,
+    }
+
+
+def init_cli(app):
+    @app.cli.group("jobs")
+    def jobs_group():
+        """Background AI job queue."""
+
+    @jobs_group.command("status")
+    @click.option("--hours", type=int, default=1, help="Latency window")
+    def status_command(hours):
+        """Show queue depth and recent job latency."""
+        depth = queue_depth()
+        click.echo(
+            f"📥 queued: {depth.get('queued', 0)}, running: {depth.get('running', 0)}"
+        )
+        since = datetime.utcnow() - timedelta(hours=hours)
+        recent = models.AIJob.query.filter(
+            models.AIJob.status.in_(FINISHED), models.AIJob.finished_at >= since
+        ).all()
+        if not recent:
+            click.echo(f"No jobs finished in the last {hours}h.")
+            return
+        waits = sorted(wait_seconds(j) for j in recent)
+        runs = sorted(run_seconds(j) for j in recent)
+        failed = sum(1 for j in recent if j.status == "failed")
+        click.echo(
+            f"✅ {len(recent) - failed} done, ❌ {failed} failed in the last {hours}h"
+        )
+        for label, values in (("wait", waits), ("run", runs)):
+            p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+            click.echo(
+                f"   {label}: avg {sum(values) / len(values):.2f}s, "
+                f"p95 {p95:.2f}s, max {values[-1]:.2f}s"
+            )
+
+    @jobs_group.command("prune")
+    @click.option("--days", type=int, default=7)
+    def prune_command(days):
+        """Delete finished jobs older than --days."""
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        deleted = db.session.execute(
+            db.delete(models.AIJob).where(
+                models.AIJob.status.in_(FINISHED), models.AIJob.created_at < cutoff
+            )
+        ).rowcount
+        db.session.commit()
+        click.echo(f"🧹 Deleted {deleted} finished job(s).")
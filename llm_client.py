@@ -0,0 +1,244 @@
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+API_URL = os.environ.get(
+    "GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions"
+)
+MODEL = "llama-3.3-70b-versatile"
+
+# (connect, read) seconds; a stalled upstream can't pin a worker past these
+TIMEOUT = (
+    float(os.environ.get("LLM_CONNECT_TIMEOUT", 3.05)),
+    float(os.environ.get("LLM_READ_TIMEOUT", 30)),
+)
+MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 2))
+BACKOFF_BASE = 0.5  # seconds, doubled per attempt, with full jitter
+BACKOFF_CAP = 4.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+BREAKER_THRESHOLD = int(os.environ.get("LLM_BREAKER_THRESHOLD", 5))
+BREAKER_COOLDOWN = float(os.environ.get("LLM_BREAKER_COOLDOWN", 30))
+
+
+class LLMError(Exception):
+    """The LLM call failed; callers fall back to their offline path."""
+
+
+class LLMUnavailable(LLMError):
+    """The circuit breaker is open, so no request was even attempted."""
+
+
+# ==========================================
+# 1. CIRCUIT BREAKER
+# ==========================================
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures and rejects calls for
+    `cooldown` seconds; then lets one trial call through (half-open)."""
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            if self.trial_running:
+                return False
+            self.trial_running = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half-open"
+
+
+breaker = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN)
+
+
+# ==========================================
+# 2. POOLED SESSION
+# ==========================================
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """One keep-alive session per process, so calls reuse TLS connections."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # Retries are handled below so they respect the breaker
+                adapter = HTTPAdapter(
+                    pool_connections=4, pool_maxsize=16, max_retries=0
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def backoff_delay(attempt):
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt))
+
+
+def post_chat(payload, stream=False):
+    """POSTs an OpenAI-style chat payload, retrying transient failures with
+    jittered exponential backoff. Returns the requests.Response (status 200);
+    the caller tells the breaker whether its body was usable. Raises
+    LLMUnavailable when the breaker is open and LLMError otherwise."""
+    if not breaker.allow():
+        raise LLMUnavailable("LLM circuit breaker is open")
+
+    headers = {
+        "Authorization": f"Bearer {os.environ.get('GROQ_API_KEY')}",
+        "Content-Type": "application/json",
+    }
+    last_error = None
+    try:
+        for attempt in range(MAX_RETRIES + 1):
+            if attempt:
+                time.sleep(backoff_delay(attempt - 1))
+            try:
+                response = get_session().post(
+                    API_URL,
+                    json=payload,
+                    headers=headers,
+                    timeout=TIMEOUT,
+                    stream=stream,
+                )
+            except requests.RequestException as e:
+                last_error = LLMError(f"Connection error: {e}")
+                continue
+            if response.status_code == 200:
+                return response
+            last_error = LLMError(f"Upstream returned HTTP {response.status_code}")
+            response.close()
+            if response.status_code not in RETRY_STATUSES:
+                break
+    except BaseException:
+        # Whatever it was, a half-open trial must not stay claimed forever
+        breaker.record_failure()
+        raise
+
+    breaker.record_failure()
+    raise last_error
+
+
+def chat_completion(messages, temperature=0.2, model=MODEL):
+    """Returns the assistant message text for `messages`."""
+    payload = {"model": model, "messages": messages, "temperature": temperature}
+    started = time.perf_counter()
+    try:
+        response = post_chat(payload)
+        try:
+            content = response.json()["choices"][0]["message"]["content"]
+        except BaseException:
+            # A 200 with a body we can't use still counts against the upstream
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+    except LLMUnavailable:
+        metrics.observe_llm("chat", started, "unavailable")
+        raise
+    except LLMError:
+        metrics.observe_llm("chat", started, "error")
+        raise
+    except (ValueError, KeyError, IndexError) as e:
+        metrics.observe_llm("chat", started, "error")
+        raise LLMError(f"Malformed completion: {e}")
+    metrics.observe_llm("chat", started)
+    return content
+
+
+def stream_chat_completion(messages, temperature=0.2, model=MODEL):
+    """Yields the assistant message text piece by piece as the upstream
+    streams it (OpenAI-style server-sent events)."""
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "stream": True,
+    }
+    started = time.perf_counter()
+    try:
+        response = post_chat(payload, stream=True)
+    except LLMUnavailable:
+        metrics.observe_llm("stream", started, "unavailable")
+        raise
+    except LLMError:
+        metrics.observe_llm("stream", started, "error")
+        raise
+    first_token = True
+    outcome = "error"
+    try:
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:") :].strip()
+            if data == "[DONE]":
+                outcome = "ok"
+                break
+            try:
+                delta = json.loads(data)["choices"][0].get("delta", {})
+            except (ValueError, KeyError, IndexError) as e:
+                raise LLMError(f"Malformed stream chunk: {e}")
+            if delta.get("content"):
+                if first_token:
+                    metrics.observe_llm("stream_first_token", started)
+                    first_token = False
+                yield delta["content"]
+        else:
+            outcome = "ok"  # upstream closed without a [DONE] marker
+    except requests.RequestException as e:
+        breaker.record_failure()
+        raise LLMError(f"Stream interrupted: {e}")
+    except GeneratorExit:
+        # The reader stopped early; what the upstream sent so far was fine
+        breaker.record_success()
+        raise
+    except BaseException:
+        # Malformed chunks and anything unexpected end the call as failed
+        breaker.record_failure()
+        raise
+    else:
+        breaker.record_success()
+    finally:
+        metrics.observe_llm("stream", started, outcome)
+        response.close()
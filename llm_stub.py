@@ -0,0 +1,126 @@
+"""Local stand-in for the Groq chat completions API.
+
+Run it and point the app at it to work on the smart budgeter offline, or to
+rehearse slow and failing upstreams:
+
+    python llm_stub.py --port 8765 --delay 0.5 --fail-rate 0.2 --token-delay 0.05
+    GROQ_API_URL=http://127.0.0.1:8765/v1/chat/completions flask --app app run
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_content(messages):
+    """Builds a plausible answer for each kind of prompt the app sends."""
+    prompt = messages[-1]["content"] if messages else ""
+    categories = re.search(r"CATEGORIES TO FILL:\s*(\[.*?\])", prompt, re.DOTALL)
+    remaining = re.search(r"remaining budget of ([\d.]+)", prompt)
+    if categories and remaining:
+        names = json.loads(categories.group(1))
+        share = round(float(remaining.group(1)) / max(len(names), 1), 2)
+        return json.dumps(
+            {
+                "plan": {name: share for name in names},
+                "reasoning": "Stub server: split the remaining budget evenly.",
+            }
+        )
+    if "explain the logic" in prompt:
+        return "Stub server: the plan follows the engine's category weights."
+    # Chat: hand the current blueprint back unchanged
+    plan = {
+        name.strip(): float(amount or 0)
+        for name, amount in re.findall(r"^\s*- (.+?): ([\d.]*)\s*$", prompt, re.M)
+    }
+    return json.dumps({"new_plan": plan, "reply": "Stub server: no changes made."})
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+    fail_rate = 0.0
+    fail_status = 503
+    token_delay = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(self.delay)
+
+        if random.random() < self.fail_rate:
+            self.send_response(self.fail_status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        content = fake_content(payload.get("messages", []))
+        if payload.get("stream"):
+            self.stream(content)
+            return
+
+        body = json.dumps(
+            {
+                "choices": [
+                    {
+                        "message": {
+                            "role": "assistant",
+                            "content": content,
+                        }
+                    }
+                ]
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream(self, content):
+        """Sends `content` as OpenAI-style SSE deltas, a few characters at a
+        time, `token_delay` seconds apart."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        # Chunked like the real API, so clients see each delta immediately
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i in range(0, len(content), 8):
+            delta = {"choices": [{"delta": {"content": content[i : i + 8]}}]}
+            self.write_chunk(f"data: {json.dumps(delta)}\n\n".encode())
+            time.sleep(self.token_delay)
+        self.write_chunk(b"data: [DONE]\n\n")
+        self.write_chunk(b"")
+
+    def write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=8765, delay=0.0, fail_rate=0.0, fail_status=503, token_delay=0.0):
+    StubHandler.delay = delay
+    StubHandler.token_delay = token_delay
+    StubHandler.fail_rate = fail_rate
+    StubHandler.fail_status = fail_status
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    print(f"🤖 LLM stub listening on http://127.0.0.1:{port}/v1/chat/completions")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds per reply")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="0.0 - 1.0")
+    parser.add_argument("--fail-status", type=int, default=503)
+    parser.add_argument(
+        "--token-delay", type=float, default=0.0, help="Seconds between streamed chunks"
+    )
+    args = parser.parse_args()
+    serve(args.port, args.delay, args.fail_rate, args.fail_status, args.token_delay)
@@ -0,0 +1,124 @@
+from datetime import date, datetime
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+
+# Amounts within half a centavo count as settled
+CENTAVO = 0.005
+
+
+def parse_date(value):
+    """Accepts a date, a datetime or a "YYYY-MM-DD" string."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def due_day(start_date):
+    """Day of month a loan falls due (1 when it has no start date)."""
+    start = parse_date(start_date)
+    return start.day if start else 1
+
+
+# ==========================================
+# 1. SCHEDULE (built when a loan is written)
+# ==========================================
+
+
+def due_dates(start, end):
+    """Monthly due dates on the start date's day of month, from one month
+    after `start` up to `end`. Short months clamp to their last day (a loan
+    started on the 31st is due on Feb 28/29). A loan shorter than a month
+    is due once, on `end`."""
+    dates = []
+    months = 1
+    while True:
+        due = start + relativedelta(months=months)
+        if due > end:
+            break
+        dates.append(due)
+        months += 1
+    return dates or [end]
+
+
+def build_schedule(amount, monthly_payment, start_date, end_date):
+    """Installments for a loan paid `monthly_payment` per due date. The last
+    due date takes whatever balance is left, and the schedule stops early
+    once the principal is covered.
+
+    Returns [{"seq", "due_date", "amount_due", "cumulative_due",
+    "balance_after"}]."""
+    start, end = parse_date(start_date), parse_date(end_date)
+    if not start or not end or amount <= 0:
+        return []
+    dates = due_dates(start, end)
+
+    installments = []
+    balance = round(amount, 2)
+    cumulative = 0.0
+    for seq, due in enumerate(dates, 1):
+        if balance <= CENTAVO:
+            break
+        last = seq == len(dates)
+        amount_due = balance if last else round(min(monthly_payment, balance), 2)
+        cumulative = round(cumulative + amount_due, 2)
+        balance = round(balance - amount_due, 2)
+        installments.append(
+            {
+                "seq": seq,
+                "due_date": due,
+                "amount_due": amount_due,
+                "cumulative_due": cumulative,
+                "balance_after": balance,
+            }
+        )
+    return installments
+
+
+def next_due(installments, total_paid):
+    """Due date of the first installment the payments so far do not cover,
+    or None when the loan is settled."""
+    for row in installments:
+        if row["cumulative_due"] > total_paid + CENTAVO:
+            return row["due_date"]
+    return None
+
+
+# ==========================================
+# 2. PROJECTION (vectorized over many loans)
+# ==========================================
+
+
+def project_payoffs(next_due_dates, remaining, monthly_payment, due_days):
+    """Payoff date for every loan at once, assuming `monthly_payment` is
+    paid on each due date from `next_due_dates` on.
+
+    All arguments are equal-length sequences; `due_days` is each loan's day
+    of month (its start date's day), so a loan due on the 31st lands on the
+    last day of shorter months. Returns (payoff dates, installments left);
+    a loan with no next due date or no payment gets (None, 0)."""
+    if len(next_due_dates) == 0:
+        return [], []
+    due = np.array(
+        [d if d is not None else "NaT" for d in next_due_dates], dtype="datetime64[D]"
+    )
+    remaining = np.asarray(remaining, dtype=float)
+    payment = np.asarray(monthly_payment, dtype=float)
+
+    payable = ~np.isnat(due) & (payment > 0) & (remaining > CENTAVO)
+    left = np.where(
+        payable, np.ceil((remaining - CENTAVO) / np.where(payable, payment, 1)), 0
+    ).astype(int)
+
+    # Step whole months from the next due date, then clamp the day of month
+    month = due.astype("datetime64[M]") + np.maximum(left - 1, 0)
+    first_day = month.astype("datetime64[D]")
+    month_length = ((month + 1).astype("datetime64[D]") - first_day).astype(int)
+    day_offset = np.minimum(np.asarray(due_days, dtype=int), month_length) - 1
+    payoff = np.where(payable, first_day + day_offset, np.datetime64("NaT"))
+
+    return payoff.astype("datetime64[D]").tolist(), left.tolist()
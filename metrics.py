@@ -0,0 +1,359 @@
+import hmac
+import json
+import threading
+import time
+from bisect import bisect_left
+
+from flask import (
+    Response,
+    abort,
+    current_app,
+    g,
+    has_request_context,
+    request,
+    session,
+)
+
+# Upper bounds (seconds / statements) of the histogram buckets; +Inf is implied
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SQL_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+
+
+# ==========================================
+# 1. METRIC TYPES
+# ==========================================
+
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, label_values=(), amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for label_values, value in sorted(self.values.items()):
+                lines.append(
+                    f"{self.name}{format_labels(self.labels, label_values)} {value:g}"
+                )
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.labels = labels
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [
+                    [0] * (len(self.buckets) + 1),
+                    0.0,
+                    0,
+                ]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram",
+        ]
+        bucket_labels = self.labels + ("le",)
+        with self.lock:
+            for label_values, (counts, total, count) in sorted(self.series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += n
+                    le = bound if bound == "+Inf" else f"{bound:g}"
+                    labels = format_labels(bucket_labels, label_values + (le,))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = format_labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {total:g}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def gauge(name, help_text, samples, labels=(), kind="gauge"):
+    """Lines for a value read at scrape time. `samples` is a list of
+    (label values, value)."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for label_values, value in samples:
+        lines.append(f"{name}{format_labels(labels, label_values)} {value:g}")
+    return lines
+
+
+# ==========================================
+# 2. REGISTRY
+# ==========================================
+
+REQUEST_SECONDS = Histogram(
+    "limoney_request_duration_seconds",
+    "Request latency by endpoint (streamed responses until the stream ends).",
+    REQUEST_BUCKETS,
+    ("endpoint", "method"),
+)
+REQUESTS = Counter(
+    "limoney_requests_total",
+    "Requests by endpoint and status code.",
+    ("endpoint", "method", "status"),
+)
+SQL_STATEMENTS = Histogram(
+    "limoney_request_sql_statements",
+    "SQL statements issued per request.",
+    SQL_COUNT_BUCKETS,
+    ("endpoint",),
+)
+SQL_SECONDS = Counter(
+    "limoney_sql_seconds_total",
+    "Time spent executing SQL, by endpoint (background work has none).",
+    ("endpoint",),
+)
+LLM_SECONDS = Histogram(
+    "limoney_llm_duration_seconds",
+    "LLM call latency (stream_first_token: time to the first streamed token).",
+    LLM_BUCKETS,
+    ("call", "outcome"),
+)
+SLOW_REQUESTS = Counter(
+    "limoney_slow_requests_total",
+    "Requests over the slow-request threshold.",
+    ("endpoint",),
+)
+
+METRICS = (
+    REQUEST_SECONDS,
+    REQUESTS,
+    SQL_STATEMENTS,
+    SQL_SECONDS,
+    LLM_SECONDS,
+    SLOW_REQUESTS,
+)
+
+
+def observe_llm(call, started, outcome="ok"):
+    """Records one LLM call that began at time.perf_counter() `started`."""
+    LLM_SECONDS.observe((call, outcome), time.perf_counter() - started)
+
+
+def endpoint_label():
+    # Endpoint names, not paths, so ids in URLs don't explode the series
+    return request.endpoint or "unmatched"
+
+
+def log_event(event, **fields):
+    # One JSON object per line, so log tooling can filter on the fields
+    print(json.dumps({"event": event, **fields}), flush=True)
+
+
+# ==========================================
+# 3. HOOKS
+# ==========================================
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's own context, so a failed statement (which never
+    # reaches after_cursor_execute) can't skew the next one's timing
+    if context is not None:
+        context.metrics_started = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context() or "metrics_started" not in g:
+        return
+    g.sql_statements += 1
+    started = getattr(context, "metrics_started", None)
+    if started is not None:
+        g.sql_seconds += time.perf_counter() - started
+
+
+def start_request():
+    g.metrics_started = time.perf_counter()
+    g.sql_statements = 0
+    g.sql_seconds = 0.0
+
+
+def remember_status(response):
+    g.metrics_status = response.status_code
+    return response
+
+
+def finish_request(error=None):
+    if "metrics_started" not in g:
+        return
+    elapsed = time.perf_counter() - g.metrics_started
+    endpoint = endpoint_label()
+    status = g.get("metrics_status", 500)
+
+    REQUEST_SECONDS.observe((endpoint, request.method), elapsed)
+    REQUESTS.inc((endpoint, request.method, str(status)))
+    SQL_STATEMENTS.observe((endpoint,), g.sql_statements)
+    SQL_SECONDS.inc((endpoint,), g.sql_seconds)
+
+    if elapsed * 1000 >= current_app.config.get("SLOW_REQUEST_MS", 1000):
+        SLOW_REQUESTS.inc((endpoint,))
+        log_event(
+            "slow_request",
+            endpoint=endpoint,
+            method=request.method,
+            path=request.path,
+            status=status,
+            duration_ms=round(elapsed * 1000, 1),
+            sql_statements=g.sql_statements,
+            sql_ms=round(g.sql_seconds * 1000, 1),
+            user_id=session.get("user_id"),
+        )
+
+
+# ==========================================
+# 4. EXPOSITION
+# ==========================================
+
+
+def app_stats_lines():
+    """The counters other modules keep in their own `stats`, read at
+    scrape time."""
+    import ai_cache
+    import allocator
+    import jobs
+    import llm_client
+    import view_cache
+
+    lines = []
+    views = view_cache.stats
+    for kind in ("hits", "misses"):
+        lines += gauge(
+            f"limoney_view_cache_{kind}_total",
+            f"Cached page view {kind}.",
+            [((view,), n) for view, n in sorted(views[kind].items())],
+            ("view",),
+            kind="counter",
+        )
+    lines += gauge(
+        "limoney_view_cache_hit_ratio",
+        "Share of cached page view lookups served from the cache.",
+        [((), view_cache.get_stats()["hit_rate"])],
+    )
+
+    ai = ai_cache.get_stats()
+    lines += gauge(
+        "limoney_ai_cache_lookups_total",
+        "AI allocation cache lookups by result.",
+        [(("hit",), ai["hits"]), (("miss",), ai["misses"])],
+        ("result",),
+        kind="counter",
+    )
+    lines += gauge(
+        "limoney_ai_cache_hit_ratio",
+        "Share of AI allocation lookups served from the cache.",
+        [((), ai["hit_rate"])],
+    )
+    lines += gauge(
+        "limoney_ai_cache_saved_seconds_total",
+        "LLM time avoided by AI cache hits.",
+        [((), ai["saved_seconds"])],
+        kind="counter",
+    )
+
+    solved = allocator.get_stats()
+    lines += gauge(
+        "limoney_chat_edits_total",
+        "Smart budget chat edits by who solved them.",
+        [(("local",), solved["local"]), (("llm",), solved["llm"])],
+        ("solver",),
+        kind="counter",
+    )
+
+    job = jobs.get_stats()
+    lines += gauge(
+        "limoney_jobs_finished_total",
+        "Background AI jobs finished in this process.",
+        [(("done",), job["completed"]), (("failed",), job["failed"])],
+        ("status",),
+        kind="counter",
+    )
+    lines += gauge(
+        "limoney_jobs_in_flight",
+        "Background AI jobs queued or running in this process.",
+        [((), job["in_flight"])],
+    )
+    for phase in ("wait", "run"):
+        lines += gauge(
+            f"limoney_jobs_{phase}_seconds_total",
+            f"Total job {phase} time in this process.",
+            [((), job[f"{phase}_seconds"])],
+            kind="counter",
+        )
+
+    lines += gauge(
+        "limoney_llm_breaker_open",
+        "1 while the LLM circuit breaker rejects calls.",
+        [((), 1 if llm_client.breaker.state == "open" else 0)],
+    )
+    return lines
+
+
+def render():
+    lines = []
+    for metric in METRICS:
+        lines += metric.render()
+    lines += app_stats_lines()
+    return "\n".join(lines) + "\n"
+
+
+def init_metrics(app):
+    """Installs the request/SQL hooks and the /metrics endpoint.
+
+    Numbers are per process: with several gunicorn workers each scrape sees
+    the worker that served it, so scrape the workers individually (or run
+    one) when exact totals matter. Scrapers send METRICS_TOKEN as
+    `Authorization: Bearer <token>`; with no token set the endpoint is
+    hidden (404) unless METRICS_PUBLIC is on."""
+    from app import db
+
+    with app.app_context():
+        db.event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        db.event.listen(db.engine, "after_cursor_execute", after_cursor_execute)
+    app.before_request(start_request)
+    app.after_request(remember_status)
+    app.teardown_request(finish_request)
+
+    @app.route("/metrics")
+    def metrics():
+        token = app.config.get("METRICS_TOKEN")
+        if not token and not app.config.get("METRICS_PUBLIC"):
+            abort(404)
+        # Constant-time, so response timing doesn't leak the token; bytes, since
+        # compare_digest rejects non-ASCII str
+        if token and not hmac.compare_digest(
+            request.headers.get("Authorization", "").encode(),
+            f"Bearer {token}".encode(),
+        ):
+            return Response("Unauthorized\n", status=401, mimetype="text/plain")
+        return Response(render(), mimetype="text/plain; version=0.0.4")
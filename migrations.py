@@ -0,0 +1,540 @@
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+from app import db  # Importing db from your app.py
+
+# ==========================================
+# 1. BOOKKEEPING TABLES
+# ==========================================
+
+# Rows touched per transaction while backfilling big tables
+BACKFILL_CHUNK_SIZE = 5000
+
+
+class SchemaVersion(db.Model):
+    __tablename__ = "schema_version"
+    version = db.Column(db.Integer, primary_key=True)
+    description = db.Column(db.String(200))
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class MigrationCursor(db.Model):
+    """Remembers how far a chunked backfill got, so a killed deploy resumes
+    where it stopped instead of starting over."""
+
+    __tablename__ = "migration_cursors"
+    name = db.Column(db.String(100), primary_key=True)
+    last_id = db.Column(db.Integer, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# ==========================================
+# 2. REVISION REGISTRY
+# ==========================================
+
+REVISIONS = []
+
+
+def revision(number, description):
+    """Registers an upgrade function under a schema version number.
+
+    Upgrades must be idempotent: databases created by the old
+    db.create_all() call may already have some of the changes."""
+
+    def decorator(fn):
+        REVISIONS.append((number, description, fn))
+        REVISIONS.sort(key=lambda r: r[0])
+        return fn
+
+    return decorator
+
+
+# ==========================================
+# 3. SCHEMA HELPERS
+# ==========================================
+
+
+def has_column(table_name, column_name):
+    columns = db.inspect(db.engine).get_columns(table_name)
+    return any(c["name"] == column_name for c in columns)
+
+
+def add_column(table_name, column):
+    """Adds `column` (a db.Column) to an existing table if it is missing."""
+    if has_column(table_name, column.name):
+        print(f"   -> Column '{table_name}.{column.name}' already exists.")
+        return
+    col_type = column.type.compile(dialect=db.engine.dialect)
+    with db.engine.begin() as conn:
+        conn.execute(
+            db.text(f"ALTER TABLE {table_name} ADD COLUMN {column.name} {col_type}")
+        )
+    print(f"   -> Added '{table_name}.{column.name}' column.")
+
+
+def add_index(index):
+    """Creates `index` (a db.Index bound to a model table) if it is missing.
+    On PostgreSQL the build runs CONCURRENTLY so writes are not blocked."""
+    table_name = index.table.name
+    existing = {i["name"] for i in db.inspect(db.engine).get_indexes(table_name)}
+    if index.name in existing:
+        print(f"   -> Index '{index.name}' already exists.")
+        return
+
+    if db.engine.dialect.name == "postgresql":
+        ddl = str(db.schema.CreateIndex(index).compile(dialect=db.engine.dialect))
+        ddl = ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)
+        with db.engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as conn:
+            conn.execute(db.text(ddl))
+    else:
+        index.create(db.engine)
+    print(f"   -> Created index '{index.name}'.")
+
+
+def frozen_index(name, table_name, *columns, **kwargs):
+    """A db.Index spelled out by name and columns on a stand-in table, so a
+    revision keeps creating exactly the index it shipped with. Revisions
+    must not read indexes off the models: those describe the latest schema,
+    including columns that later revisions add."""
+    include = kwargs.get("postgresql_include", [])
+    table = db.Table(
+        table_name,
+        db.MetaData(),
+        *(db.Column(c) for c in dict.fromkeys(list(columns) + list(include))),
+    )
+    return db.Index(name, *(table.c[c] for c in columns), **kwargs)
+
+
+def text_to_date(column):
+    """SQL expression turning a 'YYYY-MM-DD' string column into a DATE
+    (NULL for blanks; SQLite's date() also NULLs anything unparseable)."""
+    if db.engine.dialect.name == "sqlite":
+        return db.func.date(column)
+    return db.cast(db.func.nullif(column, ""), db.Date)
+
+
+def backfill_in_chunks(name, table, values, where, chunk_size=BACKFILL_CHUNK_SIZE):
+    """Runs UPDATE table SET values WHERE where, one primary-key range at a
+    time, committing after every chunk. Progress is stored under `name` in
+    migration_cursors so an interrupted run picks up where it left off."""
+    cursor = db.session.get(MigrationCursor, name)
+    if cursor is None:
+        cursor = MigrationCursor(name=name, last_id=0)
+        db.session.add(cursor)
+        db.session.commit()
+
+    total = 0
+    while True:
+        ids = (
+            db.session.execute(
+                db.select(table.c.id)
+                .where(table.c.id > cursor.last_id, where)
+                .order_by(table.c.id)
+                .limit(chunk_size)
+            )
+            .scalars()
+            .all()
+        )
+        if not ids:
+            break
+
+        db.session.execute(
+            table.update()
+            .where(table.c.id >= ids[0], table.c.id <= ids[-1], where)
+            .values(**values)
+        )
+        cursor.last_id = ids[-1]
+        cursor.updated_at = datetime.utcnow()
+        db.session.commit()
+
+        total += len(ids)
+        print(f"   -> {name}: {total} rows backfilled (cursor at id {ids[-1]})")
+
+    return total
+
+
+# ==========================================
+# 4. REVISIONS
+# ==========================================
+
+
+@revision(1, "Baseline tables")
+def create_baseline_tables():
+    import models  # noqa: F401  (registers every model on db.metadata)
+
+    db.create_all()
+
+
+@revision(2, "Add and backfill loan_payments.created_at")
+def loan_payment_created_at():
+    import models
+
+    add_column("loan_payments", db.Column("created_at", db.DateTime))
+    table = models.LoanPayment.__table__
+    backfill_in_chunks(
+        "loan_payments.created_at",
+        table,
+        {"created_at": db.func.current_timestamp()},
+        table.c.created_at.is_(None),
+    )
+
+
+@revision(3, "Add salary_budgets.ai_reasoning")
+def salary_budget_ai_reasoning():
+    add_column("salary_budgets", db.Column("ai_reasoning", db.Text))
+
+
+@revision(4, "Per-user composite indexes for hot queries")
+def hot_query_indexes():
+    indexes = (
+        frozen_index(
+            "ix_transactions_user_type_amount",
+            "transactions",
+            "user_id",
+            "type",
+            "amount",
+        ),
+        frozen_index("ix_loans_user_id", "loans", "user_id"),
+        frozen_index(
+            "ix_loan_payments_loan_created",
+            "loan_payments",
+            "loan_id",
+            "created_at",
+            postgresql_include=["amount"],
+        ),
+        frozen_index(
+            "ix_loan_payments_user_loan_amount",
+            "loan_payments",
+            "user_id",
+            "loan_id",
+            "amount",
+        ),
+        frozen_index("ix_savings_user_id", "savings", "user_id"),
+        frozen_index(
+            "ix_savings_transactions_goal_timestamp",
+            "savings_transactions",
+            "savings_id",
+            "timestamp",
+            "id",
+        ),
+        frozen_index(
+            "ix_budget_categories_user_name",
+            "budget_categories",
+            "user_id",
+            "name",
+        ),
+        frozen_index(
+            "ix_budget_transactions_user_created",
+            "budget_transactions",
+            "user_id",
+            "created_at",
+        ),
+        frozen_index(
+            "ix_budget_transactions_user_category_amount",
+            "budget_transactions",
+            "user_id",
+            "category_id",
+            "amount",
+        ),
+        frozen_index(
+            "ix_budget_transactions_user_type_amount",
+            "budget_transactions",
+            "user_id",
+            "expense_type",
+            "amount",
+        ),
+        frozen_index("ix_cards_user_id", "cards", "user_id"),
+        frozen_index(
+            "ix_salary_budgets_user_created",
+            "salary_budgets",
+            "user_id",
+            "created_at",
+        ),
+        frozen_index(
+            "ix_salary_budget_items_budget_id",
+            "salary_budget_items",
+            "budget_id",
+        ),
+    )
+    for index in indexes:
+        add_index(index)
+
+
+@revision(5, "Per-user balance ledger tables")
+def balance_ledger_tables():
+    import models
+
+    # Ledger rows are built lazily on first use, so no backfill is needed here
+    models.UserLedger.__table__.create(db.engine, checkfirst=True)
+    models.LedgerCheckpoint.__table__.create(db.engine, checkfirst=True)
+
+
+@revision(6, "Add transactions.created_at and keyset index")
+def transaction_created_at():
+    # Older rows keep a NULL timestamp; pages order transactions by id
+    add_column("transactions", db.Column("created_at", db.DateTime))
+    add_index(
+        frozen_index("ix_transactions_user_id_id", "transactions", "user_id", "id")
+    )
+
+
+@revision(7, "Background AI job table")
+def ai_jobs_table():
+    import models
+
+    models.AIJob.__table__.create(db.engine, checkfirst=True)
+
+
+@revision(8, "Loan installment schedules and next due dates")
+def loan_schedules():
+    import models
+
+    add_column("loans", db.Column("next_due_date", db.Date))
+    models.LoanInstallment.__table__.create(db.engine, checkfirst=True)
+    add_index(
+        frozen_index("ix_loans_user_next_due", "loans", "user_id", "next_due_date")
+    )
+
+    # Schedules are built by revision 9 once the loan dates are DATEs
+
+
+@revision(9, "Native DATE columns for loan and payment dates")
+def loan_date_columns():
+    import models
+
+    # New columns are filled next to the old strings in committed chunks
+    # rather than retyped in place, which would rewrite and lock the tables
+    converted = (
+        ("loans", "start_date", "start_on"),
+        ("loans", "end_date", "end_on"),
+        ("loan_payments", "pay_date", "paid_on"),
+    )
+    for table_name, old, new in converted:
+        add_column(table_name, db.Column(new, db.Date))
+        if not has_column(table_name, old):
+            continue  # created after the switch; nothing to copy
+        table = db.table(table_name, db.column("id"), db.column(old), db.column(new))
+        backfill_in_chunks(
+            f"{table_name}.{new}",
+            table,
+            {new: text_to_date(table.c[old])},
+            db.and_(table.c[new].is_(None), table.c[old].isnot(None)),
+        )
+    # Period totals (this month, a date range) as index range scans
+    for name, lead in (
+        ("ix_loan_payments_loan_paid_on", "loan_id"),
+        ("ix_loan_payments_user_paid_on", "user_id"),
+    ):
+        add_index(frozen_index(name, "loan_payments", lead, "paid_on", "amount"))
+
+    # Loan schedules (revision 8) need the typed dates. Rebuilding is
+    # idempotent, so rerunning this is harmless
+    last_id = 0
+    while True:
+        loans = (
+            models.Loan.query.filter(models.Loan.id > last_id)
+            .order_by(models.Loan.id)
+            .limit(BACKFILL_CHUNK_SIZE)
+            .all()
+        )
+        if not loans:
+            break
+        for loan in loans:
+            models.schedule_loan(loan)
+        db.session.commit()
+        last_id = loans[-1].id
+        print(f"   -> Scheduled loans up to id {last_id}")
+
+
+@revision(10, "Monthly budget rollups")
+def budget_rollups():
+    import models
+
+    models.BudgetRollup.__table__.create(db.engine, checkfirst=True)
+    add_index(
+        frozen_index(
+            "ix_budget_rollups_user_month",
+            "budget_monthly_rollups",
+            "user_id",
+            "month",
+        )
+    )
+    user_ids = (
+        db.session.execute(db.select(models.BudgetTransaction.user_id).distinct())
+        .scalars()
+        .all()
+    )
+    for uid in user_ids:
+        # One commit per user keeps each rebuild's delete + insert atomic
+        models.rebuild_rollups(uid)
+    print(f"   -> Built rollups for {len(user_ids)} user(s)")
+
+
+# ==========================================
+# 5. RUNNER
+# ==========================================
+
+
+def current_version():
+    SchemaVersion.__table__.create(db.engine, checkfirst=True)
+    return db.session.query(db.func.max(SchemaVersion.version)).scalar() or 0
+
+
+def pending_revisions():
+    version = current_version()
+    return [r for r in REVISIONS if r[0] > version]
+
+
+def upgrade(target=None):
+    """Applies every pending revision up to `target` (default: latest)."""
+    applied = 0
+    for number, description, fn in pending_revisions():
+        if target is not None and number > target:
+            break
+        print(f"📝 Applying revision {number}: {description}...")
+        fn()
+        db.session.add(SchemaVersion(version=number, description=description))
+        db.session.commit()
+        applied += 1
+
+    print(f"✅ Database schema at version {current_version()}")
+    return applied
+
+
+def find_full_scans(user_id):
+    """Runs every per-user hot query for `user_id`, EXPLAINs each captured
+    statement and returns (sql, plan line) pairs that scan a whole table.
+    Meant for a database seeded with a realistic amount of data; planners
+    happily seq-scan tiny tables."""
+    import models
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    db.event.listen(db.engine, "before_cursor_execute", capture)
+    try:
+        models.get_dashboard_snapshot(user_id)
+        models.get_loan_payment_histories(user_id)
+        models.get_recent_savings_transactions(user_id)
+        models.get_category_summary(user_id)
+        models.get_budget_transactions(user_id)
+        models.get_expense_totals_by_type(user_id)
+        models.get_user_budgets(user_id)
+    finally:
+        db.event.remove(db.engine, "before_cursor_execute", capture)
+
+    table_names = set(db.metadata.tables)
+    postgres = db.engine.dialect.name == "postgresql"
+    prefix = "EXPLAIN " if postgres else "EXPLAIN QUERY PLAN "
+
+    scans = []
+    with db.engine.connect() as conn:
+        for statement, parameters in captured:
+            plan = conn.exec_driver_sql(prefix + statement, parameters).all()
+            for row in plan:
+                line = str(row[-1])
+                words = line.replace("->", "").split()
+                if postgres and "Seq Scan on" in line:
+                    scanned = words[words.index("on") + 1]
+                elif not postgres and words[:1] == ["SCAN"] and len(words) == 2:
+                    scanned = words[1]
+                else:
+                    continue
+                if scanned in table_names:
+                    scans.append((statement, line.strip()))
+    return scans
+
+
+def init_cli(app):
+    db_cli = AppGroup("db", help="Database schema migrations.")
+
+    @db_cli.command("upgrade")
+    @click.option("--target", type=int, default=None, help="Stop at this version.")
+    def upgrade_command(target):
+        """Apply pending schema revisions."""
+        upgrade(target)
+
+    @db_cli.command("current")
+    def current_command():
+        """Show the recorded schema version."""
+        click.echo(current_version())
+
+    @db_cli.command("history")
+    def history_command():
+        """List every revision and whether it is applied."""
+        version = current_version()
+        for number, description, _ in REVISIONS:
+            mark = "applied" if number <= version else "pending"
+            click.echo(f"{number:>4}  {mark:<8} {description}")
+
+    @db_cli.command("explain")
+    @click.option("--user-id", type=int, required=True, help="User to plan for.")
+    def explain_command(user_id):
+        """Fail if any per-user hot query falls back to a full table scan."""
+        scans = find_full_scans(user_id)
+        for statement, line in scans:
+            click.echo(f"❌ {line}\n   {' '.join(statement.split())[:200]}")
+        if scans:
+            raise SystemExit(1)
+        click.echo("✅ Every hot query is served by an index.")
+
+    @db_cli.command("rebuild-ledger")
+    @click.option("--user-id", type=int, default=None, help="Only this user.")
+    def rebuild_ledger_command(user_id):
+        """Recompute balance ledgers from raw rows."""
+        import models
+
+        if user_id is not None:
+            user_ids = [user_id]
+        else:
+            user_ids = db.session.execute(db.select(models.User.id)).scalars().all()
+        for uid in user_ids:
+            ledger = models.rebuild_ledger(uid)
+            click.echo(f"   -> user {uid}: cash balance {ledger['cash_balance']:.2f}")
+        click.echo(f"✅ Rebuilt {len(user_ids)} ledger(s)")
+
+    def budget_user_ids(user_id):
+        import models
+
+        if user_id is not None:
+            return [user_id]
+        return (
+            db.session.execute(db.select(models.BudgetTransaction.user_id).distinct())
+            .scalars()
+            .all()
+        )
+
+    @db_cli.command("rebuild-rollups")
+    @click.option("--user-id", type=int, default=None, help="Only this user.")
+    def rebuild_rollups_command(user_id):
+        """Recompute monthly budget rollups from raw rows."""
+        import models
+
+        user_ids = budget_user_ids(user_id)
+        for uid in user_ids:
+            buckets = models.rebuild_rollups(uid)
+            click.echo(f"   -> user {uid}: {buckets} month bucket(s)")
+        click.echo(f"✅ Rebuilt rollups for {len(user_ids)} user(s)")
+
+    @db_cli.command("verify-rollups")
+    @click.option("--user-id", type=int, default=None, help="Only this user.")
+    def verify_rollups_command(user_id):
+        """Fail if any monthly budget rollup disagrees with raw rows."""
+        import models
+
+        bad = 0
+        for uid in budget_user_ids(user_id):
+            for bucket, stored, actual in models.verify_rollups(uid):
+                bad += 1
+                click.echo(f"❌ user {uid} {bucket}: stored {stored}, actual {actual}")
+        if bad:
+            raise SystemExit(1)
+        click.echo("✅ Rollups match budget transactions.")
+
+    app.cli.add_command(db_cli)
@@ -1,6 +1,18 @@
-from datetime import datetime
+import base64
+import json
+from datetime import date, datetime
+from sqlalchemy.dialects import postgresql, sqlite
 from werkzeug.security import generate_password_hash, check_password_hash
 from app import db  # Importing db from your app.py
+import loan_schedule
+import view_cache
+
+# Cached views (see view_cache.py) that each kind of write makes stale
+TRANSACTION_VIEWS = ("dashboard",)
+LOAN_VIEWS = ("dashboard", "loan_tracker")
+SAVINGS_VIEWS = ("dashboard", "savings", "budget")
+BUDGET_VIEWS = ("budget",)
+CARD_VIEWS = ("dashboard",)
 
 # ==========================================
 # 1. DATABASE TABLES (SQLAlchemy Models)
@@ -17,40 +29,88 @@ class User(db.Model):
 
 class Transaction(db.Model):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Covers the per-user balance SUM used to rebuild the ledger
+        db.Index("ix_transactions_user_type_amount", "user_id", "type", "amount"),
+        # Newest-first keyset pages
+        db.Index("ix_transactions_user_id_id", "user_id", "id"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     description = db.Column(db.String(200))
     amount = db.Column(db.Float, nullable=False)
     type = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
 class Loan(db.Model):
     __tablename__ = "loans"
+    __table_args__ = (
+        db.Index("ix_loans_user_id", "user_id"),
+        # Nearest due date across a user's loans (dashboard reminder)
+        db.Index("ix_loans_user_next_due", "user_id", "next_due_date"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     loan_name = db.Column(db.String(100))
     amount = db.Column(db.Float)
-    start_date = db.Column(db.String(20))
-    end_date = db.Column(db.String(20))
+    # DATE columns replacing the old start_date/end_date strings (migration 9)
+    start_date = db.Column("start_on", db.Date)
+    end_date = db.Column("end_on", db.Date)
     monthly_payment = db.Column(db.Float)
     notes = db.Column(db.Text)
     paid_amount = db.Column(db.Float, default=0)
     status = db.Column(db.String(20), default="active")
+    # First installment not yet covered by payments; NULL once settled.
+    # Kept current by schedule_loan() and refresh_next_due()
+    next_due_date = db.Column(db.Date, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
+class LoanInstallment(db.Model):
+    """One due date of a loan's repayment schedule (see loan_schedule.py),
+    generated when the loan is written rather than on every page view."""
+
+    __tablename__ = "loan_installments"
+    __table_args__ = (
+        db.Index("ix_loan_installments_loan_seq", "loan_id", "seq"),
+        db.Index("ix_loan_installments_user_due", "user_id", "due_date"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    loan_id = db.Column(db.Integer, db.ForeignKey("loans.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    due_date = db.Column(db.Date, nullable=False)
+    amount_due = db.Column(db.Float, nullable=False)
+    cumulative_due = db.Column(db.Float, nullable=False)
+    balance_after = db.Column(db.Float, nullable=False)
+
+
 class LoanPayment(db.Model):
     __tablename__ = "loan_payments"
+    __table_args__ = (
+        db.Index(
+            "ix_loan_payments_loan_created",
+            "loan_id",
+            "created_at",
+            postgresql_include=["amount"],
+        ),
+        db.Index("ix_loan_payments_user_loan_amount", "user_id", "loan_id", "amount"),
+        # Period totals (this month, a date range) as index range scans
+        db.Index("ix_loan_payments_loan_paid_on", "loan_id", "paid_on", "amount"),
+        db.Index("ix_loan_payments_user_paid_on", "user_id", "paid_on", "amount"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     loan_id = db.Column(db.Integer, db.ForeignKey("loans.id"), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     amount = db.Column(db.Float)
-    pay_date = db.Column(db.String(20))
+    pay_date = db.Column("paid_on", db.Date)  # was the pay_date string
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
 class Savings(db.Model):
     __tablename__ = "savings"
+    __table_args__ = (db.Index("ix_savings_user_id", "user_id"),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     savings_name = db.Column(db.String(100), nullable=False)
@@ -61,6 +121,11 @@ class Savings(db.Model):
 
 class SavingsTransaction(db.Model):
     __tablename__ = "savings_transactions"
+    __table_args__ = (
+        db.Index(
+            "ix_savings_transactions_goal_timestamp", "savings_id", "timestamp", "id"
+        ),
+    )
     id = db.Column(db.Integer, primary_key=True)
     savings_id = db.Column(db.Integer, db.ForeignKey("savings.id"), nullable=False)
     type = db.Column(db.String(20))
@@ -71,6 +136,9 @@ class SavingsTransaction(db.Model):
 
 class BudgetCategory(db.Model):
     __tablename__ = "budget_categories"
+    __table_args__ = (
+        db.Index("ix_budget_categories_user_name", "user_id", "name"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     name = db.Column(db.String(100), nullable=False)
@@ -80,6 +148,21 @@ class BudgetCategory(db.Model):
 
 class BudgetTransaction(db.Model):
     __tablename__ = "budget_transactions"
+    __table_args__ = (
+        db.Index("ix_budget_transactions_user_created", "user_id", "created_at"),
+        db.Index(
+            "ix_budget_transactions_user_category_amount",
+            "user_id",
+            "category_id",
+            "amount",
+        ),
+        db.Index(
+            "ix_budget_transactions_user_type_amount",
+            "user_id",
+            "expense_type",
+            "amount",
+        ),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     category_id = db.Column(
@@ -113,6 +196,7 @@ class UserProfile(db.Model):
 
 class Card(db.Model):
     __tablename__ = "cards"
+    __table_args__ = (db.Index("ix_cards_user_id", "user_id"),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
     bank_name = db.Column(db.String(100))
@@ -127,7 +211,71 @@ class Card(db.Model):
 def to_dict(obj):
     if not obj:
         return None
-    return {c.name: getattr(obj, c.name) for c in obj.__table__.columns}
+    # Attribute names, which differ from column names for the loan dates
+    return {a.key: getattr(obj, a.key) for a in obj.__mapper__.column_attrs}
+
+
+# --- Helper: Keyset (cursor) Pagination ---
+PAGE_SIZE = 20
+
+
+def encode_cursor(sort_value, row_id):
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    sort_value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if isinstance(sort_value, str):
+        sort_value = datetime.fromisoformat(sort_value)
+    return sort_value, int(row_id)
+
+
+def paginate_keyset(query, id_col, sort_col=None, cursor=None, limit=PAGE_SIZE):
+    """Returns (rows, next_cursor) for one newest-first page of `query`.
+
+    Rows are ordered by (sort_col DESC, id DESC), or by id alone when no
+    sort_col is given, and each page seeks past the last row of the previous
+    one instead of using OFFSET, so every page costs the same to fetch.
+    Rows with a NULL sort_col (legacy rows without a timestamp) come last on
+    every dialect. A ValueError is raised for a malformed cursor."""
+    if cursor:
+        try:
+            sort_value, last_id = decode_cursor(cursor)
+        except Exception:
+            raise ValueError("Invalid cursor")
+        if sort_col is None:
+            query = query.filter(id_col < last_id)
+        elif sort_value is None:
+            # Already into the NULL tail, which is ordered by id alone
+            query = query.filter(sort_col.is_(None), id_col < last_id)
+        else:
+            # Comparisons with NULL are never true, so the tail needs its
+            # own branch or paging would stop before reaching it
+            query = query.filter(
+                db.or_(
+                    sort_col < sort_value,
+                    db.and_(sort_col == sort_value, id_col < last_id),
+                    sort_col.is_(None),
+                )
+            )
+    if sort_col is None:
+        order = [id_col.desc()]
+    else:
+        order = [sort_col.desc().nulls_last(), id_col.desc()]
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        # Multi-entity queries return (Model, extra...) rows
+        entity = last[0] if hasattr(last, "_fields") else last
+        sort_value = getattr(entity, sort_col.key) if sort_col is not None else None
+        next_cursor = encode_cursor(sort_value, getattr(entity, id_col.key))
+    return rows, next_cursor
 
 
 # ==========================================
@@ -160,8 +308,10 @@ def verify_user(username, password):
 
 
 def init_db():
-    # Handled automatically in app.py now
-    pass
+    # Schema is managed by the numbered revisions in migrations.py now
+    import migrations
+
+    migrations.upgrade()
 
 
 # ==========================================
@@ -174,12 +324,24 @@ def get_transactions(user_id):
     return [to_dict(t) for t in txns]
 
 
+def get_transactions_page(user_id, cursor=None, limit=PAGE_SIZE):
+    query = Transaction.query.filter_by(user_id=user_id)
+    rows, next_cursor = paginate_keyset(
+        query, Transaction.id, cursor=cursor, limit=limit
+    )
+    return {"items": [to_dict(t) for t in rows], "next_cursor": next_cursor}
+
+
 def add_transaction(user_id, description, amount, t_type):
     new_txn = Transaction(
         user_id=user_id, description=description, amount=amount, type=t_type
     )
     db.session.add(new_txn)
+    record_ledger_entry(
+        user_id, cash_balance=amount if t_type == "income" else -amount
+    )
     db.session.commit()
+    view_cache.invalidate(user_id, *TRANSACTION_VIEWS)
 
 
 # ==========================================
@@ -192,14 +354,48 @@ def add_loan(user_id, loan_name, amount, start_date, end_date, monthly_payment,
         user_id=user_id,
         loan_name=loan_name,
         amount=amount,
-        start_date=start_date,
-        end_date=end_date,
+        start_date=loan_schedule.parse_date(start_date),
+        end_date=loan_schedule.parse_date(end_date),
         monthly_payment=monthly_payment,
         notes=notes,
         status="active",
     )
     db.session.add(new_loan)
+    db.session.flush()
+    schedule_loan(new_loan)
     db.session.commit()
+    view_cache.invalidate(user_id, *LOAN_VIEWS)
+
+
+def schedule_loan(loan):
+    """(Re)builds a loan's installments and next due date. Call whenever the
+    amount, dates or monthly payment change; the caller commits."""
+    LoanInstallment.query.filter_by(loan_id=loan.id).delete()
+    installments = loan_schedule.build_schedule(
+        loan.amount or 0, loan.monthly_payment or 0, loan.start_date, loan.end_date
+    )
+    db.session.add_all(
+        LoanInstallment(loan_id=loan.id, user_id=loan.user_id, **row)
+        for row in installments
+    )
+    loan.next_due_date = loan_schedule.next_due(
+        installments, get_total_loan_payments(loan.id)
+    )
+
+
+def refresh_next_due(loan):
+    """Moves next_due_date past the installments the payments now cover.
+    One indexed lookup; the caller commits."""
+    paid = get_total_loan_payments(loan.id)
+    loan.next_due_date = db.session.execute(
+        db.select(LoanInstallment.due_date)
+        .where(
+            LoanInstallment.loan_id == loan.id,
+            LoanInstallment.cumulative_due > paid + loan_schedule.CENTAVO,
+        )
+        .order_by(LoanInstallment.seq)
+        .limit(1)
+    ).scalar()
 
 
 def get_loans(user_id):
@@ -217,13 +413,16 @@ def pay_loan(loan_id, monthly_payment):
     if loan:
         loan.paid_amount += monthly_payment
         db.session.commit()
+        view_cache.invalidate(loan.user_id, *LOAN_VIEWS)
 
 
 def delete_loan(loan_id):
     loan = Loan.query.get(loan_id)
     if loan:
+        LoanInstallment.query.filter_by(loan_id=loan_id).delete()
         db.session.delete(loan)
         db.session.commit()
+        view_cache.invalidate(loan.user_id, *LOAN_VIEWS)
 
 
 def update_loan_status(loan_id, status):
@@ -231,14 +430,24 @@ def update_loan_status(loan_id, status):
     if loan:
         loan.status = status
         db.session.commit()
+        view_cache.invalidate(loan.user_id, *LOAN_VIEWS)
 
 
 def add_loan_payment(loan_id, user_id, amount, pay_date):
     payment = LoanPayment(
-        loan_id=loan_id, user_id=user_id, amount=amount, pay_date=pay_date
+        loan_id=loan_id,
+        user_id=user_id,
+        amount=amount,
+        pay_date=loan_schedule.parse_date(pay_date),
     )
     db.session.add(payment)
+    db.session.flush()
+    loan = db.session.get(Loan, loan_id)
+    if loan:
+        refresh_next_due(loan)
+    record_ledger_entry(user_id, loan_paid=amount)
     db.session.commit()
+    view_cache.invalidate(user_id, *LOAN_VIEWS)
 
 
 def get_loan_payments(loan_id):
@@ -250,6 +459,14 @@ def get_loan_payments(loan_id):
     return [to_dict(p) for p in payments]
 
 
+def get_loan_payments_page(loan_id, cursor=None, limit=PAGE_SIZE):
+    query = LoanPayment.query.filter_by(loan_id=loan_id)
+    rows, next_cursor = paginate_keyset(
+        query, LoanPayment.id, LoanPayment.created_at, cursor, limit
+    )
+    return {"items": [to_dict(p) for p in rows], "next_cursor": next_cursor}
+
+
 def get_total_loan_payments(loan_id):
     result = (
         db.session.query(db.func.sum(LoanPayment.amount))
@@ -259,14 +476,44 @@ def get_total_loan_payments(loan_id):
     return result or 0
 
 
+def get_loan_payment_histories(user_id):
+    """Returns {loan_id: {"payments": [...], "total": n}} for every loan of a
+    user, loaded in a single query (newest payment first)."""
+    payments = (
+        LoanPayment.query.join(Loan, LoanPayment.loan_id == Loan.id)
+        .filter(Loan.user_id == user_id)
+        .order_by(LoanPayment.loan_id, LoanPayment.created_at.desc())
+        .all()
+    )
+    histories = {}
+    for p in payments:
+        entry = histories.setdefault(p.loan_id, {"payments": [], "total": 0})
+        entry["payments"].append(to_dict(p))
+        entry["total"] += p.amount or 0
+    return histories
+
+
+def month_range(year, month):
+    """[first day of the month, first day of the next month)."""
+    return date(year, month, 1), date(year + month // 12, month % 12 + 1, 1)
+
+
 def get_total_paid_this_month(loan_id, year, month):
-    # This queries payments by string matching the date (YYYY-MM)
-    # Assumes pay_date format is YYYY-MM-DD
-    search_str = f"{year}-{month:02}"
-    payments = LoanPayment.query.filter(
-        LoanPayment.loan_id == loan_id, LoanPayment.pay_date.like(f"{search_str}%")
-    ).all()
-    return sum(p.amount for p in payments)
+    start, end = month_range(year, month)
+    return get_loan_paid_between(start, end, loan_id=loan_id)
+
+
+def get_loan_paid_between(start, end, loan_id=None, user_id=None):
+    """Sum of payments with start <= pay_date < end for one loan or for all
+    of a user's loans, as one index range scan whatever the history size."""
+    query = db.select(db.func.coalesce(db.func.sum(LoanPayment.amount), 0)).where(
+        LoanPayment.pay_date >= start, LoanPayment.pay_date < end
+    )
+    if loan_id is not None:
+        query = query.where(LoanPayment.loan_id == loan_id)
+    if user_id is not None:
+        query = query.where(LoanPayment.user_id == user_id)
+    return db.session.execute(query).scalar()
 
 
 # ==========================================
@@ -283,6 +530,7 @@ def add_savings(user_id, savings_name, target_amount=0):
     )
     db.session.add(new_savings)
     db.session.commit()
+    view_cache.invalidate(user_id, *SAVINGS_VIEWS)
 
 
 def get_active_savings(user_id):
@@ -302,7 +550,10 @@ def deposit_savings(savings_id, amount, note=""):
     savings = Savings.query.get(savings_id)
     if savings:
         savings.current_balance += amount
+        record_ledger_entry(savings.user_id, savings_net=amount)
     db.session.commit()
+    if savings:
+        view_cache.invalidate(savings.user_id, *SAVINGS_VIEWS)
 
 
 def withdraw_savings(savings_id, amount, note=""):
@@ -313,7 +564,10 @@ def withdraw_savings(savings_id, amount, note=""):
     savings = Savings.query.get(savings_id)
     if savings:
         savings.current_balance -= amount
+        record_ledger_entry(savings.user_id, savings_net=-amount)
     db.session.commit()
+    if savings:
+        view_cache.invalidate(savings.user_id, *SAVINGS_VIEWS)
 
 
 def get_savings_transactions(savings_id):
@@ -325,6 +579,84 @@ def get_savings_transactions(savings_id):
     return [to_dict(t) for t in txns]
 
 
+def get_savings_transactions_page(savings_id, cursor=None, limit=PAGE_SIZE):
+    query = SavingsTransaction.query.filter_by(savings_id=savings_id)
+    rows, next_cursor = paginate_keyset(
+        query, SavingsTransaction.id, SavingsTransaction.timestamp, cursor, limit
+    )
+    return {"items": [to_dict(t) for t in rows], "next_cursor": next_cursor}
+
+
+SAVINGS_HISTORY_PREVIEW = 10
+
+
+def get_savings_by_id(savings_id):
+    savings = Savings.query.get(savings_id)
+    return to_dict(savings)
+
+
+def get_recent_savings_transactions(user_id, limit=SAVINGS_HISTORY_PREVIEW):
+    """Returns {savings_id: {"transactions": [...], "count": n}} holding the
+    latest `limit` transactions of every goal of a user plus each goal's full
+    transaction count, all from one windowed query."""
+    order = (SavingsTransaction.timestamp.desc(), SavingsTransaction.id.desc())
+    ranked = (
+        db.session.query(
+            SavingsTransaction.id.label("id"),
+            db.func.row_number()
+            .over(partition_by=SavingsTransaction.savings_id, order_by=order)
+            .label("rn"),
+            db.func.count(SavingsTransaction.id)
+            .over(partition_by=SavingsTransaction.savings_id)
+            .label("total"),
+        )
+        .join(Savings, SavingsTransaction.savings_id == Savings.id)
+        .filter(Savings.user_id == user_id)
+        .subquery()
+    )
+    rows = (
+        db.session.query(SavingsTransaction, ranked.c.total)
+        .join(ranked, ranked.c.id == SavingsTransaction.id)
+        .filter(ranked.c.rn <= limit)
+        .order_by(SavingsTransaction.savings_id, ranked.c.rn)
+        .all()
+    )
+
+    recent = {}
+    for txn, total in rows:
+        entry = recent.setdefault(txn.savings_id, {"transactions": [], "count": total})
+        entry["transactions"].append(to_dict(txn))
+    return recent
+
+
+def get_older_savings_transactions(
+    savings_id, before_id, limit=SAVINGS_HISTORY_PREVIEW
+):
+    """Returns the `limit` transactions of a goal that come right after
+    `before_id` in newest-first order, plus whether more remain."""
+    cursor_ts = (
+        db.session.query(SavingsTransaction.timestamp)
+        .filter(SavingsTransaction.id == before_id)
+        .scalar_subquery()
+    )
+    txns = (
+        SavingsTransaction.query.filter(
+            SavingsTransaction.savings_id == savings_id,
+            db.or_(
+                SavingsTransaction.timestamp < cursor_ts,
+                db.and_(
+                    SavingsTransaction.timestamp == cursor_ts,
+                    SavingsTransaction.id < before_id,
+                ),
+            ),
+        )
+        .order_by(SavingsTransaction.timestamp.desc(), SavingsTransaction.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    return [to_dict(t) for t in txns[:limit]], len(txns) > limit
+
+
 def get_total_savings(user_id):
     result = (
         db.session.query(db.func.sum(Savings.current_balance))
@@ -335,9 +667,14 @@ def get_total_savings(user_id):
 
 
 def delete_savings(savings_id):
+    savings = Savings.query.get(savings_id)
     SavingsTransaction.query.filter_by(savings_id=savings_id).delete()
     Savings.query.filter_by(id=savings_id).delete()
+    if savings:
+        record_ledger_entry(savings.user_id, savings_net=-savings.current_balance)
     db.session.commit()
+    if savings:
+        view_cache.invalidate(savings.user_id, *SAVINGS_VIEWS)
 
 
 # ==========================================
@@ -362,6 +699,7 @@ def add_category(user_id, name, planned_budget=0):
     new_cat = BudgetCategory(user_id=user_id, name=name, planned_budget=planned_budget)
     db.session.add(new_cat)
     db.session.commit()
+    view_cache.invalidate(user_id, *BUDGET_VIEWS)
 
 
 def seed_default_categories(user_id):
@@ -386,6 +724,7 @@ def update_category_budget(category_id, planned_budget):
     if cat:
         cat.planned_budget = planned_budget
         db.session.commit()
+        view_cache.invalidate(cat.user_id, *BUDGET_VIEWS)
 
 
 def update_budget_category(user_id, category_id, planned_budget):
@@ -393,6 +732,7 @@ def update_budget_category(user_id, category_id, planned_budget):
     if cat:
         cat.planned_budget = planned_budget
         db.session.commit()
+        view_cache.invalidate(user_id, *BUDGET_VIEWS)
 
 
 def add_budget_transaction(
@@ -405,26 +745,32 @@ def add_budget_transaction(
         amount=amount,
         expense_type=expense_type,
         savings_id=savings_id,
+        # Set here rather than by the column default so the rollup month
+        # is known before the flush
+        created_at=datetime.utcnow(),
     )
     db.session.add(new_expense)
+    record_ledger_entry(user_id, budget_spent=amount)
+    record_rollup(user_id, category_id, expense_type, new_expense.created_at, amount)
 
     if savings_id:
         withdraw_savings(savings_id, amount, f"Budget expense: {description}")
 
     db.session.commit()
+    view_cache.invalidate(user_id, *BUDGET_VIEWS)
 
 
-def get_budget_transactions(user_id):
+def budget_transactions_query(user_id):
     # Perform a Join to get Category Name and Savings Name
-    results = (
+    return (
         db.session.query(BudgetTransaction, BudgetCategory.name, Savings.savings_name)
         .join(BudgetCategory, BudgetTransaction.category_id == BudgetCategory.id)
         .outerjoin(Savings, BudgetTransaction.savings_id == Savings.id)
         .filter(BudgetTransaction.user_id == user_id)
-        .order_by(BudgetTransaction.created_at.desc())
-        .all()
     )
 
+
+def budget_transaction_dicts(results):
     txns = []
     for txn, cat_name, sav_name in results:
         t_dict = to_dict(txn)
@@ -434,12 +780,32 @@ def get_budget_transactions(user_id):
     return txns
 
 
-def get_actual_spent(user_id, category_id):
-    result = (
-        db.session.query(db.func.sum(BudgetTransaction.amount))
-        .filter_by(user_id=user_id, category_id=category_id)
-        .scalar()
+def get_budget_transactions(user_id):
+    results = (
+        budget_transactions_query(user_id)
+        .order_by(BudgetTransaction.created_at.desc())
+        .all()
+    )
+    return budget_transaction_dicts(results)
+
+
+def get_budget_transactions_page(user_id, cursor=None, limit=PAGE_SIZE):
+    rows, next_cursor = paginate_keyset(
+        budget_transactions_query(user_id),
+        BudgetTransaction.id,
+        BudgetTransaction.created_at,
+        cursor,
+        limit,
     )
+    return {"items": budget_transaction_dicts(rows), "next_cursor": next_cursor}
+
+
+def get_actual_spent(user_id, category_id, period="all"):
+    result = db.session.execute(
+        db.select(db.func.sum(BudgetRollup.total)).where(
+            *rollup_filter(user_id, period), BudgetRollup.category_id == category_id
+        )
+    ).scalar()
     return result or 0
 
 
@@ -447,45 +813,56 @@ def delete_budget_transaction(txn_id, user_id):
     txn = BudgetTransaction.query.filter_by(id=txn_id, user_id=user_id).first()
     if txn:
         db.session.delete(txn)
+        record_ledger_entry(user_id, budget_spent=-txn.amount)
+        record_rollup(
+            user_id, txn.category_id, txn.expense_type, txn.created_at, -txn.amount, -1
+        )
         db.session.commit()
+        view_cache.invalidate(user_id, *BUDGET_VIEWS)
 
 
-def get_category_summary(user_id):
-    """Returns categories with their planned budget AND actual spent."""
-    categories = (
-        BudgetCategory.query.filter_by(user_id=user_id)
-        .order_by(BudgetCategory.name)
-        .all()
-    )
-    summary = []
-    for cat in categories:
-        spent = (
-            db.session.query(db.func.sum(BudgetTransaction.amount))
-            .filter_by(category_id=cat.id)
-            .scalar()
-            or 0
+def get_category_summary(user_id, period="all"):
+    """Returns categories with their planned budget AND actual spent in
+    `period` (see BUDGET_PERIODS), read from the monthly rollups."""
+    spent_q = (
+        db.select(
+            BudgetRollup.category_id,
+            db.func.sum(BudgetRollup.total).label("spent"),
         )
-        summary.append(
-            {
-                "id": cat.id,
-                "name": cat.name,
-                "planned_budget": cat.planned_budget,
-                "actual_spent": spent,
-            }
-        )
-    return summary
-
-
-def get_expense_totals_by_type(user_id):
-    """Returns totals for daily, monthly, yearly expenses."""
-    results = (
+        .where(*rollup_filter(user_id, period))
+        .group_by(BudgetRollup.category_id)
+        .subquery()
+    )
+    rows = (
         db.session.query(
-            BudgetTransaction.expense_type, db.func.sum(BudgetTransaction.amount)
+            BudgetCategory.id,
+            BudgetCategory.name,
+            BudgetCategory.planned_budget,
+            db.func.coalesce(spent_q.c.spent, 0),
         )
-        .filter_by(user_id=user_id)
-        .group_by(BudgetTransaction.expense_type)
+        .outerjoin(spent_q, spent_q.c.category_id == BudgetCategory.id)
+        .filter(BudgetCategory.user_id == user_id)
+        .order_by(BudgetCategory.name)
         .all()
     )
+    return [
+        {
+            "id": cat_id,
+            "name": name,
+            "planned_budget": planned,
+            "actual_spent": spent,
+        }
+        for cat_id, name, planned, spent in rows
+    ]
+
+
+def get_expense_totals_by_type(user_id, period="all"):
+    """Returns totals for daily, monthly, yearly expenses."""
+    results = db.session.execute(
+        db.select(BudgetRollup.expense_type, db.func.sum(BudgetRollup.total))
+        .where(*rollup_filter(user_id, period))
+        .group_by(BudgetRollup.expense_type)
+    ).all()
 
     totals = {"daily": 0, "monthly": 0, "yearly": 0}
     for type_, total in results:
@@ -563,6 +940,7 @@ def add_card(user_id, bank_name, card_type, last_four, balance, color_theme, usa
     )
     db.session.add(new_card)
     db.session.commit()
+    view_cache.invalidate(user_id, *CARD_VIEWS)
 
 
 def get_user_cards(user_id):
@@ -575,6 +953,7 @@ def delete_card(card_id):
     if card:
         db.session.delete(card)
         db.session.commit()
+        view_cache.invalidate(card.user_id, *CARD_VIEWS)
 
 
 # ==========================================
@@ -584,6 +963,9 @@ def delete_card(card_id):
 
 class SalaryBudget(db.Model):
     __tablename__ = "salary_budgets"
+    __table_args__ = (
+        db.Index("ix_salary_budgets_user_created", "user_id", "created_at"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     salary_amount = db.Column(db.Float, nullable=False)
@@ -601,6 +983,7 @@ class SalaryBudget(db.Model):
 
 class SalaryBudgetItem(db.Model):
     __tablename__ = "salary_budget_items"
+    __table_args__ = (db.Index("ix_salary_budget_items_budget_id", "budget_id"),)
     id = db.Column(db.Integer, primary_key=True)
     budget_id = db.Column(
         db.Integer, db.ForeignKey("salary_budgets.id"), nullable=False
@@ -655,3 +1038,455 @@ def get_budget_details(budget_id):
     if budget:
         return {"info": to_dict(budget), "items": [to_dict(i) for i in budget.items]}
     return None
+
+
+def get_allocation_history(user_id, since):
+    """(name, share) pairs for the local allocator: the average share of the
+    salary each saved smart-budget item got, and each budget category's share
+    of the spending logged since `since`. Two grouped queries."""
+    amount = db.case(
+        (SalaryBudgetItem.is_auto_filled, SalaryBudgetItem.ai_amount),
+        else_=SalaryBudgetItem.user_amount,
+    )
+    planned = db.session.execute(
+        db.select(
+            db.func.lower(SalaryBudgetItem.item_name),
+            db.func.avg(amount / SalaryBudget.salary_amount),
+        )
+        .join(SalaryBudget, SalaryBudgetItem.budget_id == SalaryBudget.id)
+        .where(SalaryBudget.user_id == user_id, SalaryBudget.salary_amount > 0)
+        .group_by(db.func.lower(SalaryBudgetItem.item_name))
+    ).all()
+
+    spent = db.session.execute(
+        db.select(BudgetCategory.name, db.func.sum(BudgetTransaction.amount))
+        .join(BudgetCategory, BudgetTransaction.category_id == BudgetCategory.id)
+        .where(
+            BudgetTransaction.user_id == user_id,
+            BudgetTransaction.created_at >= since,
+        )
+        .group_by(BudgetCategory.name)
+    ).all()
+    total_spent = sum(total or 0 for _, total in spent)
+
+    history = [(name, share) for name, share in planned if share and share > 0]
+    if total_spent > 0:
+        history += [(name, total / total_spent) for name, total in spent if total]
+    return history
+
+
+# ==========================================
+# 9. DASHBOARD SNAPSHOT
+# ==========================================
+
+
+def get_dashboard_snapshot(user_id, recent_limit=5):
+    """Returns every figure the dashboard needs in a fixed number of queries,
+    no matter how many transactions or loans the user has."""
+    balance_q = (
+        db.select(UserLedger.cash_balance)
+        .where(UserLedger.user_id == user_id)
+        .scalar_subquery()
+    )
+    wallet_q = (
+        db.select(db.func.coalesce(db.func.sum(Card.balance), 0))
+        .where(Card.user_id == user_id)
+        .scalar_subquery()
+    )
+    savings_q = (
+        db.select(db.func.coalesce(db.func.sum(Savings.current_balance), 0))
+        .where(Savings.user_id == user_id)
+        .scalar_subquery()
+    )
+    next_due_q = (
+        db.select(db.func.min(Loan.next_due_date))
+        .where(Loan.user_id == user_id)
+        .scalar_subquery()
+    )
+    balance, total_wallet, total_savings, next_due_date = db.session.execute(
+        db.select(balance_q, wallet_q, savings_q, next_due_q)
+    ).one()
+    if balance is None:
+        # No ledger row yet (e.g. data from before the ledger existed)
+        balance = rebuild_ledger(user_id)["cash_balance"]
+
+    # Payments are summed per loan in one grouped pass and joined back
+    paid_q = (
+        db.session.query(
+            LoanPayment.loan_id, db.func.sum(LoanPayment.amount).label("paid")
+        )
+        .filter(LoanPayment.user_id == user_id)
+        .group_by(LoanPayment.loan_id)
+        .subquery()
+    )
+    rows = (
+        db.session.query(Loan, db.func.coalesce(paid_q.c.paid, 0))
+        .outerjoin(paid_q, paid_q.c.loan_id == Loan.id)
+        .filter(Loan.user_id == user_id)
+        .order_by(Loan.id)
+        .all()
+    )
+
+    loans = []
+    total_debt = 0
+    for loan, paid in rows:
+        l_dict = to_dict(loan)
+        l_dict["paid"] = paid
+        l_dict["remaining"] = loan.amount - paid
+        if l_dict["remaining"] > 0:
+            total_debt += l_dict["remaining"]
+        loans.append(l_dict)
+
+    recent = (
+        Transaction.query.filter_by(user_id=user_id)
+        .order_by(Transaction.id.desc())
+        .limit(recent_limit)
+        .all()
+    )
+
+    return {
+        "balance": balance,
+        "total_wallet": total_wallet,
+        "total_savings": total_savings,
+        "total_debt": total_debt,
+        "next_due_date": loan_schedule.parse_date(next_due_date),
+        "loans": loans,
+        "loan_labels": [l["loan_name"] for l in loans],
+        "loan_totals": [l["amount"] for l in loans],
+        "loan_paids": [l["paid"] for l in loans],
+        "recent_transactions": [to_dict(t) for t in recent],
+    }
+
+
+# ==========================================
+# 10. BALANCE LEDGER
+# ==========================================
+
+# Write a checkpoint row every N ledger entries per user
+LEDGER_CHECKPOINT_EVERY = 100
+
+LEDGER_FIELDS = ("cash_balance", "budget_spent", "savings_net", "loan_paid")
+
+
+class UserLedger(db.Model):
+    """Running per-user totals, kept in step with every money-moving write so
+    pages read them in O(1) instead of summing raw rows.
+
+    cash_balance: income minus expense Transactions (the dashboard balance)
+    budget_spent: all BudgetTransaction amounts
+    savings_net:  savings deposits minus withdrawals
+    loan_paid:    all LoanPayment amounts
+    """
+
+    __tablename__ = "user_ledgers"
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    cash_balance = db.Column(db.Float, default=0, nullable=False)
+    budget_spent = db.Column(db.Float, default=0, nullable=False)
+    savings_net = db.Column(db.Float, default=0, nullable=False)
+    loan_paid = db.Column(db.Float, default=0, nullable=False)
+    entry_count = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class LedgerCheckpoint(db.Model):
+    __tablename__ = "ledger_checkpoints"
+    __table_args__ = (
+        db.Index("ix_ledger_checkpoints_user_created", "user_id", "created_at"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    cash_balance = db.Column(db.Float, nullable=False)
+    budget_spent = db.Column(db.Float, nullable=False)
+    savings_net = db.Column(db.Float, nullable=False)
+    loan_paid = db.Column(db.Float, nullable=False)
+    entry_count = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+def record_ledger_entry(user_id, **deltas):
+    """Adds `deltas` (keyed by LEDGER_FIELDS) to the user's ledger inside the
+    caller's transaction. The caller commits."""
+    if not user_id:
+        return
+    db.session.flush()
+    values = {f: getattr(UserLedger, f) + deltas.get(f, 0) for f in LEDGER_FIELDS}
+    values["entry_count"] = UserLedger.entry_count + 1
+    values["updated_at"] = datetime.utcnow()
+    # A single atomic UPDATE, so concurrent workers never lose an entry
+    update = (
+        db.update(UserLedger)
+        .where(UserLedger.user_id == user_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if not db.session.execute(update).rowcount:
+        # First entry for this user: build the row from raw data, which
+        # already includes the change just flushed above
+        if create_ledger(user_id):
+            return
+        # A concurrent writer created it first, from totals that can't see
+        # this uncommitted change, so add the change to their row
+        db.session.execute(update)
+
+    ledger = db.session.get(UserLedger, user_id, populate_existing=True)
+    if ledger.entry_count % LEDGER_CHECKPOINT_EVERY == 0:
+        add_ledger_checkpoint(ledger)
+
+
+def add_ledger_checkpoint(ledger):
+    checkpoint = LedgerCheckpoint(
+        user_id=ledger.user_id, entry_count=ledger.entry_count
+    )
+    for f in LEDGER_FIELDS:
+        setattr(checkpoint, f, getattr(ledger, f))
+    db.session.add(checkpoint)
+
+
+def ledger_totals(user_id):
+    """{field: total} plus entry_count, summed from the user's raw rows."""
+    signed_txn = db.case(
+        (Transaction.type == "income", Transaction.amount), else_=-Transaction.amount
+    )
+    signed_savings = db.case(
+        (SavingsTransaction.type == "deposit", SavingsTransaction.amount),
+        else_=-SavingsTransaction.amount,
+    )
+
+    def total(expr, model, *where):
+        # (sum, row count) as scalar subqueries of one outer SELECT
+        return [
+            db.select(agg).select_from(model).where(*where).scalar_subquery()
+            for agg in (db.func.coalesce(db.func.sum(expr), 0), db.func.count())
+        ]
+
+    sources = [
+        total(signed_txn, Transaction, Transaction.user_id == user_id),
+        total(
+            BudgetTransaction.amount,
+            BudgetTransaction,
+            BudgetTransaction.user_id == user_id,
+        ),
+        total(
+            signed_savings,
+            SavingsTransaction.__table__.join(
+                Savings, SavingsTransaction.savings_id == Savings.id
+            ),
+            Savings.user_id == user_id,
+        ),
+        total(LoanPayment.amount, LoanPayment, LoanPayment.user_id == user_id),
+    ]
+    row = db.session.execute(db.select(*[c for src in sources for c in src])).one()
+    totals = {f: row[i * 2] for i, f in enumerate(LEDGER_FIELDS)}
+    totals["entry_count"] = sum(row[i * 2 + 1] for i in range(len(LEDGER_FIELDS)))
+    return totals
+
+
+def create_ledger(user_id):
+    """INSERTs the user's ledger row built from raw rows, unless another
+    writer got there first. Returns True if this call created it."""
+    dialect = postgresql if db.engine.dialect.name == "postgresql" else sqlite
+    created = db.session.execute(
+        dialect.insert(UserLedger)
+        .values(user_id=user_id, updated_at=datetime.utcnow(), **ledger_totals(user_id))
+        .on_conflict_do_nothing(index_elements=["user_id"])
+    ).rowcount
+    if created:
+        add_ledger_checkpoint(db.session.get(UserLedger, user_id))
+    return created == 1
+
+
+def rebuild_ledger(user_id, commit=True):
+    """Recomputes a user's ledger from raw rows and returns it as a dict."""
+    ledger = db.session.get(UserLedger, user_id)
+    if ledger is None:
+        create_ledger(user_id)
+        ledger = db.session.get(UserLedger, user_id)
+    else:
+        for f, value in ledger_totals(user_id).items():
+            setattr(ledger, f, value)
+        ledger.updated_at = datetime.utcnow()
+        add_ledger_checkpoint(ledger)
+
+    if commit:
+        db.session.commit()
+        view_cache.invalidate(user_id, *TRANSACTION_VIEWS)
+    return to_dict(ledger)
+
+
+def get_ledger(user_id):
+    ledger = db.session.get(UserLedger, user_id)
+    if ledger is None:
+        return rebuild_ledger(user_id)
+    return to_dict(ledger)
+
+
+# ==========================================
+# 11. BACKGROUND JOBS
+# ==========================================
+
+
+class AIJob(db.Model):
+    """One AI generation handed to the job pool (see jobs.py). Stored so a
+    job outlives the worker that queued it."""
+
+    __tablename__ = "ai_jobs"
+    __table_args__ = (
+        db.Index("ix_ai_jobs_status_created", "status", "created_at"),
+        db.Index("ix_ai_jobs_user_created", "user_id", "created_at"),
+    )
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), default="queued", nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    result = db.Column(db.Text, nullable=True)  # JSON
+    error = db.Column(db.Text, nullable=True)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+
+# ==========================================
+# 12. MONTHLY BUDGET ROLLUPS
+# ==========================================
+
+# Budget page periods: key -> label
+BUDGET_PERIODS = {
+    "month": "This month",
+    "3m": "Last 3 months",
+    "ytd": "Year to date",
+    "all": "All time",
+}
+
+
+class BudgetRollup(db.Model):
+    """Spending per user, category, expense type and calendar month (UTC),
+    kept in step with every budget write so period views sum a handful of
+    rows instead of scanning budget_transactions."""
+
+    __tablename__ = "budget_monthly_rollups"
+    __table_args__ = (db.Index("ix_budget_rollups_user_month", "user_id", "month"),)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    category_id = db.Column(
+        db.Integer, db.ForeignKey("budget_categories.id"), primary_key=True
+    )
+    expense_type = db.Column(db.String(20), primary_key=True)
+    month = db.Column(db.Date, primary_key=True)  # first day of the month
+    total = db.Column(db.Float, default=0, nullable=False)
+    txn_count = db.Column(db.Integer, default=0, nullable=False)
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def sql_month_start(column):
+    if db.engine.dialect.name == "sqlite":
+        return db.type_coerce(db.func.date(column, "start of month"), db.Date)
+    return db.cast(db.func.date_trunc("month", column), db.Date)
+
+
+def period_start(period, today=None):
+    """First month included in `period`, or None for all time."""
+    today = today or datetime.utcnow().date()
+    if period == "month":
+        return month_start(today)
+    if period == "3m":
+        index = today.year * 12 + today.month - 1 - 2
+        return date(index // 12, index % 12 + 1, 1)
+    if period == "ytd":
+        return date(today.year, 1, 1)
+    return None
+
+
+def rollup_filter(user_id, period):
+    where = [BudgetRollup.user_id == user_id]
+    start = period_start(period)
+    if start is not None:
+        where.append(BudgetRollup.month >= start)
+    return where
+
+
+def record_rollup(user_id, category_id, expense_type, when, amount, count=1):
+    """Adds `amount` and `count` to one rollup bucket inside the caller's
+    transaction, as a single atomic upsert. The caller commits."""
+    if not user_id or when is None:
+        return
+    dialect = postgresql if db.engine.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(BudgetRollup).values(
+        user_id=user_id,
+        category_id=category_id,
+        expense_type=expense_type or "daily",
+        month=month_start(when),
+        total=amount,
+        txn_count=count,
+    )
+    db.session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["user_id", "category_id", "expense_type", "month"],
+            set_={
+                "total": BudgetRollup.total + stmt.excluded.total,
+                "txn_count": BudgetRollup.txn_count + stmt.excluded.txn_count,
+            },
+        )
+    )
+
+
+def live_rollups(user_id):
+    """The rollup rows as computed from budget_transactions right now."""
+    month = sql_month_start(BudgetTransaction.created_at)
+    return (
+        db.select(
+            BudgetTransaction.user_id,
+            BudgetTransaction.category_id,
+            db.func.coalesce(BudgetTransaction.expense_type, "daily"),
+            month,
+            db.func.sum(BudgetTransaction.amount),
+            db.func.count(),
+        )
+        .where(
+            BudgetTransaction.user_id == user_id,
+            BudgetTransaction.created_at.isnot(None),
+        )
+        .group_by(
+            BudgetTransaction.user_id,
+            BudgetTransaction.category_id,
+            db.func.coalesce(BudgetTransaction.expense_type, "daily"),
+            month,
+        )
+    )
+
+
+def rebuild_rollups(user_id, commit=True):
+    """Recomputes a user's rollups from raw rows. Returns the bucket count."""
+    db.session.execute(db.delete(BudgetRollup).where(BudgetRollup.user_id == user_id))
+    columns = ("user_id", "category_id", "expense_type", "month", "total", "txn_count")
+    inserted = db.session.execute(
+        db.insert(BudgetRollup).from_select(columns, live_rollups(user_id))
+    ).rowcount
+    if commit:
+        db.session.commit()
+        view_cache.invalidate(user_id, *BUDGET_VIEWS)
+    return inserted
+
+
+def verify_rollups(user_id):
+    """Compares stored rollups with raw rows. Returns (bucket, stored,
+    actual) for every bucket that differs; empty when they agree."""
+    stored = {
+        (r.category_id, r.expense_type, r.month): (round(r.total, 2), r.txn_count)
+        for r in BudgetRollup.query.filter_by(user_id=user_id)
+        if r.txn_count or round(r.total, 2)
+    }
+    actual = {
+        (cat_id, type_, month): (round(total, 2), count)
+        for _, cat_id, type_, month, total, count in db.session.execute(
+            live_rollups(user_id)
+        )
+    }
+    return [
+        (bucket, stored.get(bucket), actual.get(bucket))
+        for bucket in sorted(stored.keys() | actual.keys())
+        if stored.get(bucket) != actual.get(bucket)
+    ]
@@ -0,0 +1,306 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+
+import click
+from flask import (
+    abort,
+    before_render_template,
+    g,
+    request,
+    send_from_directory,
+    session,
+    template_rendered,
+)
+
+import metrics
+
+# Seconds between stack samples of the profiled request's thread
+SAMPLE_INTERVAL = 0.001
+# Frames kept per tracemalloc traceback, and allocation sites in the report
+TRACE_FRAMES = 25
+TOP_ALLOCATIONS = 15
+TOP_FRAMES = 25
+
+# Frames from these packages count as time in SQL or in Jinja; the rest is
+# plain Python
+SQL_PACKAGES = ("sqlalchemy", "psycopg2", "sqlite3")
+JINJA_PACKAGES = ("jinja2", "markupsafe")
+
+# tracemalloc is process-wide, so one profiled request at a time
+_profile_lock = threading.Lock()
+
+
+# Set by `flask profile page`; WSGI servers never put client input in
+# non-HTTP_ environ keys, so only in-process callers can set it
+CLI_ENVIRON_KEY = "limoney.profile"
+
+
+def is_admin(app):
+    return session.get("username") in app.config.get("ADMIN_USERNAMES", ())
+
+
+def wants_profile(app):
+    if request.environ.get(CLI_ENVIRON_KEY):
+        return True
+    flagged = request.headers.get("X-Profile") == "1" or request.args.get("_profile") == "1"
+    return flagged and is_admin(app)
+
+
+# ==========================================
+# 1. SAMPLER
+# ==========================================
+
+
+def frame_label(frame):
+    template = frame.f_globals.get("__jinja_template__")
+    if template is not None:
+        line = template.get_corresponding_lineno(frame.f_lineno)
+        return f"{template.name or '<string>'}:{line}"
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}.{code.co_name}:{frame.f_lineno}"
+
+
+def frame_category(frame):
+    if frame.f_globals.get("__jinja_template__") is not None:
+        return "jinja"
+    package = frame.f_globals.get("__name__", "").split(".")[0]
+    if package in SQL_PACKAGES:
+        return "sql"
+    if package in JINJA_PACKAGES:
+        return "jinja"
+    return None
+
+
+class Sampler(threading.Thread):
+    """Samples one thread's stack every `interval` seconds into folded
+    stacks ("root;...;leaf" -> count), the input format of flamegraph.pl
+    and speedscope. Each stack is rooted at its category: the innermost
+    SQL or Jinja frame decides it, anything else is python."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(name="request-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.categories = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            category = None
+            while frame is not None:
+                labels.append(frame_label(frame))
+                category = category or frame_category(frame)
+                frame = frame.f_back
+            category = category or "python"
+            self.categories[category] += 1
+            self.stacks[";".join([f"[{category}]"] + labels[::-1])] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+# ==========================================
+# 2. REQUEST HOOKS
+# ==========================================
+
+
+def start_profile(app):
+    if not wants_profile(app):
+        return
+    if not _profile_lock.acquire(blocking=False):
+        g.profile_busy = True
+        return
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(TRACE_FRAMES)
+    sampler = Sampler(threading.get_ident())
+    g.profile = {
+        "id": f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}",
+        "started": time.perf_counter(),
+        "started_tracing": started_tracing,
+        "switch_interval": sys.getswitchinterval(),
+        "snapshot": tracemalloc.take_snapshot(),
+        "sampler": sampler,
+        "jinja_seconds": 0.0,
+        "jinja_started": None,
+    }
+    # The sampler needs the GIL to read the request's stack; at the default
+    # 5 ms switch interval it would miss most of its ticks. Only changed once
+    # g.profile exists, so finish_profile() always puts it back
+    sys.setswitchinterval(SAMPLE_INTERVAL / 4)
+    sampler.start()
+
+
+def tag_response(response):
+    if "profile" in g:
+        response.headers["X-Profile-Id"] = g.profile["id"]
+    elif g.get("profile_busy"):
+        response.headers["X-Profile-Id"] = "busy"
+    return response
+
+
+def jinja_started(sender, template, context, **extra):
+    if "profile" in g:
+        g.profile["jinja_started"] = time.perf_counter()
+
+
+def jinja_finished(sender, template, context, **extra):
+    if "profile" in g and g.profile["jinja_started"] is not None:
+        g.profile["jinja_seconds"] += time.perf_counter() - g.profile["jinja_started"]
+        g.profile["jinja_started"] = None
+
+
+def finish_profile(app, error=None):
+    profile = g.pop("profile", None)
+    if profile is None:
+        return
+    try:
+        profile["sampler"].stop()
+        elapsed = time.perf_counter() - profile["started"]
+        snapshot = tracemalloc.take_snapshot()
+        write_report(app, profile, elapsed, snapshot)
+    finally:
+        # Both are process-wide, so they are undone even if the report fails
+        sys.setswitchinterval(profile["switch_interval"])
+        if profile["started_tracing"]:
+            tracemalloc.stop()
+        _profile_lock.release()
+
+
+# ==========================================
+# 3. REPORT
+# ==========================================
+
+
+def profile_dir(app):
+    path = app.config.get("PROFILE_DIR") or os.path.join(app.instance_path, "profiles")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def write_report(app, profile, elapsed, snapshot):
+    """Writes <id>.txt (summary) and <id>.folded (flamegraph input)."""
+    sampler = profile["sampler"]
+    # Exact SQL time comes from the metrics hooks, Jinja time from the
+    # render signals; Python is what is left of the wall time
+    sql_seconds = g.get("sql_seconds", 0.0)
+    sql_count = g.get("sql_statements", 0)
+    jinja_seconds = profile["jinja_seconds"]
+    python_seconds = max(elapsed - sql_seconds - jinja_seconds, 0)
+
+    lines = [
+        f"Profile {profile['id']}: {request.method} {request.full_path.rstrip('?')}"
+        f" ({request.endpoint}) for {session.get('username')}",
+        f"wall {elapsed * 1000:.1f} ms | SQL {sql_seconds * 1000:.1f} ms in "
+        f"{sql_count} statement(s) | Jinja {jinja_seconds * 1000:.1f} ms | "
+        f"Python {python_seconds * 1000:.1f} ms",
+        # Samples attribute by package, so ORM work and template loading
+        # count too
+        f"sampled every {sampler.interval * 1000:g} ms: "
+        + ", ".join(f"{k} {v}" for k, v in sampler.categories.most_common()),
+        "",
+        "Allocations during the request (tracemalloc, net, by line):",
+    ]
+    stats = snapshot.filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        )
+    ).compare_to(profile["snapshot"], "lineno")
+    for stat in stats[:TOP_ALLOCATIONS]:
+        frame = stat.traceback[0]
+        lines.append(
+            f"  {stat.size_diff / 1024:>9.1f} KiB {stat.count_diff:>7} blocks  "
+            f"{frame.filename}:{frame.lineno}"
+        )
+
+    leaf_samples = Counter()
+    for stack, count in sampler.stacks.items():
+        leaf_samples[stack.rsplit(";", 1)[-1]] += count
+    lines += ["", "Hottest frames (self samples):"]
+    for label, count in leaf_samples.most_common(TOP_FRAMES):
+        lines.append(f"  {count:>6}  {label}")
+
+    path = profile_dir(app)
+    with open(os.path.join(path, f"{profile['id']}.txt"), "w") as f:
+        f.write("\n".join(lines) + "\n")
+    with open(os.path.join(path, f"{profile['id']}.folded"), "w") as f:
+        for stack, count in sampler.stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    metrics.log_event(
+        "profile",
+        id=profile["id"],
+        endpoint=request.endpoint,
+        method=request.method,
+        path=request.path,
+        duration_ms=round(elapsed * 1000, 1),
+        sql_statements=sql_count,
+        sql_ms=round(sql_seconds * 1000, 1),
+        jinja_ms=round(jinja_seconds * 1000, 1),
+        python_ms=round(python_seconds * 1000, 1),
+        report=os.path.join(path, f"{profile['id']}.txt"),
+        user_id=session.get("user_id"),
+    )
+
+
+def init_profiler(app):
+    """Profiles single requests for admins (ADMIN_USERNAMES) who send
+    `X-Profile: 1` or `?_profile=1`. The response carries X-Profile-Id;
+    fetch the report from /admin/profiles/<id>.txt or <id>.folded.
+
+    While a request is profiled, tracemalloc runs and sys.setswitchinterval()
+    is lowered for the whole process, so every other thread in the worker
+    pays for it too; both are restored when the request ends."""
+    app.before_request(lambda: start_profile(app))
+    app.after_request(tag_response)
+    app.teardown_request(lambda error=None: finish_profile(app, error))
+    before_render_template.connect(jinja_started, app)
+    template_rendered.connect(jinja_finished, app)
+
+    @app.route("/admin/profiles/<name>")
+    def admin_profile(name):
+        if not is_admin(app):
+            abort(404)
+        if not name.endswith((".txt", ".folded")):
+            abort(404)
+        return send_from_directory(profile_dir(app), name, mimetype="text/plain")
+
+
+def init_cli(app):
+    @app.cli.group("profile")
+    def profile_group():
+        """Per-request profiles."""
+
+    @profile_group.command("page")
+    @click.argument("path")
+    @click.option("--user-id", type=int, required=True, help="User to browse as.")
+    @click.option("--cold", is_flag=True, help="Drop the user's cached page views first.")
+    def page_command(path, user_id, cold):
+        """Profile one GET of PATH as a user, e.g. the one who reported it slow."""
+        import view_cache
+
+        if cold:
+            view_cache.invalidate(user_id, "dashboard", "loan_tracker", "savings", "budget")
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["user_id"] = user_id
+            sess["username"] = "profiler"
+        response = client.get(path, environ_base={CLI_ENVIRON_KEY: True})
+        profile_id = response.headers.get("X-Profile-Id")
+        if profile_id in (None, "busy"):
+            raise click.ClickException(f"Not profiled (HTTP {response.status_code})")
+        report = os.path.join(profile_dir(app), profile_id)
+        click.echo(f"HTTP {response.status_code}: {report}.txt, {report}.folded")
@@ -0,0 +1,247 @@
+import os
+import re
+import sys
+from contextlib import contextmanager
+
+import click
+from flask import current_app, g, has_request_context, request
+
+import metrics
+
+try:
+    import pytest
+except ImportError:  # only needed by the query_budget fixture
+    pytest = None
+
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Same statement shape this many times in one request is reported
+REPEAT_THRESHOLD = 3
+# App frames shown per reported statement (innermost first)
+LOCATION_DEPTH = 3
+
+# SQL statements per page with cold view caches, with a little headroom.
+# None of these should grow with the user's row count; `flask queries
+# check` fails when a page goes over.
+ROUTE_BUDGETS = {
+    "/": 6,
+    "/loan-tracker": 4,
+    "/savings": 4,
+    "/budget": 8,
+    "/smart-budget": 3,
+    "/profile": 4,
+}
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+PARAM_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement):
+    """The statement's shape: literals and parameters become ?, IN lists
+    collapse to (?), whitespace is normalized. Two statements with the same
+    shape differ only in their values."""
+    shape = STRING_LITERAL.sub("?", statement)
+    shape = NUMBER_LITERAL.sub("?", shape)
+    shape = re.sub(r"%\(\w+\)s|%s|:\w+", "?", shape)
+    shape = PARAM_LIST.sub("(?)", shape)
+    return WHITESPACE.sub(" ", shape).strip()
+
+
+def caller_location(depth=LOCATION_DEPTH):
+    """The innermost app frames that led to the current statement, e.g.
+    "models.py:436 in get_loan_payments <- loan_tracker.html:112". Template
+    frames are mapped back to template lines."""
+    frames = []
+    frame = sys._getframe(1)
+    while frame is not None and len(frames) < depth:
+        template = frame.f_globals.get("__jinja_template__")
+        filename = frame.f_code.co_filename
+        if template is not None:
+            line = template.get_corresponding_lineno(frame.f_lineno)
+            frames.append(f"{template.name or '<string>'}:{line}")
+        elif filename.startswith(APP_ROOT) and filename != __file__:
+            name = os.path.relpath(filename, APP_ROOT)
+            frames.append(f"{name}:{frame.f_lineno} in {frame.f_code.co_name}")
+        frame = frame.f_back
+    return " <- ".join(frames) or "?"
+
+
+# ==========================================
+# 1. RECORDER
+# ==========================================
+
+
+class QueryRecorder:
+    """Collects the statements executed while it is recording, with the
+    app code that issued each one."""
+
+    def __init__(self, with_locations=True):
+        self.with_locations = with_locations
+        self.statements = []  # (shape, location)
+
+    def record(self, conn, cursor, statement, parameters, context, executemany):
+        location = caller_location() if self.with_locations else None
+        self.statements.append((fingerprint(statement), location))
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def repeated(self, threshold=REPEAT_THRESHOLD):
+        """[(shape, times, first location)] for shapes run `threshold` or
+        more times, most repeated first."""
+        seen = {}
+        for shape, location in self.statements:
+            entry = seen.setdefault(shape, [0, location])
+            entry[0] += 1
+        found = [
+            (shape, times, location)
+            for shape, (times, location) in seen.items()
+            if times >= threshold
+        ]
+        return sorted(found, key=lambda r: -r[1])
+
+    def report(self, threshold=REPEAT_THRESHOLD):
+        lines = [f"{self.count} statement(s)"]
+        for shape, times, location in self.repeated(threshold):
+            lines.append(f"  {times}x {shape[:160]}")
+            lines.append(f"      at {location}")
+        return "\n".join(lines)
+
+
+@contextmanager
+def recording(engine, with_locations=True):
+    """Records every statement run on `engine` inside the block. Meant for
+    tests and CLI checks; it sees statements from every thread."""
+    from app import db
+
+    recorder = QueryRecorder(with_locations)
+    db.event.listen(engine, "before_cursor_execute", recorder.record)
+    try:
+        yield recorder
+    finally:
+        db.event.remove(engine, "before_cursor_execute", recorder.record)
+
+
+# ==========================================
+# 2. DEBUG MODE (per request)
+# ==========================================
+
+
+def record_for_request(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and "query_recorder" in g:
+        g.query_recorder.record(conn, cursor, statement, parameters, context, executemany)
+
+
+def start_request():
+    g.query_recorder = QueryRecorder()
+
+
+def report_request(response):
+    recorder = g.pop("query_recorder", None)
+    if recorder is None:
+        return response
+    threshold = current_app.config.get("QUERY_WATCH_THRESHOLD", REPEAT_THRESHOLD)
+    repeated = recorder.repeated(threshold)
+    response.headers["X-Query-Count"] = str(recorder.count)
+    if repeated:
+        response.headers["X-Query-Repeats"] = str(sum(r[1] for r in repeated))
+        metrics.log_event(
+            "possible_n_plus_one",
+            endpoint=request.endpoint,
+            method=request.method,
+            path=request.path,
+            sql_statements=recorder.count,
+            repeated=[
+                {"times": times, "statement": shape[:160], "at": location}
+                for shape, times, location in repeated
+            ],
+        )
+    return response
+
+
+def init_query_watch(app):
+    """Enables the N+1 detector when QUERY_WATCH is on (development only:
+    it walks the stack for every statement)."""
+    if not app.config.get("QUERY_WATCH"):
+        return
+    from app import db
+
+    app.before_request(start_request)
+    app.after_request(report_request)
+    with app.app_context():
+        db.event.listen(db.engine, "before_cursor_execute", record_for_request)
+    threshold = app.config.get("QUERY_WATCH_THRESHOLD", REPEAT_THRESHOLD)
+    print(f"🔁 Query watch on (repeat threshold {threshold})")
+
+
+# ==========================================
+# 3. QUERY BUDGETS
+# ==========================================
+
+
+def measure_page(app, user_id, path):
+    """Runs one GET of `path` as `user_id` with cold view caches. Returns
+    (status code, QueryRecorder)."""
+    from app import db
+    import view_cache
+
+    view_cache.invalidate(user_id, "dashboard", "loan_tracker", "savings", "budget")
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = user_id
+        sess["username"] = "query-watch"
+    with recording(db.engine) as recorder:
+        response = client.get(path)
+    return response.status_code, recorder
+
+
+if pytest is not None:
+
+    @pytest.fixture
+    def query_budget():
+        """Fails the test when the block runs more SQL than declared:
+
+            def test_dashboard(client, query_budget):
+                with query_budget(12):
+                    client.get("/")
+
+        Load it with `pytest_plugins = ["query_watch"]` in conftest.py."""
+        from app import db
+
+        @contextmanager
+        def check(budget, threshold=REPEAT_THRESHOLD):
+            with recording(db.engine) as recorder:
+                yield recorder
+            if recorder.count > budget:
+                pytest.fail(
+                    f"Query budget exceeded: {recorder.count} > {budget}\n"
+                    + recorder.report(threshold),
+                    pytrace=False,
+                )
+
+        return check
+
+
+def init_cli(app):
+    @app.cli.group("queries")
+    def queries_group():
+        """SQL statement budgets and N+1 checks."""
+
+    @queries_group.command("check")
+    @click.option("--user-id", type=int, required=True, help="User to browse as.")
+    @click.option("--threshold", type=int, default=REPEAT_THRESHOLD)
+    def check_command(user_id, threshold):
+        """Fail if a page goes over its ROUTE_BUDGETS entry."""
+        over = 0
+        for path, budget in ROUTE_BUDGETS.items():
+            status, recorder = measure_page(app, user_id, path)
+            mark = "✅" if recorder.count <= budget else "❌"
+            over += recorder.count > budget
+            click.echo(f"{mark} {path:<16} {recorder.count:>3}/{budget} (HTTP {status})")
+            for shape, times, location in recorder.repeated(threshold):
+                click.echo(f"   🔁 {times}x {shape[:120]}\n      at {location}")
+        if over:
+            raise SystemExit(1)
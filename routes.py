@@ -1,13 +1,25 @@
 from flask import render_template, request, redirect, session, url_for, flash, send_from_directory
+from flask import Response, abort, stream_with_context
 import models
+import exporter
+import importer
+import view_cache
+import profiler
+import ai_cache
+import allocator
+import jobs
+import loan_schedule
+import chat_session
 from functools import wraps
 from datetime import datetime, date
-from dateutil.relativedelta import relativedelta
 
-import requests
+import llm_client
+import chat_stream
 import json
 import re
 import os
+import time
+import uuid
 
 
 # -------------------------------
@@ -24,14 +36,50 @@ def login_required(f):
     return wrapper
 
 
+# -------------------------------
+# Keyset page helper for the JSON list endpoints
+# -------------------------------
+def json_page(fetch, *args):
+    try:
+        limit = min(int(request.args.get("limit", models.PAGE_SIZE)), 100)
+        return fetch(*args, cursor=request.args.get("cursor"), limit=max(limit, 1))
+    except ValueError:
+        return {"error": "Invalid cursor or limit"}, 400
+
+
 # -------------------------------
 # 🧠 AI HELPER FUNCTION (Global Scope)
 # -------------------------------
 def ask_llama_budget(salary, frequency, fixed_expenses, zero_items, remaining_budget):
-    API_KEY = os.environ.get("GROQ_API_KEY")  #
-    API_URL = "https://api.groq.com/openai/v1/chat/completions"  #
-    MODEL = "llama-3.3-70b-versatile"  #
+    # Users regenerate the same form over and over; reuse earlier answers
+    key = ai_cache.allocation_key(
+        salary, frequency, fixed_expenses, zero_items, remaining_budget
+    )
+    cached = ai_cache.get(key)
+    if cached:
+        response, seconds = cached
+        stats = ai_cache.get_stats()
+        print(
+            f"⚡ AI cache hit (saved {seconds:.2f}s; hit rate "
+            f"{stats['hit_rate']:.0%}, {stats['saved_seconds']:.1f}s saved total)"
+        )
+        return dict(response, plan=allocator.coerce_plan(response["plan"]))
+
+    started = time.perf_counter()
+    response = request_llama_budget(
+        salary, frequency, fixed_expenses, zero_items, remaining_budget
+    )
+    if response and "plan" in response:
+        # Checked here, on the job pool: an unusable plan fails its job once
+        # (the page falls back to the budget engine) and is never cached
+        response["plan"] = allocator.coerce_plan(response["plan"])
+        ai_cache.put(key, response, time.perf_counter() - started)
+    return response
 
+
+def request_llama_budget(
+    salary, frequency, fixed_expenses, zero_items, remaining_budget
+):
     total_fixed = sum(fixed_expenses.values())  #
     fixed_ratio = (total_fixed / salary) * 100 if salary > 0 else 0  #
 
@@ -60,43 +108,161 @@ def ask_llama_budget(salary, frequency, fixed_expenses, zero_items, remaining_bu
     4. Return ONLY a valid JSON object with keys: "plan" and "reasoning".
     """
 
-    payload = {
-        "model": MODEL,
-        "messages": [
-            {
-                "role": "system",
-                "content": "You are a JSON-only financial API that provides a budget 'plan' and its 'reasoning'.",
-            },
-            {"role": "user", "content": prompt},
-        ],
-        "temperature": 0.2,  # Slightly higher for natural reasoning text
-    }
-
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json",
-    }  #
+    messages = [
+        {
+            "role": "system",
+            "content": "You are a JSON-only financial API that provides a budget 'plan' and its 'reasoning'.",
+        },
+        {"role": "user", "content": prompt},
+    ]
 
     try:
-        response = requests.post(API_URL, json=payload, headers=headers)  #
-        data = response.json()  #
-
-        if "choices" in data:
-            raw_content = data["choices"][0]["message"]["content"]  #
-            print(f"\n🤖 AI RAW RESPONSE: {raw_content}\n")  #
-
-            start = raw_content.find("{")  #
-            end = raw_content.rfind("}") + 1  #
-            if start != -1 and end != -1:
-                return json.loads(raw_content[start:end])  #
-            return None
-        else:
-            return None
+        # Slightly higher temperature for natural reasoning text
+        raw_content = llm_client.chat_completion(messages, temperature=0.2)
+        print(f"\n🤖 AI RAW RESPONSE: {raw_content}\n")  #
+
+        start = raw_content.find("{")  #
+        end = raw_content.rfind("}") + 1  #
+        if start != -1 and end != -1:
+            return json.loads(raw_content[start:end])  #
+        return None
     except Exception as e:
         print(f"❌ Connection Error: {e}")
         return None
 
 
+def ask_llama_reasoning(salary, frequency, fixed_expenses, plan, remaining_budget):
+    """Asks the LLM only to explain a plan the local engine already made.
+    Returns the text, or None when the AI is unreachable."""
+    key = ai_cache.allocation_key(
+        salary, frequency, fixed_expenses, list(plan), remaining_budget, plan=plan
+    )
+    cached = ai_cache.get(key)
+    if cached:
+        return cached[0]
+
+    prompt = f"""
+    A budget engine distributed the remaining budget of {remaining_budget} as follows:
+    {json.dumps(plan)}
+
+    CONTEXT:
+    - Income: {salary} ({frequency})
+    - Fixed Expenses: {json.dumps(fixed_expenses)}
+
+    In a concise, professional 2-3 sentences, explain the logic of this plan to its owner.
+    Return ONLY the explanation text.
+    """
+    messages = [
+        {"role": "system", "content": "You are a friendly financial advisor."},
+        {"role": "user", "content": prompt},
+    ]
+
+    started = time.perf_counter()
+    try:
+        reasoning = llm_client.chat_completion(messages, temperature=0.2).strip()
+    except llm_client.LLMError as e:
+        print(f"❌ Connection Error: {e}")
+        return None
+    ai_cache.put(key, reasoning, time.perf_counter() - started)
+    return reasoning
+
+
+# -------------------------------
+# 🧩 BLUEPRINT JOBS (AI generation off the request thread)
+# -------------------------------
+def wants_json():
+    accept = request.accept_mimetypes
+    return accept.best == "application/json" or (
+        accept.accept_json and not accept.accept_html
+    )
+
+
+def blueprint_state(
+    user_id, mode, salary, frequency, parsed_items, zero_items_indices, remaining
+):
+    """Everything needed to finish a blueprint later, JSON-serializable so it
+    can be stored as a job payload."""
+    zero_names = [parsed_items[i]["name"] for i in zero_items_indices]
+    state = {
+        "mode": "local" if mode == "local" else "llm",
+        "salary": salary,
+        "frequency": frequency,
+        "items": parsed_items,
+        "zero": zero_items_indices,
+        "remaining": remaining,
+        "fixed": {
+            item["name"]: item["user"] for item in parsed_items if item["user"] > 0
+        },
+    }
+    if state["mode"] == "local":
+        # Amounts are fixed now, so the LLM explains exactly what is shown
+        state["amounts"] = allocator.allocate(
+            zero_names, remaining, allocator.load_history(user_id)
+        )
+    return state
+
+
+@jobs.handler("blueprint")
+def blueprint_job(state):
+    zero_names = [state["items"][i]["name"] for i in state["zero"]]
+    if state["mode"] == "local":
+        return ask_llama_reasoning(
+            state["salary"],
+            state["frequency"],
+            state["fixed"],
+            dict(zip(zero_names, state["amounts"])),
+            state["remaining"],
+        )
+    print("🤖 Asking Llama...")
+    return ask_llama_budget(
+        state["salary"],
+        state["frequency"],
+        state["fixed"],
+        zero_names,
+        state["remaining"],
+    )
+
+
+def apply_blueprint(user_id, state, answer):
+    """Fills the zero-amount items of state["items"] from `answer` (what
+    blueprint_job returned, or None) and returns (ai_note, ai_reasoning)."""
+    parsed_items = state["items"]
+    zero_items_indices = state["zero"]
+    zero_names = [parsed_items[i]["name"] for i in zero_items_indices]
+    remaining = state["remaining"]
+
+    if state["mode"] == "local":
+        # Amounts come from the local engine; the LLM only explains
+        amounts = state["amounts"]
+        history = allocator.load_history(user_id)
+        ai_reasoning = answer or allocator.describe(
+            dict(zip(zero_names, amounts)), remaining, history
+        )
+        ai_note = "⚡ Budget engine distributed your remaining funds."
+    elif answer and "plan" in answer:
+        ai_plan = answer["plan"]
+        ai_reasoning = answer.get("reasoning", "AI optimized your budget.")
+        ai_note = "✨ AI (Llama 3) successfully distributed your remaining funds."
+
+        # One normalized index per response instead of re-simplifying every
+        # key for every item
+        matched = allocator.PlanIndex(ai_plan).assign(zero_names)
+        amounts = [float(value or 0) for value in matched]
+    else:
+        ai_note = f"📡 (Offline Mode) Distributed ₱{remaining:,.2f} with the budget engine."
+        history = allocator.load_history(user_id)
+        amounts = allocator.allocate(zero_names, remaining, history)
+        ai_reasoning = (
+            "I couldn't reach the AI brain, so the local engine did the math. "
+            + allocator.describe(dict(zip(zero_names, amounts)), remaining, history)
+        )
+
+    for idx, amount in zip(zero_items_indices, amounts):
+        parsed_items[idx]["ai"] = amount
+        parsed_items[idx]["auto"] = True
+    return ai_note, ai_reasoning
+
+
 # -------------------------------
 # Routes registration (Main Function)
 # -------------------------------
@@ -106,17 +272,16 @@ def init_routes(app):
     # --- Date Filter ---
     @app.template_filter("datetimeformat")
     def datetimeformat(value, format="%b %d, %Y"):
+        if value is None:
+            return ""
+        # Models hand templates real dates/datetimes; strings are the rare
+        # leftover (cached views, JSON) and get one ISO parse
+        if isinstance(value, (datetime, date)):
+            return value.strftime(format)
         try:
-            dt = datetime.strptime(value, "%Y-%m-%d %H:%M:%S.%f")
+            return datetime.fromisoformat(value).strftime(format)
         except (ValueError, TypeError):
-            try:
-                dt = datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
-            except (ValueError, TypeError):
-                try:
-                    dt = datetime.strptime(value, "%Y-%m-%d")
-                except (ValueError, TypeError):
-                    return value
-        return dt.strftime(format)
+            return value
 
     # ---------------------------------------------------
     #  SMART BUDGET ROUTE (INDENTED INSIDE init_routes)
@@ -129,6 +294,26 @@ def init_routes(app):
         salary_info = None
         ai_note = None
         ai_reasoning = None  # Added to track AI explanation
+        pending_job = None
+
+        job_id = request.args.get("job")
+        if request.method == "GET" and job_id:
+            job = jobs.get_job(job_id, user_id)
+            if job is None:
+                flash("Budget job not found", "error")
+                return redirect(url_for("smart_budget"))
+            state = json.loads(job.payload)
+            salary_info = {"amount": state["salary"], "frequency": state["frequency"]}
+            if job.status in jobs.FINISHED:
+                answer = json.loads(job.result) if job.result else None
+                try:
+                    ai_note, ai_reasoning = apply_blueprint(user_id, state, answer)
+                except (TypeError, ValueError):
+                    # Results stored before plans were checked on the job pool
+                    ai_note, ai_reasoning = apply_blueprint(user_id, state, None)
+                results = state["items"]
+            else:
+                pending_job = job.id
 
         if request.method == "POST":
             try:
@@ -162,68 +347,35 @@ def init_routes(app):
                     if amt > 0:
                         total_fixed += amt
                     else:
-                        zero_items_indices.append(i)
+                        # Index into parsed_items, which skips blank rows
+                        zero_items_indices.append(len(parsed_items) - 1)
 
                 remaining = salary - total_fixed
 
                 # --- DISTRIBUTION LOGIC ---
                 if remaining > 0 and zero_items_indices and not save_mode:
-                    # Prepare data for AI
-                    fixed_dict = {
-                        item["name"]: item["user"]
-                        for item in parsed_items
-                        if item["user"] > 0
-                    }
-                    zero_names = [parsed_items[i]["name"] for i in zero_items_indices]
-
-                    # Call upgraded AI helper
-                    print("🤖 Asking Llama...")
-                    ai_response = ask_llama_budget(
-                        salary, frequency, fixed_dict, zero_names, remaining
+                    state = blueprint_state(
+                        user_id,
+                        app.config.get("SMART_BUDGET_MODE"),
+                        salary,
+                        frequency,
+                        parsed_items,
+                        zero_items_indices,
+                        remaining,
                     )
-
-                    if ai_response and "plan" in ai_response:
-                        ai_plan = ai_response["plan"]
-                        ai_reasoning = ai_response.get(
-                            "reasoning", "AI optimized your budget."
-                        )
-                        ai_note = "✨ AI (Llama 3) successfully distributed your remaining funds."
-
-                        for idx in zero_items_indices:
-                            original_name = parsed_items[idx]["name"]
-                            allocated = 0
-
-                            # Smart Match Logic
-                            if original_name in ai_plan:
-                                allocated = ai_plan[original_name]
-                            else:
-                                simple_name = (
-                                    re.sub(r"[^\w\s]", "", original_name)
-                                    .strip()
-                                    .lower()
-                                )
-                                for key, val in ai_plan.items():
-                                    simple_key = (
-                                        re.sub(r"[^\w\s]", "", key).strip().lower()
-                                    )
-                                    if (
-                                        simple_name == simple_key
-                                        or simple_name in simple_key
-                                    ):
-                                        allocated = val
-                                        break
-
-                            parsed_items[idx]["ai"] = float(allocated)
-                            parsed_items[idx]["auto"] = True
-                    else:
-                        ai_note = (
-                            f"📡 (Offline Mode) Distributed ₱{remaining:,.2f} equally."
-                        )
-                        ai_reasoning = "I couldn't reach the AI brain, so I split the remaining budget equally."
-                        share = remaining / len(zero_items_indices)
-                        for idx in zero_items_indices:
-                            parsed_items[idx]["ai"] = share
-                            parsed_items[idx]["auto"] = True
+                    needs_ai = state["mode"] != "local" or app.config.get(
+                        "SMART_BUDGET_AI_REASONING"
+                    )
+                    if needs_ai:
+                        # The LLM round trip runs on the job pool, not this worker
+                        job = jobs.submit(user_id, "blueprint", state)
+                        if wants_json():
+                            return {
+                                "job_id": job.id,
+                                "status_url": url_for("smart_budget_job", job_id=job.id),
+                            }, 202
+                        return redirect(url_for("smart_budget", job=job.id))
+                    ai_note, ai_reasoning = apply_blueprint(user_id, state, None)
 
                 elif remaining < 0:
                     ai_note = "⚠️ Expenses exceed income!"
@@ -255,6 +407,18 @@ def init_routes(app):
                 flash(f"Error: {str(e)}", "error")
                 print(e)
 
+        # Seed the server-side chat about this blueprint (see chat_session.py)
+        chat_plan_id = None
+        if results:
+            chat_plan_id = job_id or uuid.uuid4().hex
+            chat_session.start(
+                session.setdefault("chat_sid", uuid.uuid4().hex),
+                chat_plan_id,
+                salary_info["amount"],
+                salary_info["frequency"],
+                {item["name"]: item["ai"] for item in results},
+            )
+
         history = models.get_user_budgets(user_id)
         return render_template(
             "smart_budget.html",
@@ -262,10 +426,22 @@ def init_routes(app):
             salary_info=salary_info,
             ai_note=ai_note,
             ai_reasoning=ai_reasoning,  # Pass reasoning to template
+            pending_job=pending_job,
+            chat_plan_id=chat_plan_id,
             history=history,
             username=session.get("username", "User"),
         )
 
+    @app.route("/smart-budget/jobs/<job_id>")
+    @login_required
+    def smart_budget_job(job_id):
+        job = jobs.get_job(job_id, session["user_id"])
+        if job is None:
+            return {"error": "Job not found"}, 404
+        # Picks up jobs a restarted or crashed worker left behind
+        jobs.recover(job)
+        return jobs.job_status(job)
+
     @app.route("/smart-budget/view/<int:id>")
     @login_required
     def view_smart_budget(id):
@@ -287,10 +463,7 @@ def init_routes(app):
 
         data = request.json
         user_message = data.get("message")
-        full_context = data.get("context", "No context.")
-
-        API_KEY = os.environ.get("GROQ_API_KEY")
-        API_URL = "https://api.groq.com/openai/v1/chat/completions"
+        full_context = data.get("context", "")
 
         # --- SMART RE-BALANCING LOGIC ---
         system_instruction = """
@@ -325,45 +498,150 @@ def init_routes(app):
         }
         """
 
-        prompt = f"""
-        CURRENT BLUEPRINT:
-        {full_context}
+        # The conversation (plan + compacted history) lives server-side; the
+        # browser only resends its blueprint when our copy has expired
+        sid = session.setdefault("chat_sid", uuid.uuid4().hex)
+        plan_id = str(data.get("plan_id") or "")
+        state = chat_session.load(sid, plan_id) if plan_id else None
+        if state is None:
+            if "context" not in data:
+                return {"resync": True, "reply": "Chat expired."}, 409
+            state = chat_session.from_context(full_context)
+
+        wants_stream = request.accept_mimetypes.best == "text/event-stream"
+        sse_headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+        # Plain edits ("Set Food to 6000") are solved here without the LLM
+        answer = allocator.solve_command(user_message, state["plan"], state["salary"])
+        if answer:
+            chat_session.record_turn(state, user_message, answer, "")
+            if plan_id:
+                chat_session.save(sid, plan_id, state)
+            served = allocator.get_stats()
+            print(
+                f"🧭 Chat command solved locally "
+                f"({served['local_rate']:.0%} of {served['local'] + served['llm']})"
+            )
+            if wants_stream:
+                return Response(
+                    chat_stream.stream_answer(answer),
+                    mimetype="text/event-stream",
+                    headers=sse_headers,
+                )
+            return {"reply": json.dumps(answer)}
 
-        USER COMMAND:
-        "{user_message}"
-        """
+        messages, prompt_tokens = chat_session.build_messages(
+            state, system_instruction, user_message
+        )
 
-        payload = {
-            "model": "llama-3.3-70b-versatile",
-            "messages": [
-                {"role": "system", "content": system_instruction},
-                {"role": "user", "content": prompt},
-            ],
-            "temperature": 0.1,  # Very low temperature for strict math
-        }
+        def finish_turn(answer, raw_content):
+            reply = chat_session.record_turn(state, user_message, answer, raw_content)
+            if plan_id:
+                chat_session.save(sid, plan_id, state)
+            print(
+                f"🧮 Chat turn: prompt ~{prompt_tokens} tokens, reply "
+                f"~{chat_session.estimate_tokens(raw_content)} tokens, "
+                f"{len(state['messages']) // 2} turn(s) kept"
+                f"{', summary in use' if state['summary'] else ''}"
+            )
+            return reply
 
-        try:
-            r = requests.post(
-                API_URL, json=payload, headers={"Authorization": f"Bearer {API_KEY}"}
+        if wants_stream:
+            # Forward tokens as they arrive instead of waiting for the whole answer
+            stream = chat_stream.stream_plan(
+                messages, temperature=0.1, on_finish=finish_turn
+            )
+            return Response(
+                stream_with_context(stream),
+                mimetype="text/event-stream",
+                headers=sse_headers,
             )
-            if r.status_code == 200:
-                raw_content = r.json()["choices"][0]["message"]["content"]
 
-                # --- CLEANER: Extract JSON if mixed with text ---
-                try:
-                    json_match = re.search(r"\{.*\}", raw_content, re.DOTALL)
-                    if json_match:
-                        clean_json = json_match.group(0)
-                        return {"reply": clean_json}
-                except:
-                    pass
-
-                return {"reply": raw_content}
-            else:
-                return {"reply": "I'm having trouble thinking right now."}, 500
-        except Exception as e:
+        try:
+            # Very low temperature for strict math
+            raw_content = llm_client.chat_completion(messages, temperature=0.1)
+        except llm_client.LLMUnavailable:
+            return {"reply": "I'm having trouble thinking right now."}, 503
+        except llm_client.LLMError as e:
             print(e)
             return {"reply": "Connection error."}, 500
+        finish_turn(chat_stream.parse_plan(raw_content), raw_content)
+
+        # --- CLEANER: Extract JSON if mixed with text ---
+        try:
+            json_match = re.search(r"\{.*\}", raw_content, re.DOTALL)
+            if json_match:
+                clean_json = json_match.group(0)
+                return {"reply": clean_json}
+        except:
+            pass
+
+        return {"reply": raw_content}
+
+    # ------------------ PAGINATED LIST APIs ------------------
+    @app.route("/api/transactions")
+    @login_required
+    def api_transactions():
+        return json_page(models.get_transactions_page, session["user_id"])
+
+    @app.route("/api/budget-transactions")
+    @login_required
+    def api_budget_transactions():
+        return json_page(models.get_budget_transactions_page, session["user_id"])
+
+    @app.route("/api/loans/<int:loan_id>/payments")
+    @login_required
+    def api_loan_payments(loan_id):
+        loan = models.get_loan_by_id(loan_id)
+        if not loan or loan["user_id"] != session["user_id"]:
+            return {"error": "Loan not found"}, 404
+        return json_page(models.get_loan_payments_page, loan_id)
+
+    @app.route("/api/savings/<int:savings_id>/transactions")
+    @login_required
+    def api_savings_transactions(savings_id):
+        goal = models.get_savings_by_id(savings_id)
+        if not goal or goal["user_id"] != session["user_id"]:
+            return {"error": "Savings goal not found"}, 404
+        return json_page(models.get_savings_transactions_page, savings_id)
+
+    # ------------------ DATA EXPORT ------------------
+    @app.route("/export/<dataset>.<fmt>")
+    @login_required
+    def export_dataset(dataset, fmt):
+        user_id = session["user_id"]
+        if fmt == "csv" and dataset in exporter.DATASETS:
+            body, mimetype = exporter.iter_csv(user_id, dataset), "text/csv"
+        elif fmt == "ndjson" and (dataset in exporter.DATASETS or dataset == "all"):
+            datasets = exporter.DATASETS if dataset == "all" else [dataset]
+            body = exporter.iter_ndjson(user_id, datasets)
+            mimetype = "application/x-ndjson"
+        else:
+            return {"error": "Unknown dataset or format"}, 404
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={
+                "Content-Disposition": f"attachment; filename=limoney-{dataset}.{fmt}"
+            },
+        )
+
+    @app.route("/export/bundle.zip")
+    @login_required
+    def export_bundle():
+        return Response(
+            stream_with_context(exporter.iter_zip_bundle(session["user_id"])),
+            mimetype="application/zip",
+            headers={"Content-Disposition": "attachment; filename=limoney-export.zip"},
+        )
+
+    @app.route("/cache/stats")
+    @login_required
+    def cache_stats():
+        # Process-wide numbers, so admins only, like the profiler's reports
+        if not profiler.is_admin(app):
+            abort(404)
+        return view_cache.get_stats()
 
     # ------------------ AUTH ------------------
     @app.route("/account")
@@ -426,90 +704,39 @@ def init_routes(app):
     def dashboard():
         user_id = session["user_id"]
 
-        transactions = models.get_transactions(user_id) or []
-
-        balance = sum(
-            t["amount"] if t["type"] == "income" else -t["amount"] 
-            for t in transactions
-        )
-
-        total_savings = models.get_total_savings(user_id) or 0
-
-        try:
-            cards = models.get_user_cards(user_id) or []
-        except Exception:
-            cards = []
-
-        total_wallet = sum(card["balance"] for card in cards)
-
-        loans = models.get_loans(user_id) or []
-
-        # Prepare Chart Data
-        loan_labels = []
-        loan_totals = []
-        loan_paids = []
-        total_remaining_debt = 0
-
-        nearest_due = 999  # Default to a high number (far away)
-        today = date.today()
-
-        for loan in loans:
-
-            paid = models.get_total_loan_payments(loan["id"]) or 0
-            remaining = loan["amount"] - paid
-
-            # Only count positive debt
-            if remaining > 0:
-                total_remaining_debt += remaining
-
-                # --- SMART REMINDER LOGIC START ---
-                try:
-                    # 1. Parse the start date to get the "Day of Month" (e.g., 15th)
-                    start_dt = datetime.strptime(loan["start_date"], "%Y-%m-%d").date()
-
-                    # 2. Create a due date for THIS current month
-                    # (Handle error if today is Feb and due date is 30th)
-                    try:
-                        this_month_due = date(today.year, today.month, start_dt.day)
-                    except ValueError:
-                        # Fallback for short months (use 28th or 1st of next month)
-                        this_month_due = date(today.year, today.month, 28)
-
-                    # 3. If this month's due date has passed, the next one is next month
-                    if this_month_due < today:
-                        next_due = this_month_due + relativedelta(months=1)
-                    else:
-                        next_due = this_month_due
-
-                    # 4. Calculate days remaining
-                    days_diff = (next_due - today).days
-
-                    # 5. Keep the smallest number (the most urgent loan)
-                    if days_diff < nearest_due:
-                        nearest_due = days_diff
-                except Exception:
-                    pass  # If date parsing fails, skip this loan
-
-            # Prepare Chart Data
-            loan_labels.append(loan["loan_name"])
-            loan_totals.append(loan["amount"])
-            loan_paids.append(paid)
-
+        def load():
+            try:
+                cards = models.get_user_cards(user_id) or []
+            except Exception:
+                cards = []
+            return {"snapshot": models.get_dashboard_snapshot(user_id), "cards": cards}
+
+        data = view_cache.cached_view(user_id, "dashboard", load)
+        snapshot, cards = data["snapshot"], data["cards"]
+
+        # Due dates are kept on the loans when they are written (see
+        # loan_schedule.py); only the distance from today is left to work out
+        next_due = snapshot["next_due_date"]
+        nearest_due = (next_due - date.today()).days if next_due else 999
+
+        total_wallet = snapshot["total_wallet"]
+        total_savings = snapshot["total_savings"]
+        total_remaining_debt = snapshot["total_debt"]
         net_balance = (total_wallet + total_savings) - total_remaining_debt
 
         return render_template(
             "dashboard.html",
-            transactions=transactions,
-            balance=balance,
+            transactions=snapshot["recent_transactions"],
+            balance=snapshot["balance"],
             total_wallet=total_wallet,
             total_savings=total_savings,
             total_debt=total_remaining_debt,
             days_until_due=nearest_due,
             net_balance=net_balance,
             username=session.get("username", "User"),  # Safe fallback name
-            loan_labels=loan_labels,
-            loan_totals=loan_totals,
-            loan_paids=loan_paids,
+            loan_labels=snapshot["loan_labels"],
+            loan_totals=snapshot["loan_totals"],
+            loan_paids=snapshot["loan_paids"],
             cards=cards,
         )
 
@@ -527,20 +754,70 @@ def init_routes(app):
         flash("Transaction added successfully!", "success")
         return redirect(url_for("dashboard"))
 
+    @app.route("/import-statement", methods=["POST"])
+    @login_required
+    def import_statement():
+        upload = request.files.get("statement")
+        target = request.form.get("target", "transactions")
+        if not upload or not upload.filename:
+            flash("Please choose a CSV or OFX file", "error")
+        else:
+            try:
+                result = importer.import_statement(
+                    session["user_id"],
+                    importer.open_text(upload.stream),
+                    importer.detect_format(upload.filename),
+                    target,
+                )
+                flash(
+                    f"Imported {result['inserted']} rows "
+                    f"({result['skipped']} skipped as duplicates or zero amounts)",
+                    "success",
+                )
+            except importer.StatementError as e:
+                flash(f"Import failed: {str(e)}", "error")
+            except Exception as e:
+                flash(f"Error importing statement: {str(e)}", "error")
+        if target == "budget":
+            return redirect(url_for("budget_tracker"))
+        return redirect(url_for("dashboard"))
+
     # ------------------ LOAN TRACKER ------------------
     @app.route("/loan-tracker")
     @login_required
     def loan_tracker():
-        loans = models.get_loans(session["user_id"])
+        user_id = session["user_id"]
+
+        def load():
+            loans = models.get_loans(user_id)
+            histories = models.get_loan_payment_histories(user_id)
+            empty = {"total": 0}
+            payoffs, left = loan_schedule.project_payoffs(
+                [l["next_due_date"] for l in loans],
+                [l["amount"] - histories.get(l["id"], empty)["total"] for l in loans],
+                [l["monthly_payment"] or 0 for l in loans],
+                [loan_schedule.due_day(l["start_date"]) for l in loans],
+            )
+            for loan, payoff, installments_left in zip(loans, payoffs, left):
+                loan["projected_payoff"] = payoff
+                loan["installments_left"] = installments_left
+            return {"loans": loans, "histories": histories}
+
+        data = view_cache.cached_view(user_id, "loan_tracker", load)
+        loans, histories = data["loans"], data["histories"]
         active_loans = []
         finished_loans = []
-        today = date.today()
         for loan in loans:
-            total_paid = models.get_total_loan_payments(loan["id"])
+            history = histories.get(loan["id"], {"payments": [], "total": 0})
+            total_paid = history["total"]
+            loan["total_paid"] = total_paid
+            loan["payments"] = history["payments"]
             remaining_balance = loan["amount"] - total_paid
             if remaining_balance <= 0:
+                # Only write when the status actually changes
+                if loan["status"] != "Full Loan Paid":
+                    models.update_loan_status(loan["id"], "Full Loan Paid")
                 loan["status"] = "Full Loan Paid"
-                models.update_loan_status(loan["id"], "Full Loan Paid")
                 finished_loans.append(loan)
             else:
                 active_loans.append(loan)
@@ -548,28 +825,12 @@ def init_routes(app):
                     loan["status"] = "Partial Payment"
                 else:
                     loan["status"] = "Outstanding"
-                start = datetime.strptime(loan["start_date"], "%Y-%m-%d").date()
-                end = datetime.strptime(loan["end_date"], "%Y-%m-%d").date()
-                if today > end:
-                    loan["duration_months"] = 0
-                    loan["duration_days"] = 0
-                else:
-                    delta = relativedelta(end, today)
-                    loan["duration_months"] = delta.years * 12 + delta.months
-                    total_days = (end - today).days
-                    full_months_date = today + relativedelta(
-                        months=loan["duration_months"]
-                    )
-                    days_in_full_months = (full_months_date - today).days
-                    loan["duration_days"] = max(total_days - days_in_full_months, 0)
             loan["notes"] = loan.get("notes") or ""
         return render_template(
             "loan_tracker.html",
             active_loans=active_loans,
             finished_loans=finished_loans,
             username=session["username"],
-            get_loan_payments=models.get_loan_payments,
-            get_total_loan_payments=models.get_total_loan_payments,
             current_date=date.today().isoformat(),
         )
 
@@ -645,15 +906,41 @@ def init_routes(app):
     @login_required
     def savings_tracker():
         user_id = session["user_id"]
-        savings_data = models.get_savings(user_id)
+
+        def load():
+            savings_data = models.get_savings(user_id)
+            recent = models.get_recent_savings_transactions(user_id)
+            for goal in savings_data:
+                history = recent.get(goal["id"], {"transactions": [], "count": 0})
+                goal["history"] = history["transactions"]
+                goal["history_count"] = history["count"]
+            return savings_data
+
+        savings_data = view_cache.cached_view(user_id, "savings", load)
 
         return render_template(
             "savings.html", 
             savings=savings_data, 
             username=session["username"],
-            get_savings_transactions=models.get_savings_transactions 
     )
 
+    @app.route("/savings/<int:savings_id>/history")
+    @login_required
+    def savings_history(savings_id):
+        goal = models.get_savings_by_id(savings_id)
+        if not goal or goal["user_id"] != session["user_id"]:
+            return {"error": "Savings goal not found"}, 404
+        try:
+            before_id = int(request.args["before"])
+        except (KeyError, ValueError):
+            return {"error": "A numeric 'before' cursor is required"}, 400
+
+        txns, has_more = models.get_older_savings_transactions(savings_id, before_id)
+        for t in txns:
+            # Same "YYYY-MM-DD HH:MM:SS" shape the template renders
+            t["timestamp"] = str(t["timestamp"])
+        return {"transactions": txns, "has_more": has_more}
+
     @app.route("/add-savings", methods=["POST"])
     @login_required
     def add_savings():
@@ -723,19 +1010,33 @@ def init_routes(app):
     @login_required
     def budget_tracker():
         user_id = session["user_id"]
-        categories = models.get_budget_categories(user_id)
-        transactions = models.get_budget_transactions(user_id)
-        expense_totals = models.get_expense_totals_by_type(user_id)
-        savings_accounts = models.get_active_savings(user_id)
-        for c in categories:
-            c["actual_spent"] = models.get_actual_spent(user_id, c["id"])
+
+        period = request.args.get("period", "all")
+        if period not in models.BUDGET_PERIODS:
+            period = "all"
+
+        def load():
+            models.seed_default_categories(user_id)
+            return {
+                # The page lists the 8 most recent; older ones come from the API
+                "transactions": models.get_budget_transactions_page(
+                    user_id, limit=8
+                )["items"],
+                "savings": models.get_active_savings(user_id),
+            }
+
+        data = view_cache.cached_view(user_id, "budget", load)
+        # Period totals come from the monthly rollups (a few rows per
+        # category), so they are read fresh instead of cached per period
         return render_template(
             "budget.html",
-            categories=categories,
-            transactions=transactions,
+            categories=models.get_category_summary(user_id, period),
+            transactions=data["transactions"],
             username=session["username"],
-            expense_totals=expense_totals,
-            savings=savings_accounts,
+            expense_totals=models.get_expense_totals_by_type(user_id, period),
+            savings=data["savings"],
+            period=period,
+            periods=models.BUDGET_PERIODS,
         )
 
     @app.route("/add-budget", methods=["POST"])
@@ -0,0 +1,151 @@
+-- Schema of a database created by the app before numbered migrations
+-- existed: db.create_all() on the original models, as in the baseline
+-- commit. test_migrations.py upgrades it to the latest revision.
+
+CREATE TABLE users (
+	id INTEGER NOT NULL,
+	username VARCHAR(80) NOT NULL,
+	email VARCHAR(120) NOT NULL,
+	password VARCHAR(200) NOT NULL,
+	PRIMARY KEY (id),
+	UNIQUE (username),
+	UNIQUE (email)
+);
+
+CREATE TABLE transactions (
+	id INTEGER NOT NULL,
+	user_id INTEGER NOT NULL,
+	description VARCHAR(200),
+	amount FLOAT NOT NULL,
+	type VARCHAR(20) NOT NULL,
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE loans (
+	id INTEGER NOT NULL,
+	user_id INTEGER NOT NULL,
+	loan_name VARCHAR(100),
+	amount FLOAT,
+	start_date VARCHAR(20),
+	end_date VARCHAR(20),
+	monthly_payment FLOAT,
+	notes TEXT,
+	paid_amount FLOAT,
+	status VARCHAR(20),
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE savings (
+	id INTEGER NOT NULL,
+	user_id INTEGER NOT NULL,
+	savings_name VARCHAR(100) NOT NULL,
+	target_amount FLOAT,
+	current_balance FLOAT,
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE budget_categories (
+	id INTEGER NOT NULL,
+	user_id INTEGER NOT NULL,
+	name VARCHAR(100) NOT NULL,
+	planned_budget FLOAT,
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE user_profiles (
+	id INTEGER NOT NULL,
+	user_id INTEGER NOT NULL,
+	surname VARCHAR(100),
+	firstname VARCHAR(100),
+	middle_initial VARCHAR(10),
+	nickname VARCHAR(50),
+	occupation VARCHAR(100),
+	company VARCHAR(100),
+	salary FLOAT,
+	created_at DATETIME,
+	updated_at DATETIME,
+	PRIMARY KEY (id),
+	UNIQUE (user_id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE cards (
+	id INTEGER NOT NULL,
+	user_id INTEGER,
+	bank_name VARCHAR(100),
+	card_type VARCHAR(50),
+	last_four VARCHAR(4),
+	balance FLOAT,
+	color_theme VARCHAR(20),
+	usage_tag VARCHAR(50),
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE salary_budgets (
+	id INTEGER NOT NULL,
+	user_id INTEGER NOT NULL,
+	salary_amount FLOAT NOT NULL,
+	frequency VARCHAR(50) NOT NULL,
+	total_allocated FLOAT,
+	created_at DATETIME,
+	ai_reasoning TEXT,
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE loan_payments (
+	id INTEGER NOT NULL,
+	loan_id INTEGER NOT NULL,
+	user_id INTEGER NOT NULL,
+	amount FLOAT,
+	pay_date VARCHAR(20),
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(loan_id) REFERENCES loans (id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE savings_transactions (
+	id INTEGER NOT NULL,
+	savings_id INTEGER NOT NULL,
+	type VARCHAR(20),
+	amount FLOAT NOT NULL,
+	timestamp DATETIME,
+	note VARCHAR(200),
+	PRIMARY KEY (id),
+	FOREIGN KEY(savings_id) REFERENCES savings (id)
+);
+
+CREATE TABLE budget_transactions (
+	id INTEGER NOT NULL,
+	user_id INTEGER NOT NULL,
+	category_id INTEGER NOT NULL,
+	description VARCHAR(200),
+	amount FLOAT NOT NULL,
+	expense_type VARCHAR(20),
+	savings_id INTEGER,
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES users (id),
+	FOREIGN KEY(category_id) REFERENCES budget_categories (id),
+	FOREIGN KEY(savings_id) REFERENCES savings (id)
+);
+
+CREATE TABLE salary_budget_items (
+	id INTEGER NOT NULL,
+	budget_id INTEGER NOT NULL,
+	item_name VARCHAR(100) NOT NULL,
+	user_amount FLOAT,
+	ai_amount FLOAT,
+	is_auto_filled BOOLEAN,
+	PRIMARY KEY (id),
+	FOREIGN KEY(budget_id) REFERENCES salary_budgets (id)
+);
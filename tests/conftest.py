@@ -0,0 +1,87 @@
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# app.py configures itself at import time, so point it at a throwaway
+# database and per-process caches before anything imports it
+TMP_DIR = tempfile.mkdtemp(prefix="limoney-tests-")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(TMP_DIR, "test.db")
+os.environ["VIEW_CACHE_BACKEND"] = "memory"
+
+# The query_budget fixture
+pytest_plugins = ["query_watch"]
+
+_user_numbers = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import app as flask_app
+    import migrations
+
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        migrations.upgrade()
+    yield flask_app
+    shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def user(app):
+    """A new user with no data, inside an app context for the test."""
+    import models
+
+    username = f"user{next(_user_numbers)}"
+    with app.app_context():
+        models.create_user(username, f"{username}@example.com", "password")
+        yield models.get_user_by_username(username)
+
+
+@pytest.fixture
+def client(app, user):
+    """A test client logged in as `user`."""
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = user["id"]
+        sess["username"] = user["username"]
+    return client
+
+
+@pytest.fixture
+def seed(user):
+    """seed(loans=.., goals=.., categories=.., rows=..) adds data to `user`."""
+    return lambda **counts: seed_user_data(user["id"], **counts)
+
+
+def seed_user_data(user_id, loans=3, goals=3, categories=3, rows=5):
+    """Gives a user some of everything the main pages show, through the
+    same write functions the routes use."""
+    import models
+
+    for i in range(rows):
+        models.add_transaction(user_id, f"Salary {i}", 20000, "income")
+        models.add_transaction(user_id, f"Rent {i}", 5000, "expense")
+    for i in range(loans):
+        models.add_loan(
+            user_id, f"Loan {i}", 12000, "2026-01-15", "2027-01-15", 1000, ""
+        )
+    for loan in models.get_loans(user_id):
+        for _ in range(rows):
+            models.add_loan_payment(loan["id"], user_id, 1000, "2026-02-15")
+    for i in range(goals):
+        models.add_savings(user_id, f"Goal {i}", 50000)
+    for goal in models.get_savings(user_id):
+        for _ in range(rows):
+            models.deposit_savings(goal["id"], 500, "deposit")
+    for i in range(categories):
+        models.add_category(user_id, f"Category {i}", 3000)
+    for category in models.get_categories(user_id):
+        for _ in range(rows):
+            models.add_budget_transaction(user_id, category["id"], "Spend", 150)
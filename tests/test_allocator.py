@@ -0,0 +1,149 @@
+import pytest
+
+import allocator
+from allocator import PlanIndex
+
+
+@pytest.mark.parametrize(
+    "plan_key, item",
+    [
+        # exact, after dropping punctuation, emoji and case
+        ("Rent 🏠", "rent"),
+        ("ELECTRIC BILL!", "Electric Bill"),
+        # token overlap
+        ("Food & Drinks", "Food"),
+        ("Car Loan Payment", "Car Loan"),
+        # fuzzy spelling
+        ("Groceries", "Groceris"),
+        ("Transportation", "Transportaton"),
+    ],
+)
+def test_plan_key_matches_item(plan_key, item):
+    assert PlanIndex({plan_key: 1500}).assign([item]) == [1500]
+
+
+@pytest.mark.parametrize(
+    "plan_key, item",
+    [
+        ("Entertainment", "Transportation"),
+        # token overlap under TOKEN_MATCH_MIN (1 shared word of 1 + 4)
+        ("Food", "Monthly Food Budget Plan"),
+        # spelling under FUZZY_MATCH_MIN
+        ("Rest", "Rent"),
+    ],
+)
+def test_no_match_below_the_thresholds(plan_key, item):
+    assert PlanIndex({plan_key: 1500}).assign([item]) == [None]
+
+
+def test_each_plan_key_feeds_at_most_one_item():
+    result = PlanIndex({"Loan": 50}).assign(["Car Loan", "Home Loan"])
+    assert sorted(result, key=str) == [50, None]
+
+
+def test_duplicate_items_take_duplicate_keys_in_turn():
+    result = PlanIndex({"Rent": 1, "rent": 2}).assign(["Rent", "RENT", "Rent"])
+    assert result == [1, 2, None]
+
+
+def test_strongest_pair_is_assigned_first():
+    # "Food" reaches the threshold too, but "Food Budget" shares more words
+    result = PlanIndex({"Food Budget Monthly": 900}).assign(["Food", "Food Budget"])
+    assert result == [None, 900]
+
+
+def test_exact_match_wins_over_an_earlier_fuzzy_one():
+    plan = {"Savings": 3000, "Saving": 2000}
+    assert PlanIndex(plan).assign(["Saving", "Savings"]) == [2000, 3000]
+
+
+def test_assignment_is_one_to_one_on_a_shuffled_plan():
+    items = [f"Category {i}" for i in range(40)]
+    plan = {f"category {i}!": i for i in reversed(range(40))}
+    result = PlanIndex(plan).assign(items)
+    assert result == list(range(40))
+    assert len(set(result)) == len(result)
+
+
+PLAN = {
+    "Food": 5000,
+    "Potato": 1000,
+    "Potato Chips": 500,
+    "Ketchup": 300,
+    "Ketchup Packets": 100,
+    "Cat": 800,
+    "Fun": 2000,
+    "Rent": 9000,
+}
+
+
+@pytest.mark.parametrize(
+    "message, targets",
+    [
+        # The five forms
+        ("Increase food by 1000", {"Food": 6000}),
+        ("Add 500 to Potato", {"Potato": 1500}),
+        ("Reduce fun by 500", {"Fun": 1500}),
+        ("Take 200 from ketchup", {"Ketchup": 100}),
+        ("Set food to 6k", {"Food": 6000}),
+        # Names ending in a preposition or the peso prefix stay whole
+        ("Potato 700", {"Potato": 700}),
+        ("set potato to 700", {"Potato": 700}),
+        ("Set cat 900", {"Cat": 900}),
+        ("cat at 900", {"Cat": 900}),
+        ("make ketchup 250", {"Ketchup": 250}),
+        ("ketchup p250", {"Ketchup": 250}),
+        ("potato chips = 650", {"Potato Chips": 650}),
+        ("fun: ₱1,500.50", {"Fun": 1500.5}),
+        # Several clauses, and never below zero
+        ("Set Food to 6000 and cut Fun by 500", {"Food": 6000, "Fun": 1500}),
+        ("take php 1,500 from rent, then reduce cat by 5000", {"Rent": 7500, "Cat": 0}),
+        ("add 100 to food; add 200 for food", {"Food": 5300}),
+    ],
+)
+def test_parse_command(message, targets):
+    assert allocator.parse_command(message, PLAN) == targets
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "Why is rent so high?",
+        "set groceries to 500",
+        "increase food by a lot",
+        "set food to 6000 and tell me a joke",
+        # Matches both Potato and Potato Chips
+        "set potat to 500",
+    ],
+)
+def test_parse_command_returns_none(message):
+    assert allocator.parse_command(message, PLAN) is None
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "Increase food by 1000",
+        "Add 500 to Potato",
+        "Reduce fun by 500",
+        "Take 200 from ketchup",
+        "Set food to 6k",
+        "Set food to 6000 and cut fun by 1500",
+    ],
+)
+def test_rebalanced_plan_still_sums_to_the_income(message):
+    salary = 20000
+    targets = allocator.parse_command(message, PLAN)
+    result = allocator.solve_command(message, PLAN, salary)
+
+    new_plan = result["new_plan"]
+    assert sum(new_plan.values()) == pytest.approx(salary)
+    assert {n: new_plan[n] for n in targets} == targets
+    # Fixed bills keep their amounts
+    assert new_plan["Rent"] == PLAN["Rent"]
+    assert all(amount >= 0 for amount in new_plan.values())
+
+
+def test_solve_command_returns_none_when_nothing_can_absorb_the_change():
+    plan = {"Rent": 9000, "Food": 1000}
+    assert allocator.solve_command("set food to 500", plan, 20000) is None
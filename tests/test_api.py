@@ -0,0 +1,191 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+import models
+
+ROWS = 45
+BASE_TIME = datetime(2026, 3, 1, 9, 0)
+
+
+def stamp(i):
+    """Groups of three rows share a timestamp; every 7th row has none, like
+    rows written before the column had a default."""
+    if i % 7 == 3:
+        return None
+    return BASE_TIME + timedelta(minutes=i // 3)
+
+
+@pytest.fixture
+def history(user):
+    """ROWS rows behind each /api list for `user`. Returns
+    {url: (model, sort column or None)}."""
+    uid = user["id"]
+    models.add_loan(uid, "Car", 12000, "2026-01-15", "2027-01-15", 1000, "")
+    models.add_savings(uid, "Emergency fund", 50000)
+    models.add_category(uid, "Food", 5000)
+    (loan,) = models.get_loans(uid)
+    (goal,) = models.get_savings(uid)
+    (category,) = models.get_categories(uid)
+
+    def insert(sort_col, scope, make_row):
+        model = sort_col.class_
+        db.session.execute(db.insert(model), [make_row(i) for i in range(ROWS)])
+        # The column default fills in the None stamps, so clear them after
+        db.session.execute(
+            db.update(model)
+            .where(scope, sort_col > BASE_TIME + timedelta(days=1))
+            .values({sort_col: None})
+        )
+
+    insert(
+        models.Transaction.created_at,
+        models.Transaction.user_id == uid,
+        lambda i: {
+            "user_id": uid,
+            "description": f"Txn {i}",
+            "amount": 100 + i,
+            "type": "expense",
+            "created_at": stamp(i),
+        },
+    )
+    insert(
+        models.BudgetTransaction.created_at,
+        models.BudgetTransaction.user_id == uid,
+        lambda i: {
+            "user_id": uid,
+            "category_id": category["id"],
+            "description": f"Spend {i}",
+            "amount": 10 + i,
+            "expense_type": "daily",
+            "created_at": stamp(i),
+        },
+    )
+    insert(
+        models.LoanPayment.created_at,
+        models.LoanPayment.loan_id == loan["id"],
+        lambda i: {
+            "loan_id": loan["id"],
+            "user_id": uid,
+            "amount": 100,
+            "created_at": stamp(i),
+        },
+    )
+    insert(
+        models.SavingsTransaction.timestamp,
+        models.SavingsTransaction.savings_id == goal["id"],
+        lambda i: {
+            "savings_id": goal["id"],
+            "type": "deposit",
+            "amount": 50,
+            "timestamp": stamp(i),
+        },
+    )
+    db.session.commit()
+    return {
+        "/api/transactions": (models.Transaction, None),
+        "/api/budget-transactions": (
+            models.BudgetTransaction,
+            models.BudgetTransaction.created_at,
+        ),
+        f"/api/loans/{loan['id']}/payments": (
+            models.LoanPayment,
+            models.LoanPayment.created_at,
+        ),
+        f"/api/savings/{goal['id']}/transactions": (
+            models.SavingsTransaction,
+            models.SavingsTransaction.timestamp,
+        ),
+    }
+
+
+def expected_ids(model, sort_col, user_id):
+    """Every id the list should return, newest first with NULLs last."""
+    if model is models.SavingsTransaction:
+        query = model.query.join(models.Savings).filter(
+            models.Savings.user_id == user_id
+        )
+    else:
+        query = model.query.filter_by(user_id=user_id)
+    rows = query.all()
+    if sort_col is None:
+        return sorted((r.id for r in rows), reverse=True)
+    key = sort_col.key
+    rows.sort(
+        key=lambda r: (getattr(r, key) is not None, getattr(r, key) or BASE_TIME, r.id),
+        reverse=True,
+    )
+    return [r.id for r in rows]
+
+
+def traverse(client, url, limit):
+    ids, cursor = [], None
+    while True:
+        query = {"limit": limit}
+        if cursor:
+            query["cursor"] = cursor
+        response = client.get(url, query_string=query)
+        assert response.status_code == 200
+        page = response.get_json()
+        assert len(page["items"]) <= limit
+        ids += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize("limit", [1, 7, 20, 100])
+def test_traversal_returns_every_row_once_in_order(user, client, history, limit):
+    for url, (model, sort_col) in history.items():
+        ids = traverse(client, url, limit)
+        assert len(ids) == len(set(ids)), url
+        assert ids == expected_ids(model, sort_col, user["id"]), url
+
+
+def test_limit_is_capped_at_100(user, client):
+    db.session.execute(
+        db.insert(models.Transaction),
+        [
+            {"user_id": user["id"], "description": "x", "amount": 1, "type": "income"}
+            for _ in range(120)
+        ],
+    )
+    db.session.commit()
+
+    page = client.get("/api/transactions?limit=1000").get_json()
+    assert len(page["items"]) == 100
+    assert page["next_cursor"] is not None
+    assert len(client.get("/api/transactions?limit=0").get_json()["items"]) == 1
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "cursor=not-a-cursor",
+        "cursor=aGVsbG8=",  # base64, but not of a JSON [sort value, id] pair
+        "limit=ten",
+    ],
+)
+def test_bad_cursor_or_limit_is_a_400(client, history, query):
+    for url in history:
+        response = client.get(f"{url}?{query}")
+        assert response.status_code == 400, url
+        assert response.get_json() == {"error": "Invalid cursor or limit"}
+
+
+def test_other_users_loan_and_savings_are_not_found(app, history):
+    models.create_user("intruder", "intruder@example.com", "password")
+    intruder = models.get_user_by_username("intruder")
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = intruder["id"]
+        sess["username"] = intruder["username"]
+
+    for url in history:
+        response = client.get(url)
+        if url.startswith(("/api/loans/", "/api/savings/")):
+            assert response.status_code == 404, url
+        else:
+            # The user-scoped lists just come back empty for someone else
+            assert response.get_json()["items"] == [], url
@@ -0,0 +1,166 @@
+import csv
+import io
+import json
+import uuid
+import zipfile
+
+import pytest
+
+from app import db
+import exporter
+import models
+
+# Rows fill_every_dataset() writes per dataset
+EXPECTED_ROWS = {
+    "transactions": 2,
+    "loans": 1,
+    "loan_payments": 2,
+    "savings": 1,
+    "savings_transactions": 2,
+    "budget_categories": 1,
+    "budget_transactions": 2,
+    "smart_budgets": 1,
+    "smart_budget_items": 2,
+}
+
+
+def fill_every_dataset(user_id, tag):
+    """A couple of rows in every export dataset, each naming `tag`."""
+    models.add_transaction(user_id, f"{tag} salary", 30000, "income")
+    models.add_transaction(user_id, f'{tag}, "rent"', 9000, "expense")
+    models.add_loan(user_id, f"{tag} car", 12000, "2026-01-15", "2027-01-15", 1000, "")
+    (loan,) = models.get_loans(user_id)
+    models.add_loan_payment(loan["id"], user_id, 1000, "2026-02-15")
+    models.add_loan_payment(loan["id"], user_id, 1000, "2026-03-15")
+    models.add_savings(user_id, f"{tag} fund", 50000)
+    (goal,) = models.get_savings(user_id)
+    models.deposit_savings(goal["id"], 4000, f"{tag} deposit")
+    models.withdraw_savings(goal["id"], 1500)
+    models.add_category(user_id, f"{tag} food", 5000)
+    (category,) = models.get_categories(user_id)
+    models.add_budget_transaction(user_id, category["id"], f"{tag} lunch", 250)
+    models.add_budget_transaction(user_id, category["id"], f"{tag}\nnotes", 400)
+    budget = models.create_salary_budget(user_id, 30000, "monthly", f"{tag} plan")
+    models.add_salary_item(budget.id, f"{tag} rent", 9000, 8500, False)
+    models.add_salary_item(budget.id, f"{tag} food", None, 5000, True)
+
+
+@pytest.fixture
+def exports(user, client, monkeypatch):
+    """`user` and a neighbour both fill every dataset; returns the
+    neighbour's tag, which must never show up in `user`'s exports."""
+    # Flush after every row so the tests cross chunk boundaries
+    monkeypatch.setattr(exporter, "EXPORT_FLUSH_EVERY", 1)
+    neighbour = f"neighbour-{uuid.uuid4().hex[:8]}"
+    models.create_user(neighbour, f"{neighbour}@example.com", "password")
+    fill_every_dataset(models.get_user_by_username(neighbour)["id"], neighbour)
+    fill_every_dataset(user["id"], "mine")
+    return neighbour
+
+
+def read_csv(text):
+    header, *rows = list(csv.reader(io.StringIO(text)))
+    return header, [dict(zip(header, row)) for row in rows]
+
+
+def columns(user_id, dataset):
+    return list(exporter.dataset_queries(user_id)[dataset].selected_columns.keys())
+
+
+@pytest.mark.parametrize("dataset", exporter.DATASETS)
+def test_csv_has_a_header_and_the_users_rows(user, client, exports, dataset):
+    response = client.get(f"/export/{dataset}.csv")
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    assert f"limoney-{dataset}.csv" in response.headers["Content-Disposition"]
+
+    header, rows = read_csv(response.get_data(as_text=True))
+    assert header == columns(user["id"], dataset)
+    assert "id" in header
+    assert len(rows) == EXPECTED_ROWS[dataset]
+    assert exports not in response.get_data(as_text=True)
+
+
+def test_csv_values_round_trip(client, exports):
+    _, rows = read_csv(client.get("/export/transactions.csv").get_data(as_text=True))
+    assert [(r["description"], float(r["amount"]), r["type"]) for r in rows] == [
+        ("mine salary", 30000.0, "income"),
+        ('mine, "rent"', 9000.0, "expense"),
+    ]
+
+    _, rows = read_csv(
+        client.get("/export/budget_transactions.csv").get_data(as_text=True)
+    )
+    # Newlines survive quoting, and None is written as an empty cell
+    assert [(r["description"], r["savings_id"]) for r in rows] == [
+        ("mine lunch", ""),
+        ("mine\nnotes", ""),
+    ]
+
+
+def test_csv_ids_are_the_users_own_rows(user, client, exports):
+    _, rows = read_csv(client.get("/export/transactions.csv").get_data(as_text=True))
+    own = db.session.scalars(
+        db.select(models.Transaction.id).filter_by(user_id=user["id"])
+    )
+    assert [int(r["id"]) for r in rows] == sorted(own)
+
+
+def test_all_ndjson_tags_every_line_with_its_dataset(user, client, exports):
+    response = client.get("/export/all.ndjson")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+
+    lines = response.get_data(as_text=True).splitlines()
+    records = [json.loads(line) for line in lines]
+    counts = {}
+    for record in records:
+        dataset = record.pop("dataset")
+        assert list(record) == columns(user["id"], dataset)
+        counts[dataset] = counts.get(dataset, 0) + 1
+    assert counts == EXPECTED_ROWS
+    assert exports not in response.get_data(as_text=True)
+
+
+def test_single_dataset_ndjson(client, exports):
+    lines = client.get("/export/loans.ndjson").get_data(as_text=True).splitlines()
+    (loan,) = [json.loads(line) for line in lines]
+    assert loan["dataset"] == "loans"
+    assert loan["loan_name"] == "mine car"
+    # Dates come out as ISO strings
+    assert loan["start_date"].startswith("2026-01-15")
+
+
+def test_bundle_zip_holds_one_csv_per_dataset(user, client, exports):
+    response = client.get("/export/bundle.zip")
+    assert response.status_code == 200
+    assert response.mimetype == "application/zip"
+
+    with zipfile.ZipFile(io.BytesIO(response.get_data())) as bundle:
+        assert bundle.testzip() is None
+        names = sorted(f"{dataset}.csv" for dataset in exporter.DATASETS)
+        assert sorted(bundle.namelist()) == names
+        for dataset in exporter.DATASETS:
+            text = bundle.read(f"{dataset}.csv").decode("utf-8")
+            header, rows = read_csv(text)
+            assert header == columns(user["id"], dataset)
+            assert len(rows) == EXPECTED_ROWS[dataset], dataset
+            assert exports not in text, dataset
+
+
+def test_an_empty_account_exports_headers_only(user, client):
+    header, rows = read_csv(client.get("/export/loans.csv").get_data(as_text=True))
+    assert header == columns(user["id"], "loans")
+    assert rows == []
+    assert client.get("/export/all.ndjson").get_data() == b""
+
+
+@pytest.mark.parametrize(
+    "url", ["/export/users.csv", "/export/all.csv", "/export/loans.xlsx"]
+)
+def test_unknown_dataset_or_format_is_a_404(client, url):
+    assert client.get(url).status_code == 404
+
+
+def test_export_needs_a_login(app):
+    assert app.test_client().get("/export/transactions.csv").status_code == 302
@@ -0,0 +1,189 @@
+import io
+from datetime import datetime
+
+import pytest
+
+from app import db
+import importer
+import models
+import view_cache
+
+BANK_CSV = """\
+Posting Date,Payee,Amount,Category
+2026-03-02,Salary,"30,000.00",
+03/05/2026,Jollibee,(250.50),Groceries
+2026/03/05,Jollibee,₱-250.50,
+05-Mar-2026 10:15,Zero row,0,
+"""
+
+SPLIT_CSV = """\
+Date,Description,Money Out,Money In
+2026-03-02,Salary,,15000
+2026-03-03,Rent,9000,
+2026-03-04,Refund,(100),
+"""
+
+OFX = """\
+OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20260305120000.000[+8:PHT]
+<TRNAMT>-1200.00
+<NAME>Meralco
+</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20260301<TRNAMT>30000<MEMO>Payroll</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+def rows(text, fmt="csv"):
+    return list(importer.iter_rows(io.StringIO(text), fmt))
+
+
+def import_text(user_id, text, fmt="csv", target="transactions"):
+    return importer.import_statement(user_id, io.StringIO(text), fmt, target)
+
+
+def test_csv_rows_are_normalized():
+    assert rows(BANK_CSV) == [
+        {
+            "date": datetime(2026, 3, 2),
+            "description": "Salary",
+            "amount": 30000.0,
+            "category": "",
+        },
+        {
+            "date": datetime(2026, 3, 5),
+            "description": "Jollibee",
+            "amount": -250.5,
+            "category": "Groceries",
+        },
+        {
+            "date": datetime(2026, 3, 5),
+            "description": "Jollibee",
+            "amount": -250.5,
+            "category": "",
+        },
+        {
+            "date": datetime(2026, 3, 5),
+            "description": "Zero row",
+            "amount": 0.0,
+            "category": "",
+        },
+    ]
+
+
+def test_split_debit_and_credit_columns():
+    # Debits count as money out whichever way the bank signs them
+    assert [(r["description"], r["amount"]) for r in rows(SPLIT_CSV)] == [
+        ("Salary", 15000.0),
+        ("Rent", -9000.0),
+        ("Refund", -100.0),
+    ]
+
+
+def test_ofx_rows_in_sgml_and_single_line_blocks():
+    assert rows(OFX, "ofx") == [
+        {
+            "date": datetime(2026, 3, 5),
+            "description": "Meralco",
+            "amount": -1200.0,
+            "category": "",
+        },
+        {
+            "date": datetime(2026, 3, 1),
+            "description": "Payroll",
+            "amount": 30000.0,
+            "category": "",
+        },
+    ]
+
+
+@pytest.mark.parametrize(
+    "text, message",
+    [
+        ("Payee,Amount\nRent,100\n", "needs a date column"),
+        ("Date,Payee\n2026-03-01,Rent\n", "needs a date column"),
+        ("Date,Amount\n2026-03-01,100\nyesterday,5\n", "Line 3"),
+        ("Date,Amount\n2026-03-01,lots\n", "Line 2"),
+    ],
+)
+def test_bad_csv_is_a_statement_error(text, message):
+    with pytest.raises(importer.StatementError, match=message):
+        rows(text)
+
+
+def test_same_day_duplicates_in_one_file_all_survive(user):
+    result = import_text(user["id"], BANK_CSV)
+    # The two Jollibee rows are separate purchases; the zero row is dropped
+    assert (result["read"], result["inserted"], result["skipped"]) == (4, 3, 1)
+    stored = models.Transaction.query.filter_by(user_id=user["id"]).all()
+    assert sorted((t.description, t.amount, t.type) for t in stored) == [
+        ("Jollibee", 250.5, "daily"),
+        ("Jollibee", 250.5, "daily"),
+        ("Salary", 30000.0, "income"),
+    ]
+
+
+def test_reimport_skips_only_rows_already_stored(user):
+    import_text(user["id"], BANK_CSV)
+    again = import_text(user["id"], BANK_CSV)
+    assert (again["inserted"], again["skipped"]) == (0, 4)
+
+    # A third identical purchase that day is new; the first two are not
+    extra = "Date,Payee,Amount\n" + "2026-03-05,Jollibee,-250.50\n" * 3
+    result = import_text(user["id"], extra)
+    assert (result["inserted"], result["skipped"]) == (1, 2)
+    stored = models.Transaction.query.filter_by(user_id=user["id"])
+    assert stored.filter_by(description="Jollibee").count() == 3
+
+
+def test_a_bad_row_rolls_back_the_whole_file(user):
+    text = "Date,Amount\n2026-03-01,100\n2026-03-02,oops\n"
+    with pytest.raises(importer.StatementError):
+        import_text(user["id"], text)
+    assert models.Transaction.query.filter_by(user_id=user["id"]).count() == 0
+    assert db.session.get(models.UserLedger, user["id"]) is None
+
+
+def test_budget_import_falls_back_to_miscellaneous(user):
+    result = import_text(user["id"], BANK_CSV, target="budget")
+    # Only the two debits are spending; salary and the zero row are skipped
+    assert (result["inserted"], result["skipped"]) == (2, 2)
+
+    names = {c["id"]: c["name"] for c in models.get_categories(user["id"])}
+    stored = models.BudgetTransaction.query.filter_by(user_id=user["id"]).all()
+    assert sorted(names[t.category_id] for t in stored) == [
+        "Groceries",
+        "Miscellaneous",
+    ]
+
+
+def test_import_updates_ledger_rollups_and_cache(user):
+    uid = user["id"]
+    loads = []
+
+    def load():
+        loads.append(1)
+        return len(loads)
+
+    for view in models.TRANSACTION_VIEWS + models.BUDGET_VIEWS:
+        view_cache.cached_view(uid, view, load)
+    assert len(loads) == 2
+
+    import_text(uid, SPLIT_CSV)
+    import_text(uid, OFX, "ofx", target="budget")
+    # Both imports dropped the cached copies they affect
+    for view in models.TRANSACTION_VIEWS + models.BUDGET_VIEWS:
+        view_cache.cached_view(uid, view, load)
+    assert len(loads) == 4
+
+    ledger = models.get_ledger(uid)
+    assert ledger["cash_balance"] == pytest.approx(15000 - 9000 - 100)
+    assert ledger["budget_spent"] == pytest.approx(1200)
+    rebuilt = models.rebuild_ledger(uid)
+    assert {f: ledger[f] for f in models.LEDGER_FIELDS} == pytest.approx(
+        {f: rebuilt[f] for f in models.LEDGER_FIELDS}
+    )
+    assert models.verify_rollups(uid) == []
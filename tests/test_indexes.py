@@ -0,0 +1,126 @@
+import random
+from datetime import date, datetime, timedelta
+
+from app import db
+import migrations
+import models
+
+OTHER_USERS = 50
+ROWS_PER_USER = 40
+
+
+def seed_other_users():
+    """Real users with plenty of rows each, so a full scan would have to
+    read far more than the indexed range of the user under test."""
+    rng = random.Random(6)
+    first = db.session.execute(db.select(db.func.max(models.User.id))).scalar() + 1
+    user_ids = range(first, first + OTHER_USERS)
+    day = datetime(2026, 1, 1)
+
+    def insert(model, rows):
+        db.session.execute(db.insert(model), list(rows))
+
+    insert(
+        models.User,
+        (
+            {
+                "id": uid,
+                "username": f"other{uid}",
+                "email": f"other{uid}@example.com",
+                "password": "x",
+            }
+            for uid in user_ids
+        ),
+    )
+    insert(
+        models.Transaction,
+        (
+            {
+                "user_id": uid,
+                "description": "x",
+                "amount": rng.random() * 100,
+                "type": "expense",
+                "created_at": day,
+            }
+            for uid in user_ids
+            for _ in range(ROWS_PER_USER)
+        ),
+    )
+    insert(
+        models.BudgetTransaction,
+        (
+            {
+                "user_id": uid,
+                "category_id": rng.randint(1, 10),
+                "description": "x",
+                "amount": rng.random() * 100,
+                "expense_type": "daily",
+                "created_at": day + timedelta(days=rng.randint(0, 90)),
+            }
+            for uid in user_ids
+            for _ in range(ROWS_PER_USER)
+        ),
+    )
+    insert(
+        models.BudgetRollup,
+        (
+            {
+                "user_id": uid,
+                "category_id": category_id,
+                "expense_type": "daily",
+                "month": date(2026, month, 1),
+                "total": 100,
+                "txn_count": 1,
+            }
+            for uid in user_ids
+            for category_id in range(1, 6)
+            for month in range(1, 4)
+        ),
+    )
+    insert(
+        models.Savings,
+        (
+            {"user_id": uid, "savings_name": f"Goal {i}", "current_balance": 100}
+            for uid in user_ids
+            for i in range(5)
+        ),
+    )
+    insert(
+        models.Loan,
+        (
+            {"user_id": uid, "loan_name": f"Loan {i}", "amount": 10000}
+            for uid in user_ids
+            for i in range(5)
+        ),
+    )
+    loans = db.session.execute(
+        db.select(models.Loan.id, models.Loan.user_id).where(
+            models.Loan.user_id.in_(user_ids)
+        )
+    ).all()
+    insert(
+        models.LoanPayment,
+        (
+            {
+                "loan_id": loan_id,
+                "user_id": uid,
+                "amount": 100,
+                "pay_date": date(2026, 1, 15),
+                "created_at": day,
+            }
+            for loan_id, uid in loans
+            for _ in range(ROWS_PER_USER // 5)
+        ),
+    )
+    db.session.commit()
+
+
+def test_hot_queries_use_indexes(user, seed):
+    seed()
+    seed_other_users()
+    # Give SQLite's planner real statistics, as a long-lived database has
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+    scans = migrations.find_full_scans(user["id"])
+    assert scans == [], "\n".join(f"{line}\n  {sql}" for sql, line in scans)
@@ -0,0 +1,105 @@
+import pytest
+
+from app import db
+import models
+
+
+@pytest.fixture
+def checkpoint_every(monkeypatch):
+    monkeypatch.setattr(models, "LEDGER_CHECKPOINT_EVERY", 5)
+    return 5
+
+
+def write_a_bit_of_everything(user_id):
+    """Every kind of ledger entry: 12 in all."""
+    models.add_transaction(user_id, "Salary", 30000, "income")
+    models.add_transaction(user_id, "Rent", 9000, "expense")
+    models.add_transaction(user_id, "Groceries", 2500.5, "expense")
+
+    models.add_category(user_id, "Food", 5000)
+    (category,) = models.get_categories(user_id)
+    for amount in (250, 1750, 400):
+        models.add_budget_transaction(user_id, category["id"], "Spend", amount)
+    first = models.BudgetTransaction.query.filter_by(user_id=user_id).first()
+    models.delete_budget_transaction(first.id, user_id)
+
+    models.add_savings(user_id, "Emergency fund", 50000)
+    (goal,) = models.get_savings(user_id)
+    models.deposit_savings(goal["id"], 4000)
+    models.deposit_savings(goal["id"], 1000)
+    models.withdraw_savings(goal["id"], 1500)
+
+    models.add_loan(user_id, "Car", 12000, "2026-01-15", "2027-01-15", 1000, "")
+    (loan,) = models.get_loans(user_id)
+    models.add_loan_payment(loan["id"], user_id, 1000, "2026-02-15")
+    models.add_loan_payment(loan["id"], user_id, 1000, "2026-03-15")
+
+
+def ledger_fields(ledger):
+    return {f: ledger[f] for f in models.LEDGER_FIELDS}
+
+
+def test_ledger_matches_a_rebuild_from_raw_rows(user):
+    write_a_bit_of_everything(user["id"])
+    ledger = models.get_ledger(user["id"])
+
+    rebuilt = models.rebuild_ledger(user["id"])
+    assert ledger_fields(ledger) == pytest.approx(ledger_fields(rebuilt))
+    assert ledger["cash_balance"] == pytest.approx(30000 - 9000 - 2500.5)
+    assert ledger["budget_spent"] == pytest.approx(1750 + 400)
+    assert ledger["savings_net"] == pytest.approx(4000 + 1000 - 1500)
+    assert ledger["loan_paid"] == pytest.approx(2000)
+    assert ledger["entry_count"] == 12
+
+
+def test_checkpoint_every_n_entries(user, checkpoint_every):
+    write_a_bit_of_everything(user["id"])
+
+    checkpoints = (
+        models.LedgerCheckpoint.query.filter_by(user_id=user["id"])
+        .order_by(models.LedgerCheckpoint.id)
+        .all()
+    )
+    # The first entry builds the row (and checkpoints it), then every 5th
+    assert [c.entry_count for c in checkpoints] == [1, 5, 10]
+    ledger = models.get_ledger(user["id"])
+    last = checkpoints[-1]
+    assert last.entry_count <= ledger["entry_count"] < last.entry_count + 5
+
+
+def test_first_entry_when_another_writer_created_the_row(user, monkeypatch):
+    uid = user["id"]
+    real_totals = models.ledger_totals
+
+    def row_appears_meanwhile(user_id):
+        # A concurrent first write commits its ledger row between this
+        # writer's UPDATE (no row yet) and its INSERT
+        totals = real_totals(user_id)
+        db.session.execute(
+            db.insert(models.UserLedger).values(
+                user_id=user_id,
+                cash_balance=1000,
+                budget_spent=0,
+                savings_net=0,
+                loan_paid=0,
+                entry_count=1,
+            )
+        )
+        return totals
+
+    monkeypatch.setattr(models, "ledger_totals", row_appears_meanwhile)
+    models.add_transaction(uid, "Salary", 500, "income")
+
+    ledger = models.get_ledger(uid)
+    assert ledger["cash_balance"] == pytest.approx(1500)
+    assert ledger["entry_count"] == 2
+
+
+def test_dashboard_builds_a_missing_ledger(user, client):
+    uid = user["id"]
+    models.add_transaction(uid, "Salary", 700, "income")
+    models.UserLedger.query.filter_by(user_id=uid).delete()
+    db.session.commit()
+
+    assert client.get("/").status_code == 200
+    assert models.get_ledger(uid)["cash_balance"] == pytest.approx(700)
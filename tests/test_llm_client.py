@@ -0,0 +1,168 @@
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import llm_client
+import llm_stub
+
+MESSAGES = [{"role": "user", "content": "Hello"}]
+COOLDOWN = 0.2
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """llm_stub's server on a free port with GROQ_API_URL pointed at it, and
+    a fresh breaker. Returns the handler class: set delay, fail_rate, etc.
+    on it; `calls` counts the requests that reached the server."""
+
+    class Handler(llm_stub.StubHandler):
+        calls = 0
+
+        def do_POST(self):
+            type(self).calls += 1
+            super().do_POST()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/v1/chat/completions"
+    monkeypatch.setenv("GROQ_API_URL", url)
+    monkeypatch.setattr(llm_client, "API_URL", url)
+    monkeypatch.setattr(
+        llm_client,
+        "breaker",
+        llm_client.CircuitBreaker(llm_client.BREAKER_THRESHOLD, COOLDOWN),
+    )
+    monkeypatch.setattr(llm_client, "backoff_delay", lambda attempt: 0)
+    yield Handler
+    server.shutdown()
+    server.server_close()
+
+
+def open_breaker(stub):
+    stub.fail_rate = 1.0
+    for _ in range(llm_client.BREAKER_THRESHOLD):
+        with pytest.raises(llm_client.LLMError):
+            llm_client.post_chat({"messages": MESSAGES})
+    assert llm_client.breaker.state == "open"
+
+
+def test_completion_through_the_stub(stub):
+    reply = llm_client.chat_completion(MESSAGES)
+    assert "Stub server" in reply
+    assert stub.calls == 1
+
+
+def test_503_is_retried(stub):
+    stub.fail_rate = 1.0
+    with pytest.raises(llm_client.LLMError, match="HTTP 503"):
+        llm_client.post_chat({"messages": MESSAGES})
+    assert stub.calls == llm_client.MAX_RETRIES + 1
+
+
+def test_400_is_not_retried(stub):
+    stub.fail_rate = 1.0
+    stub.fail_status = 400
+    with pytest.raises(llm_client.LLMError, match="HTTP 400"):
+        llm_client.post_chat({"messages": MESSAGES})
+    assert stub.calls == 1
+
+
+def test_open_breaker_rejects_without_a_request(stub, monkeypatch):
+    monkeypatch.setattr(llm_client, "MAX_RETRIES", 0)
+    open_breaker(stub)
+    calls = stub.calls
+
+    with pytest.raises(llm_client.LLMUnavailable):
+        llm_client.post_chat({"messages": MESSAGES})
+    assert stub.calls == calls
+
+
+def test_half_open_lets_one_trial_through_and_success_closes(stub, monkeypatch):
+    monkeypatch.setattr(llm_client, "MAX_RETRIES", 0)
+    open_breaker(stub)
+    stub.fail_rate = 0.0
+    stub.delay = 0.3
+    time.sleep(COOLDOWN + 0.05)
+    calls = stub.calls
+
+    trial = {}
+    thread = threading.Thread(
+        target=lambda: trial.update(reply=llm_client.chat_completion(MESSAGES))
+    )
+    thread.start()
+    while stub.calls == calls:
+        time.sleep(0.01)
+    # The trial is in flight, so everyone else is still turned away
+    with pytest.raises(llm_client.LLMUnavailable):
+        llm_client.chat_completion(MESSAGES)
+    thread.join()
+
+    assert "Stub server" in trial["reply"]
+    assert stub.calls == calls + 1
+    assert llm_client.breaker.state == "closed"
+    stub.delay = 0.0
+    assert llm_client.chat_completion(MESSAGES)
+
+
+def test_stalled_upstream_hits_the_read_timeout(stub, monkeypatch):
+    monkeypatch.setattr(llm_client, "TIMEOUT", (1, 0.2))
+    monkeypatch.setattr(llm_client, "MAX_RETRIES", 0)
+    stub.delay = 1.0
+
+    started = time.perf_counter()
+    with pytest.raises(llm_client.LLMError, match="Read timed out"):
+        llm_client.chat_completion(MESSAGES)
+    assert time.perf_counter() - started < 0.9
+
+
+def send_garbage(handler, content):
+    handler.send_response(200)
+    handler.send_header("Content-Type", "text/event-stream")
+    handler.send_header("Transfer-Encoding", "chunked")
+    handler.end_headers()
+    handler.write_chunk(b"data: {not json\n\n")
+    handler.write_chunk(b"")
+
+
+def test_malformed_stream_chunks_open_the_breaker(stub):
+    stub.stream = send_garbage
+    for _ in range(llm_client.BREAKER_THRESHOLD):
+        with pytest.raises(llm_client.LLMError, match="Malformed stream chunk"):
+            list(llm_client.stream_chat_completion(MESSAGES))
+    assert llm_client.breaker.state == "open"
+
+    calls = stub.calls
+    with pytest.raises(llm_client.LLMUnavailable):
+        list(llm_client.stream_chat_completion(MESSAGES))
+    assert stub.calls == calls
+
+
+def test_stream_through_the_stub_keeps_the_breaker_closed(stub):
+    reply = "".join(llm_client.stream_chat_completion(MESSAGES))
+    assert "Stub server" in reply
+    assert llm_client.breaker.failures == 0
+    assert llm_client.breaker.state == "closed"
+
+
+def test_trial_that_raises_unexpectedly_releases_the_breaker(stub, monkeypatch):
+    monkeypatch.setattr(llm_client, "MAX_RETRIES", 0)
+    open_breaker(stub)
+    stub.fail_rate = 0.0
+    time.sleep(COOLDOWN + 0.05)
+
+    def broken_session():
+        raise RuntimeError("bug in the request setup")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(llm_client, "get_session", broken_session)
+        with pytest.raises(RuntimeError):
+            llm_client.chat_completion(MESSAGES)
+    assert not llm_client.breaker.trial_running
+    assert llm_client.breaker.state == "open"
+
+    # The next cooldown lets a new trial through instead of locking up
+    time.sleep(COOLDOWN + 0.05)
+    assert "Stub server" in llm_client.chat_completion(MESSAGES)
+    assert llm_client.breaker.state == "closed"
@@ -0,0 +1,107 @@
+from datetime import date, datetime
+
+import pytest
+
+from app import db
+import loan_schedule
+import models
+
+
+def test_parse_date():
+    assert loan_schedule.parse_date("2026-01-31") == date(2026, 1, 31)
+    assert loan_schedule.parse_date("2026-01-31 08:00:00") == date(2026, 1, 31)
+    assert loan_schedule.parse_date(datetime(2026, 1, 31, 8)) == date(2026, 1, 31)
+    assert loan_schedule.parse_date(date(2026, 1, 31)) == date(2026, 1, 31)
+    assert loan_schedule.parse_date("") is None
+    assert loan_schedule.due_day(None) == 1
+
+
+def test_due_dates_clamp_to_short_months():
+    dates = loan_schedule.due_dates(date(2026, 1, 31), date(2026, 7, 31))
+    assert dates == [
+        date(2026, 2, 28),
+        date(2026, 3, 31),
+        date(2026, 4, 30),
+        date(2026, 5, 31),
+        date(2026, 6, 30),
+        date(2026, 7, 31),
+    ]
+    # A leap year gets the 29th
+    assert loan_schedule.due_dates(date(2028, 1, 31), date(2028, 3, 1)) == [
+        date(2028, 2, 29)
+    ]
+
+
+def test_loan_shorter_than_a_month_is_due_on_its_end_date():
+    assert loan_schedule.due_dates(date(2026, 1, 10), date(2026, 1, 25)) == [
+        date(2026, 1, 25)
+    ]
+
+
+def test_last_installment_takes_the_rest_of_the_balance():
+    schedule = loan_schedule.build_schedule(10000, 3000, "2026-01-31", "2026-04-30")
+    assert [(r["due_date"], r["amount_due"]) for r in schedule] == [
+        (date(2026, 2, 28), 3000),
+        (date(2026, 3, 31), 3000),
+        (date(2026, 4, 30), 4000),
+    ]
+    assert [r["cumulative_due"] for r in schedule] == [3000, 6000, 10000]
+    assert schedule[-1]["balance_after"] == 0
+
+
+def test_schedule_stops_once_the_principal_is_covered():
+    schedule = loan_schedule.build_schedule(1000.5, 400, "2026-01-15", "2027-01-15")
+    assert [r["amount_due"] for r in schedule] == [400, 400, 200.5]
+    assert [r["seq"] for r in schedule] == [1, 2, 3]
+
+
+@pytest.mark.parametrize(
+    "args",
+    [(0, 100, "2026-01-01", "2026-12-01"), (1000, 100, None, "2026-12-01")],
+)
+def test_no_schedule_without_an_amount_or_dates(args):
+    assert loan_schedule.build_schedule(*args) == []
+
+
+def test_next_due_moves_forward_as_payments_cover_installments():
+    schedule = loan_schedule.build_schedule(3000, 1000, "2026-01-31", "2026-04-30")
+    assert loan_schedule.next_due(schedule, 0) == date(2026, 2, 28)
+    # A partial payment leaves the same installment due
+    assert loan_schedule.next_due(schedule, 999) == date(2026, 2, 28)
+    assert loan_schedule.next_due(schedule, 1000) == date(2026, 3, 31)
+    assert loan_schedule.next_due(schedule, 2999.999) is None
+    assert loan_schedule.next_due(schedule, 3500) is None
+
+
+def test_next_due_date_moves_after_a_payment(user):
+    uid = user["id"]
+    models.add_loan(uid, "Car", 3000, "2026-01-31", "2026-04-30", 1000, "")
+    (loan,) = models.get_loans(uid)
+    assert loan["next_due_date"] == date(2026, 2, 28)
+
+    models.add_loan_payment(loan["id"], uid, 1500, "2026-02-27")
+    assert db.session.get(models.Loan, loan["id"]).next_due_date == date(2026, 3, 31)
+
+    models.add_loan_payment(loan["id"], uid, 1500, "2026-03-30")
+    assert db.session.get(models.Loan, loan["id"]).next_due_date is None
+
+
+def test_project_payoffs():
+    payoffs, left = loan_schedule.project_payoffs(
+        [date(2026, 2, 28), date(2026, 3, 15), None, date(2026, 2, 28)],
+        [3000, 2500, 1000, 500],
+        [1000, 1000, 1000, 0],
+        [31, 15, 1, 28],
+    )
+    # A loan due on the 31st is due Feb 28, then Mar 31, then Apr 30
+    assert payoffs == [date(2026, 4, 30), date(2026, 5, 15), None, None]
+    assert left == [3, 3, 0, 0]
+
+
+def test_project_payoffs_of_a_paid_loan():
+    payoffs, left = loan_schedule.project_payoffs(
+        [date(2026, 2, 28), date(2026, 2, 28)], [0, 0.004], [1000, 1000], [31, 31]
+    )
+    assert payoffs == [None, None]
+    assert left == [0, 0]
+    assert loan_schedule.project_payoffs([], [], [], []) == ([], [])
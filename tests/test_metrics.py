@@ -0,0 +1,38 @@
+import pytest
+
+
+@pytest.fixture
+def scrape(app, monkeypatch):
+    def scrape(token=None, public=False, headers=None):
+        monkeypatch.setitem(app.config, "METRICS_TOKEN", token)
+        monkeypatch.setitem(app.config, "METRICS_PUBLIC", public)
+        return app.test_client().get("/metrics", headers=headers or {})
+
+    return scrape
+
+
+def test_metrics_hidden_without_token(scrape):
+    assert scrape().status_code == 404
+
+
+def test_metrics_public_when_opted_in(scrape):
+    response = scrape(public=True)
+    assert response.status_code == 200
+    assert "limoney_requests_total" in response.text
+
+
+def test_metrics_token_required_when_set(scrape):
+    assert scrape(token="s3cret").status_code == 401
+    wrong = {"Authorization": "Bearer nope"}
+    assert scrape(token="s3cret", headers=wrong).status_code == 401
+    response = scrape(token="s3cret", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
+
+
+def test_metrics_token_rejects_near_misses(scrape):
+    for header in ["s3cret", "Bearer s3cre", "Bearer s3cret ", "bearer s3cret"]:
+        response = scrape(token="s3cret", headers={"Authorization": header})
+        assert response.status_code == 401, header
+    # Non-ASCII input is a plain mismatch, not a server error
+    response = scrape(token="s3cret", headers={"Authorization": "Bearer sécret"})
+    assert response.status_code == 401
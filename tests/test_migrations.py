@@ -0,0 +1,117 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE_SCHEMA = Path(__file__).with_name("baseline_schema.sql")
+
+SEED = """
+INSERT INTO users VALUES (1, 'juan', 'juan@example.com', 'x');
+INSERT INTO transactions VALUES (1, 1, 'Salary', 30000, 'income');
+INSERT INTO loans VALUES
+    (1, 1, 'Car Loan', 1200, '2026-01-15', '2026-12-15', 100, '', 0, 'active',
+     '2026-01-01 08:00:00');
+INSERT INTO loan_payments VALUES
+    (1, 1, 1, 100, '2026-01-15', '2026-01-15 09:00:00'),
+    (2, 1, 1, 100, '', '2026-02-15 09:00:00');
+INSERT INTO budget_categories VALUES (1, 1, 'Food', 5000, '2026-01-01 08:00:00');
+INSERT INTO budget_transactions VALUES
+    (1, 1, 1, 'Lunch', 250, 'daily', NULL, '2026-02-03 12:00:00'),
+    (2, 1, 1, 'Groceries', 1750, 'daily', NULL, '2026-02-20 18:00:00');
+"""
+
+
+def flask_db(database, *args):
+    """Runs `flask db ...` against `database` the way build.sh does."""
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database}")
+    result = subprocess.run(
+        [sys.executable, "-m", "flask", "--app", "app", "db", *args],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    return result.stdout
+
+
+def schema(database):
+    """{table: set of columns} and the set of index names."""
+    with sqlite3.connect(database) as conn:
+        tables = [
+            name
+            for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            )
+        ]
+        columns = {
+            table: {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for table in tables
+        }
+        indexes = {
+            name
+            for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index'"
+                " AND name NOT LIKE 'sqlite_%'"
+            )
+        }
+    return columns, indexes
+
+
+def test_upgrade_from_baseline_matches_fresh_schema(tmp_path):
+    baseline = tmp_path / "baseline.db"
+    with sqlite3.connect(baseline) as conn:
+        conn.executescript(BASELINE_SCHEMA.read_text())
+        conn.executescript(SEED)
+
+    flask_db(baseline, "upgrade")
+    history = flask_db(baseline, "history")
+    assert "pending" not in history
+
+    # Everything a new database gets, the upgraded one has too
+    fresh = tmp_path / "fresh.db"
+    flask_db(fresh, "upgrade")
+    fresh_columns, fresh_indexes = schema(fresh)
+    columns, indexes = schema(baseline)
+    assert fresh_indexes <= indexes
+    for table, names in fresh_columns.items():
+        assert names <= columns.get(table, set()), table
+
+    # Running it again is a no-op
+    flask_db(baseline, "upgrade")
+
+
+def test_upgrade_from_baseline_backfills_seed_rows(tmp_path):
+    baseline = tmp_path / "baseline.db"
+    with sqlite3.connect(baseline) as conn:
+        conn.executescript(BASELINE_SCHEMA.read_text())
+        conn.executescript(SEED)
+
+    flask_db(baseline, "upgrade")
+
+    with sqlite3.connect(baseline) as conn:
+        loan = conn.execute(
+            "SELECT start_on, end_on, next_due_date FROM loans WHERE id = 1"
+        ).fetchone()
+        # Installments fall due a month after the start; 200 paid covers two
+        assert loan == ("2026-01-15", "2026-12-15", "2026-04-15")
+
+        paid_on = [
+            row[0]
+            for row in conn.execute("SELECT paid_on FROM loan_payments ORDER BY id")
+        ]
+        assert paid_on == ["2026-01-15", None]
+
+        installments = conn.execute(
+            "SELECT COUNT(*), MIN(due_date), MAX(due_date), MAX(cumulative_due)"
+            " FROM loan_installments WHERE loan_id = 1"
+        ).fetchone()
+        assert installments == (11, "2026-02-15", "2026-12-15", 1200.0)
+
+        rollups = conn.execute(
+            "SELECT category_id, expense_type, month, total, txn_count"
+            " FROM budget_monthly_rollups WHERE user_id = 1"
+        ).fetchall()
+        assert rollups == [(1, "daily", "2026-02-01", 2000.0, 2)]
@@ -0,0 +1,57 @@
+import json
+import os
+import sys
+import tracemalloc
+
+import pytest
+
+
+@pytest.fixture
+def admin_client(app, client, user, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, "ADMIN_USERNAMES", {user["username"]})
+    monkeypatch.setitem(app.config, "PROFILE_DIR", str(tmp_path))
+    return client
+
+
+def events(out, name):
+    return [
+        event
+        for event in map(json.loads, out.splitlines())
+        if event["event"] == name
+    ]
+
+
+def test_profiled_request_writes_report_and_logs_json(admin_client, tmp_path, capsys):
+    response = admin_client.get("/savings", headers={"X-Profile": "1"})
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+    assert os.path.exists(tmp_path / f"{profile_id}.txt")
+    assert os.path.exists(tmp_path / f"{profile_id}.folded")
+
+    (event,) = events(capsys.readouterr().out, "profile")
+    assert event["id"] == profile_id
+    assert event["path"] == "/savings"
+    assert event["report"] == str(tmp_path / f"{profile_id}.txt")
+
+
+def test_profile_is_admin_only(client):
+    response = client.get("/savings", headers={"X-Profile": "1"})
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+
+
+def test_failed_profile_still_restores_process_state(admin_client, monkeypatch):
+    import profiler
+
+    def broken_stop(sampler):
+        raise RuntimeError("sampler stuck")
+
+    monkeypatch.setattr(profiler.Sampler, "stop", broken_stop)
+    switch_interval = sys.getswitchinterval()
+    with pytest.raises(RuntimeError):
+        admin_client.get("/savings", headers={"X-Profile": "1"})
+
+    assert sys.getswitchinterval() == switch_interval
+    assert not tracemalloc.is_tracing()
+    assert profiler._profile_lock.acquire(blocking=False)
+    profiler._profile_lock.release()
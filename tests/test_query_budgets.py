@@ -0,0 +1,70 @@
+import json
+
+import pytest
+from flask import g
+
+import query_watch
+import view_cache
+from query_watch import ROUTE_BUDGETS
+
+
+def assert_query_count_constant(app, user, seed, path):
+    """GETs `path` for a small data set and again for eight times the loans,
+    goals and categories. The statement count must not change and no
+    statement shape may repeat."""
+    seed(loans=1, goals=1, categories=1, rows=1)
+    status, small = query_watch.measure_page(app, user["id"], path)
+    assert status == 200
+
+    seed(loans=8, goals=8, categories=8, rows=4)
+    status, large = query_watch.measure_page(app, user["id"], path)
+    assert status == 200
+    assert large.count == small.count, large.report()
+    assert not large.repeated(), large.report()
+
+
+def test_dashboard_query_count_is_constant(app, user, seed):
+    assert_query_count_constant(app, user, seed, "/")
+
+
+def test_loan_tracker_query_count_is_constant(app, user, seed):
+    assert_query_count_constant(app, user, seed, "/loan-tracker")
+
+
+def test_savings_query_count_is_constant(app, user, seed):
+    assert_query_count_constant(app, user, seed, "/savings")
+
+
+def test_budget_query_count_is_constant(app, user, seed):
+    assert_query_count_constant(app, user, seed, "/budget")
+
+
+@pytest.mark.parametrize("path", ["/smart-budget", "/profile"])
+def test_other_pages_query_count_is_constant(app, user, seed, path):
+    assert_query_count_constant(app, user, seed, path)
+
+
+@pytest.mark.parametrize("path", sorted(ROUTE_BUDGETS))
+def test_page_stays_within_query_budget(user, client, seed, query_budget, path):
+    seed()
+    view_cache.invalidate(user["id"], "dashboard", "loan_tracker", "savings", "budget")
+    with query_budget(ROUTE_BUDGETS[path]):
+        response = client.get(path)
+    assert response.status_code == 200
+
+
+def test_repeated_statements_are_logged_as_one_json_line(app, capsys):
+    with app.test_request_context("/savings"):
+        query_watch.start_request()
+        for goal_id in range(4):
+            statement = f"SELECT * FROM savings WHERE id = {goal_id}"
+            g.query_recorder.record(None, None, statement, (), None, False)
+        response = query_watch.report_request(app.response_class())
+
+    assert response.headers["X-Query-Repeats"] == "4"
+    (line,) = capsys.readouterr().out.splitlines()
+    event = json.loads(line)
+    assert event["event"] == "possible_n_plus_one"
+    assert event["path"] == "/savings"
+    assert event["sql_statements"] == 4
+    assert [r["times"] for r in event["repeated"]] == [4]
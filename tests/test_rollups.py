@@ -0,0 +1,115 @@
+import io
+from datetime import date, datetime
+
+import pytest
+
+from app import db
+import importer
+import models
+
+
+class February14(datetime):
+    @classmethod
+    def utcnow(cls):
+        return datetime(2026, 2, 14, 12, 0)
+
+
+def import_budget_csv(user_id, rows):
+    """rows: (date, category, description, amount) spending rows."""
+    text = "Date,Category,Description,Amount\n" + "".join(
+        f"{d.isoformat()},{category},{description},-{amount}\n"
+        for d, category, description, amount in rows
+    )
+    return importer.import_statement(user_id, io.StringIO(text), "csv", "budget")
+
+
+def spent_by_name(user_id, period):
+    return {
+        c["name"]: c["actual_spent"]
+        for c in models.get_category_summary(user_id, period)
+    }
+
+
+def test_writes_and_imports_keep_rollups_in_step(user):
+    uid = user["id"]
+    models.add_category(uid, "Food", 5000)
+    models.add_category(uid, "Fares", 2000)
+    food, fares = sorted(models.get_categories(uid), key=lambda c: c["name"] != "Food")
+
+    for amount in (250, 1750.25, 400):
+        models.add_budget_transaction(uid, food["id"], "Lunch", amount)
+    models.add_budget_transaction(uid, fares["id"], "Bus pass", 1200, "monthly")
+    assert models.verify_rollups(uid) == []
+
+    lunch = models.BudgetTransaction.query.filter_by(user_id=uid, amount=250).one()
+    models.delete_budget_transaction(lunch.id, uid)
+    assert models.verify_rollups(uid) == []
+
+    import_budget_csv(
+        uid,
+        [
+            (date(2026, 1, 31), "Food", "Groceries", 900),
+            (date(2026, 1, 31), "Food", "Groceries", 900),
+            (date(2026, 2, 1), "Fares", "Taxi", 310.5),
+            (date(2024, 12, 24), "Unknown", "Gift", 75),
+        ],
+    )
+    assert models.verify_rollups(uid) == []
+
+    # Deleting an imported row from an old month updates that month's bucket
+    gift = models.BudgetTransaction.query.filter_by(user_id=uid, amount=75).one()
+    models.delete_budget_transaction(gift.id, uid)
+    assert models.verify_rollups(uid) == []
+    assert spent_by_name(uid, "all") == pytest.approx(
+        {"Food": 1750.25 + 400 + 1800, "Fares": 1200 + 310.5}
+    )
+
+
+def test_verify_rollups_reports_drift_and_rebuild_fixes_it(user):
+    uid = user["id"]
+    models.add_category(uid, "Food", 5000)
+    (food,) = models.get_categories(uid)
+    models.add_budget_transaction(uid, food["id"], "Lunch", 300)
+
+    models.BudgetRollup.query.filter_by(user_id=uid).update({"total": 1})
+    db.session.commit()
+    ((bucket, stored, actual),) = models.verify_rollups(uid)
+    assert bucket[0] == food["id"]
+    assert (stored, actual) == ((1, 1), (300, 1))
+
+    assert models.rebuild_rollups(uid) == 1
+    assert models.verify_rollups(uid) == []
+
+
+def test_period_start():
+    today = date(2026, 2, 14)
+    assert models.period_start("month", today) == date(2026, 2, 1)
+    assert models.period_start("3m", today) == date(2025, 12, 1)
+    assert models.period_start("ytd", today) == date(2026, 1, 1)
+    assert models.period_start("all", today) is None
+
+
+@pytest.mark.parametrize(
+    "period, expected",
+    [("month", 1), ("3m", 11111), ("ytd", 111), ("all", 111111)],
+)
+def test_category_summary_periods_across_month_boundaries(
+    user, monkeypatch, period, expected
+):
+    uid = user["id"]
+    models.add_category(uid, "Food", 5000)
+    # Either side of the starts of this month, the year and the 3-month window
+    import_budget_csv(
+        uid,
+        [
+            (date(2026, 2, 1), "Food", "Spend", 1),
+            (date(2026, 1, 31), "Food", "Spend", 10),
+            (date(2026, 1, 1), "Food", "Spend", 100),
+            (date(2025, 12, 31), "Food", "Spend", 1000),
+            (date(2025, 12, 1), "Food", "Spend", 10000),
+            (date(2025, 11, 30), "Food", "Spend", 100000),
+        ],
+    )
+
+    monkeypatch.setattr(models, "datetime", February14)
+    assert spent_by_name(uid, period) == {"Food": expected}
@@ -0,0 +1,155 @@
+import json
+import uuid
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from app import db
+import jobs
+import models
+import routes
+
+
+@pytest.fixture
+def inline_jobs(app, monkeypatch):
+    """Runs submitted jobs right away on the calling thread."""
+    monkeypatch.setattr(jobs, "enqueue", lambda job_id: jobs.run(app, job_id))
+
+
+def llm_plan(monkeypatch, plan):
+    monkeypatch.setattr(
+        routes,
+        "request_llama_budget",
+        lambda *args: {"plan": plan, "reasoning": "Stub reasoning."},
+    )
+
+
+def generate(client, salary):
+    """Posts the blueprint form; returns the job id it redirects to."""
+    response = client.post(
+        "/smart-budget",
+        data={
+            "salary_amount": salary,
+            "frequency": "Monthly",
+            "item_name[]": ["Rent", "Food", "Savings"],
+            "item_amount[]": ["8000", "0", "0"],
+        },
+    )
+    assert response.status_code == 302
+    return parse_qs(urlparse(response.location).query)["job"][0]
+
+
+def test_plan_amounts_are_coerced_on_the_job_pool(client, inline_jobs, monkeypatch):
+    llm_plan(monkeypatch, {"Food": "₱1,200", "Savings": 800.5})
+    job_id = generate(client, 10000.5)
+
+    job = db.session.get(models.AIJob, job_id)
+    assert job.status == "done"
+    assert json.loads(job.result)["plan"] == {"Food": 1200.0, "Savings": 800.5}
+    page = client.get(f"/smart-budget?job={job_id}")
+    assert page.status_code == 200
+    assert "Stub reasoning." in page.get_data(as_text=True)
+
+
+def test_unusable_plan_fails_the_job(client, inline_jobs, monkeypatch):
+    llm_plan(monkeypatch, {"Food": "n/a", "Savings": 800})
+    job_id = generate(client, 10001)
+
+    job = db.session.get(models.AIJob, job_id)
+    assert job.status == "failed"
+    assert "not a number" in job.error
+    for _ in range(2):  # every reload, not just the first
+        page = client.get(f"/smart-budget?job={job_id}")
+        assert page.status_code == 200
+        assert "reach the AI brain" in page.get_data(as_text=True)
+
+
+def test_unchecked_stored_result_falls_back(client, user):
+    state = routes.blueprint_state(
+        user["id"],
+        "llm",
+        10002,
+        "Monthly",
+        [
+            {"name": "Rent", "user": 8000.0, "ai": 8000.0, "auto": False},
+            {"name": "Food", "user": 0.0, "ai": 0.0, "auto": False},
+        ],
+        [1],
+        2002,
+    )
+    job = models.AIJob(
+        id=uuid.uuid4().hex,
+        user_id=user["id"],
+        kind="blueprint",
+        status="done",
+        payload=json.dumps(state),
+        result=json.dumps({"plan": {"Food": "n/a"}, "reasoning": "?"}),
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    page = client.get(f"/smart-budget?job={job.id}")
+    assert page.status_code == 200
+    assert "reach the AI brain" in page.get_data(as_text=True)
+
+
+def stale_job(user_id, status, attempts=1):
+    long_ago = datetime.utcnow() - timedelta(seconds=jobs.JOB_STALE_SECONDS * 2)
+    job = models.AIJob(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        kind="blueprint",
+        status=status,
+        payload="{}",
+        attempts=attempts,
+        created_at=long_ago,
+        started_at=long_ago if status == "running" else None,
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+@pytest.fixture
+def enqueued(monkeypatch):
+    job_ids = []
+    monkeypatch.setattr(jobs, "enqueue", job_ids.append)
+    return job_ids
+
+
+def stored_status(job_id):
+    with db.engine.connect() as conn:
+        return conn.execute(
+            db.select(models.AIJob.status).where(models.AIJob.id == job_id)
+        ).scalar()
+
+
+def test_recover_requeues_an_abandoned_job(user, enqueued):
+    job = stale_job(user["id"], "running")
+    jobs.recover(job)
+    assert enqueued == [job.id]
+    assert stored_status(job.id) == "queued"
+
+
+def test_recover_gives_up_after_max_attempts(user, enqueued):
+    job = stale_job(user["id"], "running", attempts=jobs.JOB_MAX_ATTEMPTS)
+    jobs.recover(job)
+    assert enqueued == []
+    assert stored_status(job.id) == "failed"
+
+
+def test_recover_leaves_a_job_finished_meanwhile(user, enqueued):
+    job = stale_job(user["id"], "running")
+    job.status  # loaded as running, like requeue_stale's SELECT
+    # A worker finishes it between that read and recover()'s write
+    with db.engine.begin() as conn:
+        conn.execute(
+            db.update(models.AIJob)
+            .where(models.AIJob.id == job.id)
+            .values(status="done", result="{}")
+        )
+
+    jobs.recover(job)
+    assert enqueued == []
+    assert stored_status(job.id) == "done"
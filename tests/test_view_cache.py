@@ -0,0 +1,65 @@
+import pytest
+
+import view_cache
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path, monkeypatch):
+    backend = view_cache.build_backend(
+        request.param, str(tmp_path / "view_cache.db"), 100, 300
+    )
+    monkeypatch.setattr(view_cache, "_backend", backend)
+    return backend
+
+
+def test_cached_view_serves_the_stored_copy(backend):
+    loads = []
+    for _ in range(2):
+        value = view_cache.cached_view(1, "dashboard", lambda: loads.append(1) or 1)
+    assert value == 1
+    assert len(loads) == 1
+
+
+def test_invalidate_during_load_is_not_lost(backend):
+    balance = {"value": 100}
+
+    def load_then_write():
+        seen = balance["value"]
+        # A write commits and invalidates while this load is still reading
+        balance["value"] = 50
+        view_cache.invalidate(1, "dashboard")
+        return seen
+
+    assert view_cache.cached_view(1, "dashboard", load_then_write) == 100
+    assert view_cache.cached_view(1, "dashboard", lambda: balance["value"]) == 50
+
+
+def test_invalidate_only_touches_its_own_keys(backend):
+    view_cache.cached_view(1, "dashboard", lambda: "user 1")
+    view_cache.cached_view(2, "dashboard", lambda: "user 2")
+    view_cache.invalidate(1, "dashboard")
+    assert view_cache.cached_view(1, "dashboard", lambda: "reloaded") == "reloaded"
+    assert view_cache.cached_view(2, "dashboard", lambda: "reloaded") == "user 2"
+
+
+def test_sqlite_backend_accepts_a_bare_filename(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    backend = view_cache.build_backend("sqlite", "view_cache.db", 100, 300)
+    backend.set("1:dashboard", b"cached")
+    assert backend.get("1:dashboard") == b"cached"
+    assert (tmp_path / "view_cache.db").exists()
+
+
+def test_sqlite_backend_creates_missing_directories(tmp_path):
+    path = tmp_path / "cache" / "nested" / "view_cache.db"
+    view_cache.build_backend("sqlite", str(path), 100, 300)
+    assert path.exists()
+
+
+def test_cache_stats_is_admin_only(app, client, user, monkeypatch):
+    assert client.get("/cache/stats").status_code == 404
+
+    monkeypatch.setitem(app.config, "ADMIN_USERNAMES", {user["username"]})
+    response = client.get("/cache/stats")
+    assert response.status_code == 200
+    assert set(response.get_json()) == {"hits", "misses", "hit_rate"}
@@ -0,0 +1,266 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+# ==========================================
+# 1. BACKENDS
+# ==========================================
+
+
+class MemoryBackend:
+    """Per-process LRU store with a TTL. Fine for a single worker."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.generations = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, generation=None):
+        """Stores `value`; with `generation`, only if `key` has not been
+        invalidated since generation(key) returned it."""
+        with self.lock:
+            if generation is not None and self.generations.get(key, 0) != generation:
+                return
+            self.entries[key] = (value, time.time() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def generation(self, key):
+        with self.lock:
+            return self.generations.get(key, 0)
+
+    def invalidate(self, keys):
+        """Deletes `keys` and bumps their generations, so a value loaded
+        before this call is not written back afterwards."""
+        with self.lock:
+            for key in keys:
+                self.generations[key] = self.generations.get(key, 0) + 1
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class SQLiteBackend:
+    """LRU/TTL store in a local SQLite file, shared by every gunicorn worker
+    on the machine so an invalidation in one worker is seen by all."""
+
+    def __init__(self, path, max_entries, ttl):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.local = threading.local()
+        with self.connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS view_cache ("
+                " key TEXT PRIMARY KEY, value BLOB NOT NULL,"
+                " expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_view_cache_last_used"
+                " ON view_cache (last_used)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS view_cache_generations ("
+                " key TEXT PRIMARY KEY, generation INTEGER NOT NULL)"
+            )
+
+    def connect(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self.connect()
+        row = conn.execute(
+            "SELECT value, expires_at FROM view_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if row[1] < now:
+            conn.execute("DELETE FROM view_cache WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE view_cache SET last_used = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def set(self, key, value, generation=None):
+        """Stores `value`; with `generation`, only if `key` has not been
+        invalidated (by any worker) since generation(key) returned it."""
+        now = time.time()
+        conn = self.connect()
+        if generation is None:
+            conn.execute(
+                "INSERT OR REPLACE INTO view_cache VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl, now),
+            )
+        else:
+            # Check and write in one statement so an invalidate can't slip in
+            conn.execute(
+                "INSERT OR REPLACE INTO view_cache SELECT ?, ?, ?, ?"
+                " WHERE COALESCE((SELECT generation FROM view_cache_generations"
+                " WHERE key = ?), 0) = ?",
+                (key, value, now + self.ttl, now, key, generation),
+            )
+        # Trim the least recently used rows beyond the size bound
+        conn.execute(
+            "DELETE FROM view_cache WHERE key IN (SELECT key FROM view_cache"
+            " ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def delete(self, keys):
+        keys = list(keys)
+        if keys:
+            marks = ",".join("?" * len(keys))
+            self.connect().execute(
+                f"DELETE FROM view_cache WHERE key IN ({marks})", keys
+            )
+
+    def generation(self, key):
+        row = (
+            self.connect()
+            .execute(
+                "SELECT generation FROM view_cache_generations WHERE key = ?", (key,)
+            )
+            .fetchone()
+        )
+        return row[0] if row else 0
+
+    def invalidate(self, keys):
+        """Deletes `keys` and bumps their generations, so a value any worker
+        loaded before this call is not written back afterwards."""
+        keys = list(keys)
+        if not keys:
+            return
+        conn = self.connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO view_cache_generations VALUES (?, 1)"
+                " ON CONFLICT (key) DO UPDATE SET generation = generation + 1",
+                [(key,) for key in keys],
+            )
+            marks = ",".join("?" * len(keys))
+            conn.execute(f"DELETE FROM view_cache WHERE key IN ({marks})", keys)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def clear(self):
+        self.connect().execute("DELETE FROM view_cache")
+
+
+# ==========================================
+# 2. READ-THROUGH API
+# ==========================================
+
+_backend = None
+_backend_lock = threading.Lock()
+stats = {"hits": {}, "misses": {}}
+
+
+def build_backend(kind, path, max_entries, ttl):
+    """Returns a backend for `kind`: "memory", "sqlite" (stored at `path`)
+    or "none", which gives False so callers skip caching."""
+    if kind == "none":
+        return False
+    if kind == "sqlite":
+        # A bare filename lives in the working directory, which exists
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        return SQLiteBackend(path, max_entries, ttl)
+    return MemoryBackend(max_entries, ttl)
+
+
+def get_backend():
+    """Builds the backend named by VIEW_CACHE_BACKEND on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = current_app.config
+                _backend = build_backend(
+                    config.get("VIEW_CACHE_BACKEND", "sqlite"),
+                    config.get("VIEW_CACHE_PATH")
+                    or os.path.join(current_app.instance_path, "view_cache.db"),
+                    config.get("VIEW_CACHE_MAX_ENTRIES", 1000),
+                    config.get("VIEW_CACHE_TTL", 300),
+                )
+    return _backend
+
+
+def cache_key(user_id, view):
+    return f"{user_id}:{view}"
+
+
+def cached_view(user_id, view, loader):
+    """Returns loader()'s result for (user, view), computing it only when it
+    is missing or expired. Values are pickled, so callers may mutate what
+    they get back without corrupting the cached copy.
+
+    A value is only stored if no invalidate() for the key ran while loader()
+    was reading, so a write that lands mid-load can't leave stale data
+    cached until the TTL runs out."""
+    backend = get_backend()
+    if not backend:
+        return loader()
+
+    key = cache_key(user_id, view)
+    raw = backend.get(key)
+    if raw is not None:
+        stats["hits"][view] = stats["hits"].get(view, 0) + 1
+        return pickle.loads(raw)
+
+    stats["misses"][view] = stats["misses"].get(view, 0) + 1
+    generation = backend.generation(key)
+    value = loader()
+    backend.set(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), generation)
+    return value
+
+
+def invalidate(user_id, *views):
+    """Drops the cached copies of `views` for one user."""
+    backend = get_backend()
+    if backend and user_id:
+        backend.invalidate(cache_key(user_id, v) for v in views)
+
+
+def get_stats():
+    hits = sum(stats["hits"].values())
+    misses = sum(stats["misses"].values())
+    return {
+        "hits": dict(stats["hits"]),
+        "misses": dict(stats["misses"]),
+        "hit_rate": hits / (hits + misses) if hits + misses else 0,
+    }